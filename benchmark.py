@@ -0,0 +1,3 @@
+from libs.benchmark import main
+
+main()
@@ -506,27 +506,19 @@ class CameraOperation():
         else:
             return False
 
-    def Mono_numpy(self,data,nWidth,nHeight):
-        # print(type(data))
+    def Mono_numpy(self,data,nWidth,nHeight,out=None):
+        # View trực tiếp lên buffer của SDK, chỉ copy một lần vào out (hoặc mảng mới)
         data_ = np.frombuffer(data, count=int(nWidth * nHeight), dtype=np.uint8, offset=0)
-        data_mono_arr = data_.reshape(nHeight, nWidth)
-        numArray = np.zeros([nHeight, nWidth, 1],"uint8") 
-        numArray[:, :, 0] = data_mono_arr
-        return numArray
-
-    def Color_numpy(self,data,nWidth,nHeight):
-        # print(type(data))
+        data_mono_arr = data_.reshape(nHeight, nWidth, 1)
+        if out is None:
+            return data_mono_arr.copy()
+        np.copyto(out, data_mono_arr)
+        return out
+
+    def Color_numpy(self,data,nWidth,nHeight,out=None):
+        # RGB -> BGR một lần, ghi thẳng vào out nếu có
         data_ = np.frombuffer(data, count=int(nWidth*nHeight*3), dtype=np.uint8, offset=0)
-        data_r = data_[0:nWidth*nHeight*3:3]
-        data_g = data_[1:nWidth*nHeight*3:3]
-        data_b = data_[2:nWidth*nHeight*3:3]
-
-        data_r_arr = data_r.reshape(nHeight, nWidth)
-        data_g_arr = data_g.reshape(nHeight, nWidth)
-        data_b_arr = data_b.reshape(nHeight, nWidth)
-        numArray = np.zeros([nHeight, nWidth, 3],"uint8")
-
-        numArray[:, :, 2] = data_r_arr
-        numArray[:, :, 1] = data_g_arr
-        numArray[:, :, 0] = data_b_arr
-        return numArray
\ No newline at end of file
+        data_rgb_arr = data_.reshape(nHeight, nWidth, 3)
+        if out is None:
+            return cv2.cvtColor(data_rgb_arr, cv2.COLOR_RGB2BGR)
+        return cv2.cvtColor(data_rgb_arr, cv2.COLOR_RGB2BGR, dst=out)
\ No newline at end of file
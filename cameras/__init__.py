@@ -6,12 +6,19 @@ from cameras.MVSImport.LoadAndSave import save_feature
 from cameras.hik import HIK
 from cameras.soda import SODA
 from cameras.webcam import Webcam
+from cameras.simulated import Replay, Synthetic
+from cameras.pixel_format import *
+from cameras.frame import Frame
 
 
-def get_camera_devices(type: str):
+def get_camera_devices(type: str, refresh=False):
     if type == "HIK":
-        return HIK.get_devices()
+        return HIK.get_devices(refresh)
     elif type == "SODA":
-        return SODA.get_devices()
+        return SODA.get_devices(refresh)
     elif type == "Webcam":
         return Webcam.get_devices()
+    elif type == "Replay":
+        return Replay.get_devices()
+    elif type == "Synthetic":
+        return Synthetic.get_devices()
@@ -1,5 +1,11 @@
+import time
+import threading
 from abc import ABC, abstractmethod
 import numpy as np
+import cv2
+
+from pixel_format import *
+from frame import Frame
 
 
 NO_ERROR = ""
@@ -9,6 +15,129 @@ ERR_MODEL_NAME = "ERR_MODEL_NAME"
 ERR_LOAD_FEATURE_FAIL = "ERR_LOAD_FEATURE_FAIL"
 ERR_CONFIG_IS_NONE = "ERR_CONFIG_IS_NONE"
 ERR_GRAB_FAIL = "ERR_GRAB_FAIL"
+ERR_TRIGGER_FAIL = "ERR_TRIGGER_FAIL"
+ERR_TRIGGER_TIMEOUT = "ERR_TRIGGER_TIMEOUT"
+ERR_SENSOR_FAIL = "ERR_SENSOR_FAIL"
+
+
+def align_value(value, inc=1, vmin=0, vmax=None) -> int:
+    """
+    Làm tròn xuống theo bước inc của node camera và giới hạn trong [vmin, vmax].
+    """
+    inc = max(1, int(inc))
+    value = int(value) // inc * inc
+    value = max(int(vmin), value)
+    if vmax is not None:
+        value = min(int(vmax), value)
+    return value
+
+
+def make_sensor(roi=None, binning=1, decimation=1):
+    """
+    Chuẩn hoá cấu hình sensor, None nếu là full frame không binning/decimation.
+    """
+    roi = tuple(int(v) for v in roi) if roi and len(roi) == 4 else None
+    binning = max(1, int(binning or 1))
+    decimation = max(1, int(decimation or 1))
+    if roi is None and binning == 1 and decimation == 1:
+        return None
+    return roi, binning, decimation
+
+
+class DeviceCache:
+    """
+    Cache kết quả liệt kê thiết bị (thường chậm với GigE) trong ttl giây.
+    get(refresh=True) hoặc refresh() để liệt kê lại.
+    """
+    def __init__(self, enumerate_fn, ttl=10.0):
+        self.enumerate_fn = enumerate_fn
+        self.ttl = ttl
+        self._value = None
+        self._time = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, refresh=False):
+        with self._lock:
+            if refresh or self._value is None or time.perf_counter() - self._time > self.ttl:
+                self._value = self.enumerate_fn()
+                self._time = time.perf_counter()
+            return self._value
+
+    def refresh(self):
+        return self.get(refresh=True)
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+
+class ArrayPool:
+    """
+    Pool nhỏ các mảng output dùng lại giữa các lần grab, tránh cấp phát frame mới mỗi lần.
+    get() cho mượn một mảng, mảng chỉ được dùng lại sau khi người giữ frame gọi release()
+    (Frame.release). Quá size mảng đang mượn thì pool quên mảng cũ nhất, mảng đó thành
+    mảng bình thường (không bao giờ bị ghi đè), pool cấp phát mảng mới khi cần.
+    Bộ đếm hits/misses (stats) cho biết mảng có thực sự được dùng lại ở trạng thái ổn định.
+    """
+    def __init__(self, size=4):
+        self.size = max(1, int(size))
+        self._free = []
+        self._leased = {}   # id(arr) -> arr đang cho mượn, theo thứ tự cho mượn
+        self._lock = threading.Lock()
+        self.hits = 0       # get() dùng lại mảng đã release
+        self.misses = 0     # get() phải cấp phát mảng mới
+        self.forgotten = 0  # mảng bị quên vì người giữ frame không release
+
+    def get(self, shape, dtype=np.uint8) -> np.ndarray:
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        with self._lock:
+            for i, arr in enumerate(self._free):
+                if arr.shape == shape and arr.dtype == dtype:
+                    del self._free[i]
+                    self.hits += 1
+                    break
+            else:
+                arr = np.empty(shape, dtype)
+                self.misses += 1
+            self._leased[id(arr)] = arr
+            if len(self._leased) > self.size:
+                del self._leased[next(iter(self._leased))]
+                self.forgotten += 1
+            return arr
+
+    def is_leased(self, arr) -> bool:
+        with self._lock:
+            return self._leased.get(id(arr)) is arr
+
+    def release(self, arr) -> bool:
+        """
+        Trả mảng đã mượn về pool, False nếu mảng không (còn) thuộc pool.
+        """
+        with self._lock:
+            if self._leased.get(id(arr)) is not arr:
+                return False
+            del self._leased[id(arr)]
+            if len(self._free) < self.size:
+                self._free.append(arr)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._free.clear()
+            self._leased.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "forgotten": self.forgotten,
+                "hit_rate": self.hits / total if total else 0.0,
+                "leased": len(self._leased),
+                "free": len(self._free),
+            }
 
 
 class BaseCamera(ABC):
@@ -19,6 +148,12 @@ class BaseCamera(ABC):
         self._cap = None
         self._config = {}
         self._model_name = ""
+        self._trigger_mode = False
+        self._soft_sensor = None
+        self._pixel_format = PIXEL_BGR8
+        self._frame_info = {}
+        self._n_frames = 0
+        self._t_trigger = None
         if config is not None:
             self.set_config(config)
 
@@ -44,6 +179,55 @@ class BaseCamera(ABC):
     def get_model_name(self) -> str:
         return self._model_name
 
+    def get_pixel_format(self) -> str:
+        """
+        Pixel format của frame grab gần nhất (Mono8, BGR8, BayerRG8, ...).
+        """
+        return self._pixel_format
+
+    def set_frame_info(self, **info):
+        """
+        Driver gọi sau mỗi lần grab thành công với metadata của frame (frame_id, device_timestamp,
+        exposure_us, gain, lost_packets, skipped). Camera không có số frame thì tự đánh số.
+        """
+        self._n_frames += 1
+        info.setdefault("frame_id", self._n_frames)
+        info["timestamp"] = time.time()
+        info["grab_time"] = time.perf_counter()
+        self._frame_info = info
+
+    def get_frame_info(self) -> dict:
+        return self._frame_info
+
+    def make_frame(self, mat) -> Frame:
+        """
+        Đóng gói ảnh vừa grab cùng metadata của lần grab đó thành Frame.
+        """
+        frame = Frame(mat, self._pixel_format, trigger_time=self._t_trigger,
+                      camera=self._model_name, **self._frame_info)
+        # Ảnh mượn từ pool của driver: người giữ frame gọi frame.release() khi không dùng nữa
+        pool = getattr(self, "_pool", None)
+        if pool is not None and pool.is_leased(mat):
+            frame.pool = pool
+        self._t_trigger = None
+        return frame
+
+    def keep_raw(self) -> bool:
+        """
+        config "demosaic": False -> trả frame Bayer thô, bước nào cần màu mới demosaic.
+        ROI/binning phần mềm làm hỏng pattern Bayer nên khi đó vẫn demosaic trong driver.
+        """
+        return not self._config.get("demosaic", True) and self._soft_sensor is None
+
+    def reset_device(self):
+        """
+        Liệt kê lại thiết bị và tạo lại handle sau khi mất kết nối (rớt mạng GigE, rút cáp, ...).
+        """
+        cache = getattr(type(self), "_device_cache", None)
+        if cache is not None:
+            cache.invalidate()
+        self.create_device()
+
     @abstractmethod
     def open(self) -> bool: ...
 
@@ -59,3 +243,77 @@ class BaseCamera(ABC):
     @abstractmethod
     def grab(self) -> tuple: ...
 
+    def set_trigger_mode(self, enable: bool) -> bool:
+        """
+        Bật/tắt chế độ software trigger. Trả về False nếu camera không hỗ trợ.
+        """
+        return False
+
+    def set_sensor(self, roi=None, binning=1, decimation=1) -> bool:
+        """
+        ROI (x, y, w, h) theo toạ độ sensor đầy đủ, binning và decimation.
+        Gọi sau open, trước start_grabbing. Mặc định (camera không hỗ trợ)
+        cắt và giảm mẫu bằng phần mềm sau mỗi lần grab.
+        """
+        self._soft_sensor = make_sensor(roi, binning, decimation)
+        return True
+
+    def apply_soft_sensor(self, mat):
+        if self._soft_sensor is None or mat is None:
+            return mat
+
+        roi, binning, decimation = self._soft_sensor
+        if roi is not None:
+            x, y, w, h = roi
+            mat = mat[max(0, y):y + h, max(0, x):x + w]
+        if binning > 1:
+            h, w = mat.shape[:2]
+            binned = cv2.resize(mat, (w // binning, h // binning), interpolation=cv2.INTER_AREA)
+            mat = binned[..., None] if mat.ndim == 3 and binned.ndim == 2 else binned
+        if decimation > 1:
+            mat = mat[::decimation, ::decimation]
+        return np.ascontiguousarray(mat)
+
+    def is_trigger_mode(self) -> bool:
+        return self._trigger_mode
+
+    def arm(self, delay_ms=0) -> bool:
+        """
+        Chuẩn bị cho lần trigger kế tiếp: bỏ các frame cũ còn trong buffer
+        và đặt trigger delay (ms) của camera.
+        """
+        return False
+
+    def software_trigger(self) -> bool:
+        return False
+
+    def fire_trigger(self) -> bool:
+        """
+        software_trigger và ghi lại thời điểm trigger để tính latency của frame.
+        """
+        t_trigger = time.perf_counter()
+        if not self.software_trigger():
+            return False
+        self._t_trigger = t_trigger
+        return True
+
+    def wait_frame(self, timeout=1000) -> tuple:
+        """
+        Chờ frame của lần trigger vừa phát, (ERR_TRIGGER_TIMEOUT, None) nếu quá timeout (ms).
+        """
+        return self.grab()
+
+    def trigger_grab(self, delay_ms=0, timeout=1000) -> tuple:
+        """
+        arm -> software trigger -> chờ đúng frame của trigger đó.
+        Camera không ở chế độ trigger thì chờ delay rồi grab (free-run).
+        """
+        if not self._trigger_mode:
+            if delay_ms > 0:
+                time.sleep(delay_ms / 1000)
+            return self.grab()
+
+        if not self.arm(delay_ms) or not self.fire_trigger():
+            return ERR_TRIGGER_FAIL, None
+        return self.wait_frame(timeout)
+
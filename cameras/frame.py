@@ -0,0 +1,80 @@
+import time
+
+from pixel_format import PIXEL_BGR8
+
+
+class Frame:
+    """
+    Frame của camera kèm metadata của driver.
+    frame_id: số thứ tự frame của camera (HIK nFrameNum, pylon BlockID), dùng để phát hiện frame bị mất
+    timestamp: thời điểm host nhận frame (time.time)
+    device_timestamp: timestamp của camera (tick, đơn vị tuỳ camera)
+    exposure_us, gain: giá trị lúc chụp (0 nếu camera không trả về)
+    lost_packets: số packet GigE bị mất trong frame
+    skipped: số frame camera đã bỏ qua trước frame này (pylon LatestImageOnly)
+    trigger_time, grab_time: time.perf_counter lúc phát software trigger và lúc nhận frame
+    pool: ArrayPool của driver nếu mat được mượn từ pool, release() trả mat về để grab sau dùng lại
+    """
+    __slots__ = ("mat", "pixel_format", "frame_id", "timestamp", "device_timestamp", "exposure_us",
+                 "gain", "lost_packets", "skipped", "trigger_time", "grab_time", "camera", "pool")
+
+    def __init__(self, mat, pixel_format=PIXEL_BGR8, frame_id=-1, timestamp=None, device_timestamp=0,
+                 exposure_us=0.0, gain=0.0, lost_packets=0, skipped=0, trigger_time=None,
+                 grab_time=None, camera=""):
+        self.mat = mat
+        self.pixel_format = pixel_format
+        self.frame_id = int(frame_id)
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.device_timestamp = int(device_timestamp)
+        self.exposure_us = float(exposure_us)
+        self.gain = float(gain)
+        self.lost_packets = int(lost_packets)
+        self.skipped = int(skipped)
+        self.trigger_time = trigger_time
+        self.grab_time = time.perf_counter() if grab_time is None else grab_time
+        self.camera = camera
+        self.pool = None
+
+    @property
+    def shape(self):
+        return self.mat.shape
+
+    @property
+    def latency_ms(self):
+        """
+        Thời gian từ lúc phát software trigger tới khi nhận frame (ms), None nếu chụp free-run.
+        """
+        if self.trigger_time is None:
+            return None
+        return (self.grab_time - self.trigger_time) * 1000
+
+    def release(self):
+        """
+        Không dùng mat nữa (đã copy hoặc đã chuyển sang ảnh khác): trả mảng về pool của driver.
+        Sau release mat = None, metadata vẫn giữ nguyên.
+        """
+        if self.pool is not None:
+            self.pool.release(self.mat)
+            self.pool = None
+            self.mat = None
+
+    def meta(self) -> dict:
+        """
+        Metadata không kèm ảnh (lưu database, ring buffer, ...).
+        """
+        return {
+            "camera": self.camera,
+            "pixel_format": self.pixel_format,
+            "frame_id": self.frame_id,
+            "timestamp": self.timestamp,
+            "device_timestamp": self.device_timestamp,
+            "exposure_us": self.exposure_us,
+            "gain": self.gain,
+            "lost_packets": self.lost_packets,
+            "skipped": self.skipped,
+            "latency_ms": self.latency_ms,
+        }
+
+    def __repr__(self):
+        shape = None if self.mat is None else self.mat.shape
+        return f"Frame(camera={self.camera!r}, id={self.frame_id}, shape={shape}, format={self.pixel_format})"
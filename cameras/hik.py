@@ -7,9 +7,26 @@ from MVSImport.MvCameraControl_class import *
 from MVSImport.CamOperation_class import *
 
 
+def decode_char_array(chars) -> str:
+    """
+    Mảng c_ubyte kết thúc bằng 0 của SDK -> str.
+    """
+    return bytes(chars).split(b"\0", 1)[0].decode("ascii", "ignore")
+
+
 class HIK(BaseCamera):
+    BAYER_FORMATS = {
+        PixelType_Gvsp_BayerGB8: PIXEL_BAYER_GB8,
+        PixelType_Gvsp_BayerRG8: PIXEL_BAYER_RG8,
+        PixelType_Gvsp_BayerGR8: PIXEL_BAYER_GR8,
+        PixelType_Gvsp_BayerBG8: PIXEL_BAYER_BG8,
+    }
+
     def __init__(self, config=None) -> None:
         self._stFrameInfo = MV_FRAME_OUT_INFO_EX()
+        # Các mảng output được dùng lại khi frame cũ không còn được giữ
+        self._pool = ArrayPool(size=4)
+        self._trigger_delay = None
         super().__init__(config=config)
 
     def set_config(self, config):
@@ -23,11 +40,18 @@ class HIK(BaseCamera):
     def get_error(self) -> str:
         return self._error
     
-    def get_devices() -> dict:
-        devices, _ = HIK.get_devices_and_list_devinfo()
+    def get_devices(refresh=False) -> dict:
+        devices, _ = HIK.get_devices_and_list_devinfo(refresh)
         return devices
+
+    def refresh_devices() -> dict:
+        return HIK.get_devices(refresh=True)
     
-    def get_devices_and_list_devinfo() -> tuple:
+    def get_devices_and_list_devinfo(refresh=False) -> tuple:
+        # Liệt kê thiết bị được cache (TTL), tránh MV_CC_EnumDevices mỗi lần tạo camera
+        return HIK._device_cache.get(refresh)
+
+    def enum_devices_and_list_devinfo() -> tuple:
         list_devinfo = MV_CC_DEVICE_INFO_LIST()
         tlayerType = MV_GIGE_DEVICE | MV_USB_DEVICE
         ret = MvCamera.MV_CC_EnumDevices(tlayerType, list_devinfo)
@@ -35,48 +59,24 @@ class HIK(BaseCamera):
         for i in range(0, list_devinfo.nDeviceNum):
             mvcc_dev_info = cast(list_devinfo.pDeviceInfo[i], POINTER(MV_CC_DEVICE_INFO)).contents
             if mvcc_dev_info.nTLayerType == MV_GIGE_DEVICE:
-                # print("\ngige device: [%d]" % i)
-                strModeName = ""
-                for per in mvcc_dev_info.SpecialInfo.stGigEInfo.chModelName:
-                    strModeName = strModeName + chr(per)
-                # print("device model name: %s" % strModeName)
-
-                strSerialNumber = ""
-                for per in mvcc_dev_info.SpecialInfo.stGigEInfo.chSerialNumber:
-                    if per == 0:
-                        break
-                    strSerialNumber = strSerialNumber + chr(per)
-
-                nip1 = ((mvcc_dev_info.SpecialInfo.stGigEInfo.nCurrentIp & 0xff000000) >> 24)
-                nip2 = ((mvcc_dev_info.SpecialInfo.stGigEInfo.nCurrentIp & 0x00ff0000) >> 16)
-                nip3 = ((mvcc_dev_info.SpecialInfo.stGigEInfo.nCurrentIp & 0x0000ff00) >> 8)
-                nip4 = (mvcc_dev_info.SpecialInfo.stGigEInfo.nCurrentIp & 0x000000ff)
-                # print("current ip: %d.%d.%d.%d\n" % (nip1, nip2, nip3, nip4))
-                name = "Gige["+str(i)+"]:"+str(nip1)+"."+str(nip2)+"."+str(nip3)+"."+str(nip4)
+                gige_info = mvcc_dev_info.SpecialInfo.stGigEInfo
+                strSerialNumber = decode_char_array(gige_info.chSerialNumber)
+
+                nip = gige_info.nCurrentIp
+                ip = f"{(nip >> 24) & 0xff}.{(nip >> 16) & 0xff}.{(nip >> 8) & 0xff}.{nip & 0xff}"
+                name = f"Gige[{i}]:{ip}"
                 devices[strSerialNumber] = name
             elif mvcc_dev_info.nTLayerType == MV_USB_DEVICE:
-                # print("\nu3v device: [%d]" % i)
-                strModeName = ""
-                for per in mvcc_dev_info.SpecialInfo.stUsb3VInfo.chModelName:
-                    if per == 0:
-                        break
-                    strModeName = strModeName + chr(per)
-                # print("device model name: %s" % strModeName)
-
-                strSerialNumber = ""
-                for per in mvcc_dev_info.SpecialInfo.stUsb3VInfo.chSerialNumber:
-                    if per == 0:
-                        break
-                    strSerialNumber = strSerialNumber + chr(per)
-                if strModeName.startswith("ac"):
-                    name = f"{strModeName}"
-                else:
-                    name = f"{strModeName}"
-                devices[strSerialNumber] = name
+                usb_info = mvcc_dev_info.SpecialInfo.stUsb3VInfo
+                strModeName = decode_char_array(usb_info.chModelName)
+                strSerialNumber = decode_char_array(usb_info.chSerialNumber)
+                devices[strSerialNumber] = strModeName
         return devices, list_devinfo
     
     def create_device(self):
         devices, devices_info = HIK.get_devices_and_list_devinfo()
+        if not devices:
+            devices, devices_info = HIK.get_devices_and_list_devinfo(refresh=True)
         if not devices:
             self._error = ERR_NOT_FOUND_DEVICE
             self._cap = None
@@ -89,6 +89,9 @@ class HIK(BaseCamera):
             return
 
         serinumber = self._config.get("id", 0)
+        if serinumber not in devices:
+            # Có thể camera vừa được cắm thêm, liệt kê lại một lần
+            devices, devices_info = HIK.get_devices_and_list_devinfo(refresh=True)
         sn_keys = list(devices.keys())
         if serinumber in devices:
             index = sn_keys.index(serinumber)
@@ -151,29 +154,167 @@ class HIK(BaseCamera):
         except:
             return False
         
+    def set_sensor(self, roi=None, binning=1, decimation=1) -> bool:
+        self._soft_sensor = None
+        if self._set_sensor_nodes(roi, binning, decimation):
+            return True
+
+        # Camera không hỗ trợ: về full frame rồi cắt bằng phần mềm.
+        # Chỉ báo lỗi khi không về được full frame (cắt phần mềm trên ảnh đã cắt sẽ sai)
+        if not self._set_sensor_nodes(None, 1, 1):
+            self._error = self._sensor_error or ERR_SENSOR_FAIL
+            return False
+        return BaseCamera.set_sensor(self, roi, binning, decimation)
+
+    def _get_int(self, name):
+        st_param = MVCC_INTVALUE()
+        memset(byref(st_param), 0, sizeof(MVCC_INTVALUE))
+        if self._cap.obj_cam.MV_CC_GetIntValue(name, st_param) != 0:
+            raise RuntimeError(f"Get {name} fail")
+        return st_param
+
+    def _set_sensor_nodes(self, roi, binning, decimation) -> bool:
+        self._sensor_error = ""
+        obj_cam = self._cap.obj_cam
+        try:
+            # Offset về 0 trước để Width/Height đặt được tới max
+            ok = obj_cam.MV_CC_SetIntValue("OffsetX", 0) == 0
+            ok &= obj_cam.MV_CC_SetIntValue("OffsetY", 0) == 0
+
+            for names, value in ((("BinningHorizontal", "BinningVertical"), binning),
+                                 (("DecimationHorizontal", "DecimationVertical"), decimation)):
+                for name in names:
+                    ret = obj_cam.MV_CC_SetEnumValue(name, int(value))
+                    # Camera không có node thì chỉ chấp nhận giá trị 1
+                    ok &= ret == 0 or int(value) == 1
+
+            # ROI theo toạ độ sensor đầy đủ, quy đổi sang toạ độ sau binning/decimation
+            factor = int(binning) * int(decimation)
+            width = self._get_int("Width")
+            height = self._get_int("Height")
+            if roi:
+                x, y, w, h = (int(v) // factor for v in roi)
+            else:
+                x, y, w, h = 0, 0, width.nMax, height.nMax
+            ok &= obj_cam.MV_CC_SetIntValue("Width", align_value(w, width.nInc, width.nMin, width.nMax)) == 0
+            ok &= obj_cam.MV_CC_SetIntValue("Height", align_value(h, height.nInc, height.nMin, height.nMax)) == 0
+
+            offset_x = self._get_int("OffsetX")
+            offset_y = self._get_int("OffsetY")
+            ok &= obj_cam.MV_CC_SetIntValue("OffsetX", align_value(x, offset_x.nInc, offset_x.nMin, offset_x.nMax)) == 0
+            ok &= obj_cam.MV_CC_SetIntValue("OffsetY", align_value(y, offset_y.nInc, offset_y.nMin, offset_y.nMax)) == 0
+
+            self._update_payload()
+            return ok
+        except Exception as ex:
+            # Chưa phải lỗi: set_sensor còn cách cắt bằng phần mềm
+            print("set sensor nodes failed: ", ex)
+            self._sensor_error = str(ex)
+            return False
+
+    def _update_payload(self):
+        # Kích thước frame thay đổi thì cấp phát lại buffer nhận của SDK
+        payload = self._get_int("PayloadSize").nCurValue
+        if payload != self._cap.n_payload_size or self._cap.buf_cache is None:
+            self._cap.n_payload_size = payload
+            self._cap.buf_cache = (c_ubyte * payload)()
+
+    def _set_trigger_node(self, ret) -> bool:
+        # Gọi thẳng SDK (CamOperation chỉ hiện messagebox khi lỗi), ret != 0 là lỗi.
+        # Không lưu vào _error: trigger_grab trả ERR_TRIGGER_FAIL cho lần chụp đó, các lần sau không bị ảnh hưởng
+        return ret == 0
+
+    def set_trigger_mode(self, enable: bool) -> bool:
+        obj_cam = self._cap.obj_cam
+        try:
+            if not self._set_trigger_node(obj_cam.MV_CC_SetEnumValue("TriggerMode", 1 if enable else 0)):
+                return False
+            # TriggerSource 7: software (trigger_once/software_trigger)
+            if enable and not self._set_trigger_node(obj_cam.MV_CC_SetEnumValue("TriggerSource", 7)):
+                return False
+            self._trigger_mode = enable
+            self._trigger_delay = None
+            return True
+        except Exception:
+            return False
+
+    def arm(self, delay_ms=0) -> bool:
+        if not self._trigger_mode:
+            return False
+        obj_cam = self._cap.obj_cam
+        try:
+            # Bỏ các frame cũ (chụp trước khi bật đèn) còn trong buffer của SDK
+            obj_cam.MV_CC_ClearImageBuffer()
+            if delay_ms != self._trigger_delay:
+                # Camera tự chờ đèn ổn định rồi mới phơi sáng (TriggerDelay tính bằng us)
+                if not self._set_trigger_node(obj_cam.MV_CC_SetFloatValue("TriggerDelay", float(delay_ms) * 1000)):
+                    return False
+                self._trigger_delay = delay_ms
+            return True
+        except Exception:
+            return False
+
+    def software_trigger(self) -> bool:
+        try:
+            return self._set_trigger_node(self._cap.obj_cam.MV_CC_SetCommandValue("TriggerSoftware"))
+        except Exception:
+            return False
+
+    def wait_frame(self, timeout=1000) -> tuple:
+        err, mat = self._grab(timeout)
+        if mat is None:
+            return ERR_TRIGGER_TIMEOUT, None
+        return err, mat
+
     def grab(self):
+        return self._grab(1000)
+
+    def _grab(self, timeout):
         _mat = None
 
-        ret = self._cap.obj_cam.MV_CC_GetOneFrameTimeout(byref(self._cap.buf_cache), self._cap.n_payload_size, self._stFrameInfo, 1000)
+        ret = self._cap.obj_cam.MV_CC_GetOneFrameTimeout(byref(self._cap.buf_cache), self._cap.n_payload_size, self._stFrameInfo, int(timeout))
         if ret == 0:
-            img_buff = None
+            # Chụp được thì xoá lỗi của lần trước
+            self._error = NO_ERROR
             self._cap.st_frame_info = self._stFrameInfo
-            self._cap.n_save_image_size = self._cap.st_frame_info.nWidth * self._cap.st_frame_info.nHeight * 3 + 2048
-            if img_buff is None:
-                img_buff = (c_ubyte * self._cap.n_save_image_size)()
-    
-            if PixelType_Gvsp_Mono8 == self._cap.st_frame_info.enPixelType:
-                _mat = CameraOperation.Mono_numpy(self._cap,self._cap.buf_cache,self._cap.st_frame_info.nWidth,self._cap.st_frame_info.nHeight)
-            
-            elif PixelType_Gvsp_BayerGB8 == self._cap.st_frame_info.enPixelType:
-                numArray = CameraOperation.Mono_numpy(self._cap,self._cap.buf_cache,self._cap.st_frame_info.nWidth,self._cap.st_frame_info.nHeight)
-                _mat = cv2.cvtColor(numArray,cv2.COLOR_BAYER_GB2RGB)
-            
-            elif PixelType_Gvsp_BayerRG8 == self._cap.st_frame_info.enPixelType:
-                numArray = CameraOperation.Mono_numpy(self._cap,self._cap.buf_cache,self._cap.st_frame_info.nWidth,self._cap.st_frame_info.nHeight)
-                _mat = cv2.cvtColor(numArray,cv2.COLOR_BAYER_RG2RGB)
-
-            elif PixelType_Gvsp_RGB8_Packed == self._cap.st_frame_info.enPixelType:
-                _mat = CameraOperation.Color_numpy(self._cap,self._cap.buf_cache,self._cap.st_frame_info.nWidth,self._cap.st_frame_info.nHeight)
+            width = self._stFrameInfo.nWidth
+            height = self._stFrameInfo.nHeight
+            pixel_type = self._stFrameInfo.enPixelType
+
+            if PixelType_Gvsp_Mono8 == pixel_type:
+                _mat = CameraOperation.Mono_numpy(self._cap, self._cap.buf_cache, width, height,
+                                                  out=self._pool.get((height, width, 1)))
+                self._pixel_format = PIXEL_MONO8
+
+            elif pixel_type in HIK.BAYER_FORMATS:
+                pixel_format = HIK.BAYER_FORMATS[pixel_type]
+                raw = np.frombuffer(self._cap.buf_cache, count=width * height, dtype=np.uint8).reshape(height, width)
+                if self.keep_raw():
+                    # Giữ frame Bayer 1 kênh, demosaic ở bước cần màu
+                    _mat = self._pool.get((height, width))
+                    np.copyto(_mat, raw)
+                    self._pixel_format = pixel_format
+                else:
+                    # Demosaic thẳng từ buffer của SDK vào mảng output dùng lại
+                    _mat = to_bgr(raw, pixel_format, dst=self._pool.get((height, width, 3)))
+                    self._pixel_format = PIXEL_BGR8
+
+            elif PixelType_Gvsp_RGB8_Packed == pixel_type:
+                _mat = CameraOperation.Color_numpy(self._cap, self._cap.buf_cache, width, height,
+                                                   out=self._pool.get((height, width, 3)))
+                self._pixel_format = PIXEL_BGR8
+
+            _mat = self.apply_soft_sensor(_mat)
+            info = self._stFrameInfo
+            self.set_frame_info(
+                frame_id=info.nFrameNum,
+                device_timestamp=(info.nDevTimeStampHigh << 32) | info.nDevTimeStampLow,
+                exposure_us=info.fExposureTime,
+                gain=info.fGain,
+                lost_packets=info.nLostPacket,
+            )
         
-        return self._error, _mat
\ No newline at end of file
+        return self._error, _mat
+
+
+HIK._device_cache = DeviceCache(HIK.enum_devices_and_list_devinfo, ttl=10.0)
@@ -0,0 +1,105 @@
+import cv2
+
+
+PIXEL_MONO8 = "Mono8"
+PIXEL_BGR8 = "BGR8"
+PIXEL_BAYER_RG8 = "BayerRG8"
+PIXEL_BAYER_GB8 = "BayerGB8"
+PIXEL_BAYER_GR8 = "BayerGR8"
+PIXEL_BAYER_BG8 = "BayerBG8"
+
+# Tên pattern GenICam (pixel trên cùng bên trái) -> mã OpenCV ra ảnh BGR/gray.
+# Tên mã Bayer của OpenCV lệch một pixel so với GenICam: RGGB -> COLOR_BAYER_BG2BGR.
+BAYER_BGR_CODES = {
+    PIXEL_BAYER_RG8: cv2.COLOR_BAYER_BG2BGR,
+    PIXEL_BAYER_GB8: cv2.COLOR_BAYER_GR2BGR,
+    PIXEL_BAYER_GR8: cv2.COLOR_BAYER_GB2BGR,
+    PIXEL_BAYER_BG8: cv2.COLOR_BAYER_RG2BGR,
+}
+BAYER_GRAY_CODES = {
+    PIXEL_BAYER_RG8: cv2.COLOR_BAYER_BG2GRAY,
+    PIXEL_BAYER_GB8: cv2.COLOR_BAYER_GR2GRAY,
+    PIXEL_BAYER_GR8: cv2.COLOR_BAYER_GB2GRAY,
+    PIXEL_BAYER_BG8: cv2.COLOR_BAYER_RG2GRAY,
+}
+# Vị trí (hàng, cột) của pixel R và B trong ô 2x2, dùng cho demosaic nửa độ phân giải
+BAYER_RB_OFFSETS = {
+    PIXEL_BAYER_RG8: ((0, 0), (1, 1)),
+    PIXEL_BAYER_GB8: ((1, 0), (0, 1)),
+    PIXEL_BAYER_GR8: ((0, 1), (1, 0)),
+    PIXEL_BAYER_BG8: ((1, 1), (0, 0)),
+}
+
+
+def is_bayer(pixel_format) -> bool:
+    return pixel_format in BAYER_BGR_CODES
+
+
+def is_mono(mat, pixel_format=None) -> bool:
+    if pixel_format is not None:
+        return pixel_format == PIXEL_MONO8
+    return mat.ndim == 2 or mat.shape[2] == 1
+
+
+def guess_pixel_format(mat) -> str:
+    """
+    Pixel format của ảnh không rõ nguồn (ảnh load từ file, ...): 1 kênh là Mono8, còn lại BGR8.
+    """
+    return PIXEL_MONO8 if is_mono(mat) else PIXEL_BGR8
+
+
+def to_bgr(mat, pixel_format=None, dst=None, copy=False):
+    """
+    Ảnh BGR 3 kênh cho bước cần màu (model AI, vẽ kết quả, ...).
+    BGR8 trả về nguyên ảnh, chỉ copy khi copy=True.
+    """
+    if mat is None:
+        return None
+    pixel_format = pixel_format or guess_pixel_format(mat)
+    if is_bayer(pixel_format):
+        return cv2.cvtColor(mat, BAYER_BGR_CODES[pixel_format], dst=dst)
+    if is_mono(mat, pixel_format):
+        return cv2.cvtColor(mat, cv2.COLOR_GRAY2BGR, dst=dst)
+    return mat.copy() if copy else mat
+
+
+def to_gray(mat, pixel_format=None):
+    """
+    Ảnh gray 1 kênh (H, W). Mono8 trả về view, Bayer chuyển thẳng sang gray không qua BGR.
+    """
+    if mat is None:
+        return None
+    pixel_format = pixel_format or guess_pixel_format(mat)
+    if is_bayer(pixel_format):
+        return cv2.cvtColor(mat, BAYER_GRAY_CODES[pixel_format])
+    if is_mono(mat, pixel_format):
+        return mat.reshape(mat.shape[:2])
+    return cv2.cvtColor(mat, cv2.COLOR_BGR2GRAY)
+
+
+def bayer_half(raw, pixel_format):
+    """
+    Demosaic nửa độ phân giải: mỗi ô 2x2 thành một pixel BGR (G là trung bình hai pixel G).
+    Rẻ hơn nhiều so với demosaic đầy đủ, đủ dùng cho hiển thị.
+    """
+    h, w = raw.shape[:2]
+    raw = raw[:h // 2 * 2, :w // 2 * 2]
+    (ry, rx), (by, bx) = BAYER_RB_OFFSETS[pixel_format]
+    r = raw[ry::2, rx::2]
+    b = raw[by::2, bx::2]
+    g = cv2.addWeighted(raw[ry::2, bx::2], 0.5, raw[by::2, rx::2], 0.5, 0)
+    return cv2.merge([b, g, r])
+
+
+def to_preview(mat, pixel_format=None, half=True):
+    """
+    Ảnh để hiển thị: Mono8 giữ 1 kênh, Bayer demosaic nửa độ phân giải (half=True), BGR8 giữ nguyên.
+    """
+    if mat is None:
+        return None
+    pixel_format = pixel_format or guess_pixel_format(mat)
+    if is_bayer(pixel_format):
+        return bayer_half(mat, pixel_format) if half else to_bgr(mat, pixel_format)
+    if is_mono(mat, pixel_format):
+        return mat.reshape(mat.shape[:2])
+    return mat
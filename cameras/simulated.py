@@ -0,0 +1,276 @@
+import sys
+import os
+import glob
+import time
+
+sys.path.append("cameras")
+from base_camera import *
+
+import cv2
+import yaml
+
+
+IMAGE_EXTS = (".bmp", ".png", ".jpg", ".jpeg", ".tif", ".tiff")
+VIDEO_EXTS = (".mp4", ".avi", ".mkv", ".mov")
+
+PIXEL_FORMATS = [PIXEL_BGR8, PIXEL_MONO8, PIXEL_BAYER_RG8]
+
+
+class SimulatedCamera(BaseCamera):
+    '''
+    Camera giả lập, dùng để test/benchmark luồng auto khi không có phần cứng.
+    Grab được giới hạn theo fps (0 = nhanh nhất có thể) và hỗ trợ software trigger.
+    Lớp con chỉ cần cài đặt _open_source, _close_source và _next_frame.
+    '''
+    def __init__(self, config=None) -> None:
+        self._fps = 0
+        self._next_time = 0.0
+        self._triggered = False
+        self._trigger_delay = 0
+        self._frame_count = 0
+        super().__init__(config=config)
+
+    def set_config(self, config):
+        print("Set camera config")
+        self._config = config
+        self.create_device()
+
+    def get_config(self):
+        return self._config
+
+    def get_error(self) -> str:
+        return self._error
+
+    def load_feature(self, feature_path):
+        '''
+        feature: yaml file (fps, width, height, pixel_format, loop, ...)
+        '''
+        feature = yaml.safe_load(open(feature_path, "r")) or {}
+        self._config = {**self._config, **feature}
+
+    def create_device(self):
+        if self._config is None:
+            self._error = ERR_CONFIG_IS_NONE
+            return
+        self._model_name = f"{type(self).__name__}_{self._config.get('id', '')}"
+        self._error = NO_ERROR
+
+    def open(self) -> bool:
+        self._error = NO_ERROR
+        try:
+            feature = self._config.get("feature", None)
+            if feature:
+                try:
+                    self.load_feature(feature)
+                except Exception as ex:
+                    self._error = f"{ERR_LOAD_FEATURE_FAIL}: {ex}"
+            self._fps = float(self._config.get("fps", 0))
+            self._frame_count = 0
+            return self._open_source()
+        except Exception as ex:
+            self._error = str(ex)
+            return False
+
+    def close(self) -> bool:
+        try:
+            self._close_source()
+            return True
+        except:
+            return False
+
+    def start_grabbing(self) -> bool:
+        self._next_time = time.perf_counter()
+        return True
+
+    def stop_grabbing(self) -> bool:
+        return True
+
+    def grab(self):
+        # Giữ đúng nhịp fps như camera thật
+        if self._fps > 0:
+            now = time.perf_counter()
+            if self._next_time > now:
+                time.sleep(self._next_time - now)
+            self._next_time = max(self._next_time + 1.0 / self._fps, time.perf_counter())
+        return self._read()
+
+    def _read(self):
+        _mat = self._next_frame()
+        if _mat is None:
+            self._error = ERR_GRAB_FAIL
+        else:
+            self._error = NO_ERROR
+            self._frame_count += 1
+            _mat = self.apply_soft_sensor(_mat)
+            self.set_frame_info(frame_id=self._frame_count)
+        return self._error, _mat
+
+    def set_trigger_mode(self, enable: bool) -> bool:
+        self._trigger_mode = enable
+        self._triggered = False
+        return True
+
+    def arm(self, delay_ms=0) -> bool:
+        if not self._trigger_mode:
+            return False
+        self._triggered = False
+        self._trigger_delay = delay_ms
+        return True
+
+    def software_trigger(self) -> bool:
+        if not self._trigger_mode:
+            return False
+        self._triggered = True
+        return True
+
+    def wait_frame(self, timeout=1000) -> tuple:
+        if not self._triggered:
+            return ERR_TRIGGER_TIMEOUT, None
+        self._triggered = False
+        # Giả lập trigger delay của camera
+        if self._trigger_delay > 0:
+            time.sleep(self._trigger_delay / 1000)
+        return self._read()
+
+    def _open_source(self) -> bool: ...
+
+    def _close_source(self): ...
+
+    def _next_frame(self): ...
+
+
+class Replay(SimulatedCamera):
+    '''
+    Phát lại thư mục ảnh hoặc file video như một camera.
+    config: id = đường dẫn thư mục/video, fps, loop (mặc định True), cache (giữ ảnh đã decode)
+    '''
+    SOURCE_DIR = "resources/cameras/Replay"
+
+    def __init__(self, config=None) -> None:
+        self._paths = []
+        self._frames = {}
+        self._video = None
+        self._index = 0
+        super().__init__(config=config)
+
+    def get_devices() -> dict:
+        devices = {}
+        if os.path.isdir(Replay.SOURCE_DIR):
+            for name in sorted(os.listdir(Replay.SOURCE_DIR)):
+                path = os.path.join(Replay.SOURCE_DIR, name)
+                if os.path.isdir(path) or name.lower().endswith(VIDEO_EXTS):
+                    devices[path] = name
+        return devices
+
+    def _open_source(self) -> bool:
+        source = str(self._config.get("id", ""))
+        self._index = 0
+        self._frames = {}
+        if os.path.isdir(source):
+            self._paths = sorted(p for p in glob.glob(os.path.join(source, "*")) if p.lower().endswith(IMAGE_EXTS))
+            if not self._paths:
+                self._error = ERR_NOT_FOUND_DEVICE
+                return False
+            return True
+
+        self._video = cv2.VideoCapture(source)
+        if not self._video.isOpened():
+            self._error = ERR_NOT_FOUND_DEVICE
+            return False
+        if not self._fps:
+            self._fps = self._video.get(cv2.CAP_PROP_FPS) or 0
+        return True
+
+    def _close_source(self):
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+        self._frames = {}
+
+    def _next_frame(self):
+        loop = self._config.get("loop", True)
+        if self._video is not None:
+            ret, mat = self._video.read()
+            if not ret and loop:
+                self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, mat = self._video.read()
+            self._pixel_format = PIXEL_BGR8
+            return mat if ret else None
+
+        if self._index >= len(self._paths):
+            if not loop:
+                return None
+            self._index = 0
+        path = self._paths[self._index]
+        self._index += 1
+
+        mat = self._frames.get(path)
+        if mat is None:
+            # Ảnh gray giữ 1 kênh như camera mono, ảnh màu về BGR
+            mat = cv2.imread(path, cv2.IMREAD_ANYCOLOR)
+            if self._config.get("cache", True) and mat is not None:
+                self._frames[path] = mat
+        if mat is not None:
+            self._pixel_format = guess_pixel_format(mat)
+        return mat
+
+
+class Synthetic(SimulatedCamera):
+    '''
+    Sinh frame ngẫu nhiên theo độ phân giải và pixel format cấu hình.
+    config: id = "WxH", pixel_format (BGR8, Mono8, BayerRG8), demosaic, fps
+    '''
+    RESOLUTIONS = ["1280x1024", "1920x1080", "2448x2048", "5472x3648"]
+
+    def __init__(self, config=None) -> None:
+        self._patterns = []
+        self._sensor_format = PIXEL_BGR8
+        self._pool = ArrayPool(size=4)
+        super().__init__(config=config)
+
+    def get_devices() -> dict:
+        return {res: f"Synthetic_{res}" for res in Synthetic.RESOLUTIONS}
+
+    def _open_source(self) -> bool:
+        width, height = (int(v) for v in str(self._config.get("id", "1280x1024")).lower().split("x"))
+        pixel_format = self._config.get("pixel_format", PIXEL_BGR8)
+        if pixel_format not in PIXEL_FORMATS:
+            self._error = f"Unsupported pixel format: {pixel_format}"
+            return False
+
+        # Vài frame mẫu sinh sẵn, grab chỉ copy/convert giống driver thật
+        rng = np.random.default_rng(int(self._config.get("seed", 0)))
+        self._patterns = []
+        for _ in range(int(self._config.get("patterns", 4))):
+            mat = cv2.resize(rng.integers(0, 256, (height // 16, width // 16, 3), dtype=np.uint8), (width, height))
+            if pixel_format == PIXEL_MONO8:
+                mat = cv2.cvtColor(mat, cv2.COLOR_BGR2GRAY)[..., None]
+            elif pixel_format == PIXEL_BAYER_RG8:
+                # Ảnh raw Bayer RGGB, grab sẽ demosaic như HIK (trừ khi demosaic=False)
+                raw = np.empty((height, width), np.uint8)
+                raw[0::2, 0::2] = mat[0::2, 0::2, 2]
+                raw[0::2, 1::2] = mat[0::2, 1::2, 1]
+                raw[1::2, 0::2] = mat[1::2, 0::2, 1]
+                raw[1::2, 1::2] = mat[1::2, 1::2, 0]
+                mat = raw
+            self._patterns.append(mat)
+        self._sensor_format = pixel_format
+        return True
+
+    def _close_source(self):
+        self._patterns = []
+        self._pool.clear()
+
+    def _next_frame(self):
+        if not self._patterns:
+            return None
+        src = self._patterns[self._frame_count % len(self._patterns)]
+        if self._sensor_format == PIXEL_BAYER_RG8 and not self.keep_raw():
+            height, width = src.shape
+            # Cùng chuyển đổi với HIK cho BayerRG8
+            self._pixel_format = PIXEL_BGR8
+            return to_bgr(src, PIXEL_BAYER_RG8, dst=self._pool.get((height, width, 3)))
+        self._pixel_format = self._sensor_format
+        out = self._pool.get(src.shape)
+        np.copyto(out, src)
+        return out
@@ -6,9 +6,19 @@ from pypylon import pylon, genicam
 
 
 class SODA(BaseCamera):
+    PIXEL_FORMATS = {
+        pylon.PixelType_Mono8: PIXEL_MONO8,
+        pylon.PixelType_BayerRG8: PIXEL_BAYER_RG8,
+        pylon.PixelType_BayerGB8: PIXEL_BAYER_GB8,
+        pylon.PixelType_BayerGR8: PIXEL_BAYER_GR8,
+        pylon.PixelType_BayerBG8: PIXEL_BAYER_BG8,
+        pylon.PixelType_BGR8packed: PIXEL_BGR8,
+    }
+
     def __init__(self, config=None) -> None:
         self._converter = None
         self._grab_result = None
+        self._trigger_delay = None
         super().__init__(config=config)
 
     def set_config(self, config):
@@ -22,7 +32,14 @@ class SODA(BaseCamera):
     def get_error(self) -> str:
         return self._error
     
-    def get_devices() -> dict:
+    def get_devices(refresh=False) -> dict:
+        # Liệt kê thiết bị được cache (TTL), tránh EnumerateDevices mỗi lần tạo camera
+        return SODA._device_cache.get(refresh)
+
+    def refresh_devices() -> dict:
+        return SODA.get_devices(refresh=True)
+
+    def enum_devices() -> dict:
         devs = {}
         devices = pylon.TlFactory.GetInstance().EnumerateDevices()
         for dev in devices:
@@ -45,6 +62,9 @@ class SODA(BaseCamera):
             return
 
         serinumber = self._config.get("id", 0)
+        if serinumber not in devices:
+            # Có thể camera vừa được cắm thêm, liệt kê lại một lần
+            devices = SODA.get_devices(refresh=True)
 
         if serinumber in devices:
             key = serinumber
@@ -118,16 +138,159 @@ class SODA(BaseCamera):
         except:
             return False
         
+    def set_sensor(self, roi=None, binning=1, decimation=1) -> bool:
+        self._soft_sensor = None
+        if self._set_sensor_nodes(roi, binning, decimation):
+            return True
+
+        # Camera không hỗ trợ: về full frame rồi cắt bằng phần mềm.
+        # Chỉ báo lỗi khi không về được full frame (cắt phần mềm trên ảnh đã cắt sẽ sai)
+        if not self._set_sensor_nodes(None, 1, 1):
+            self._error = self._sensor_error or ERR_SENSOR_FAIL
+            return False
+        return BaseCamera.set_sensor(self, roi, binning, decimation)
+
+    def _set_sensor_nodes(self, roi, binning, decimation) -> bool:
+        self._sensor_error = ""
+        node_map = self._cap.GetNodeMap()
+
+        def _node(name):
+            node = node_map.GetNode(name)
+            return node if node is not None and genicam.IsWritable(node) else None
+
+        try:
+            ok = True
+            # Offset về min trước để Width/Height đặt được tới max
+            for name in ("OffsetX", "OffsetY"):
+                node = _node(name)
+                if node is not None:
+                    node.SetValue(node.GetMin())
+
+            for names, value in ((("BinningHorizontal", "BinningVertical"), binning),
+                                 (("DecimationHorizontal", "DecimationVertical"), decimation)):
+                for name in names:
+                    node = _node(name)
+                    if node is None:
+                        # Camera không có node thì chỉ chấp nhận giá trị 1
+                        ok &= int(value) == 1
+                        continue
+                    node.SetValue(int(value))
+
+            # ROI theo toạ độ sensor đầy đủ, quy đổi sang toạ độ sau binning/decimation
+            width, height = _node("Width"), _node("Height")
+            if width is None or height is None:
+                return False
+            factor = int(binning) * int(decimation)
+            if roi:
+                x, y, w, h = (int(v) // factor for v in roi)
+            else:
+                x, y, w, h = 0, 0, width.GetMax(), height.GetMax()
+            width.SetValue(align_value(w, width.GetInc(), width.GetMin(), width.GetMax()))
+            height.SetValue(align_value(h, height.GetInc(), height.GetMin(), height.GetMax()))
+
+            for name, value in (("OffsetX", x), ("OffsetY", y)):
+                node = _node(name)
+                if node is None:
+                    ok &= value == 0
+                    continue
+                node.SetValue(align_value(value, node.GetInc(), node.GetMin(), node.GetMax()))
+            return ok
+        except Exception as ex:
+            # Chưa phải lỗi: set_sensor còn cách cắt bằng phần mềm
+            print("set sensor nodes failed: ", ex)
+            self._sensor_error = str(ex)
+            return False
+
+    def set_trigger_mode(self, enable: bool) -> bool:
+        try:
+            self._cap.TriggerSelector.SetValue("FrameStart")
+            self._cap.TriggerMode.SetValue("On" if enable else "Off")
+            if enable:
+                self._cap.TriggerSource.SetValue("Software")
+            self._trigger_mode = enable
+            self._trigger_delay = None
+            return True
+        except Exception:
+            return False
+
+    def arm(self, delay_ms=0) -> bool:
+        if not self._trigger_mode:
+            return False
+        try:
+            # Bỏ các frame cũ còn trong hàng đợi của pylon
+            while self._cap.NumReadyBuffers.GetValue() > 0:
+                result = self._cap.RetrieveResult(0, pylon.TimeoutHandling_Return)
+                if not result.IsValid():
+                    break
+                result.Release()
+
+            if delay_ms != self._trigger_delay:
+                # TriggerDelay (us), camera đời cũ dùng TriggerDelayAbs
+                node_map = self._cap.GetNodeMap()
+                for name in ("TriggerDelay", "TriggerDelayAbs"):
+                    node = node_map.GetNode(name)
+                    if node is not None and genicam.IsWritable(node):
+                        node.SetValue(float(delay_ms) * 1000)
+                        break
+                self._trigger_delay = delay_ms
+            return True
+        except Exception:
+            # Lỗi trigger chỉ làm hỏng lần chụp này (trigger_grab trả ERR_TRIGGER_FAIL), không lưu vào _error
+            return False
+
+    def software_trigger(self) -> bool:
+        try:
+            if self._cap.WaitForFrameTriggerReady(1000, pylon.TimeoutHandling_ThrowException):
+                self._cap.ExecuteSoftwareTrigger()
+                return True
+            return False
+        except Exception:
+            return False
+
+    def wait_frame(self, timeout=1000) -> tuple:
+        result = self._cap.RetrieveResult(int(timeout), pylon.TimeoutHandling_Return)
+        if not result.IsValid():
+            return ERR_TRIGGER_TIMEOUT, None
+        return self._convert(result)
+
     def grab(self):
+        return self._convert(self._cap.RetrieveResult(5000, pylon.TimeoutHandling_ThrowException))
+
+    def _chunk_value(self, name):
+        # Chỉ có khi bật chunk mode trong feature file, không thì 0
+        try:
+            node = getattr(self._grab_result, name)
+            return node.Value if genicam.IsReadable(node) else 0.0
+        except Exception:
+            return 0.0
+
+    def _convert(self, grab_result):
         _mat = None
-        self._grab_result = self._cap.RetrieveResult(5000, pylon.TimeoutHandling_ThrowException)
+        self._grab_result = grab_result
         if self._grab_result.GrabSucceeded():
-            if self._converter:
+            # Chụp được thì xoá lỗi của lần trước
+            self._error = NO_ERROR
+            pixel_format = SODA.PIXEL_FORMATS.get(self._grab_result.GetPixelType(), PIXEL_MONO8)
+            if self._converter and not (is_bayer(pixel_format) and self.keep_raw()):
                 image = self._converter.Convert(self._grab_result)
                 _mat = image.GetArray()
+                pixel_format = PIXEL_BGR8
             else:
+                # Mono8 hoặc Bayer thô (demosaic ở bước cần màu)
                 _mat = self._grab_result.Array
+            self._pixel_format = pixel_format
+            self.set_frame_info(
+                frame_id=self._grab_result.GetBlockID(),
+                device_timestamp=self._grab_result.GetTimeStamp(),
+                exposure_us=self._chunk_value("ChunkExposureTime"),
+                gain=self._chunk_value("ChunkGain"),
+                skipped=self._grab_result.GetNumberOfSkippedImages(),
+            )
+            _mat = self.apply_soft_sensor(_mat)
         else:
             self._error = ERR_GRAB_FAIL
         
-        return self._error, _mat
\ No newline at end of file
+        return self._error, _mat
+
+
+SODA._device_cache = DeviceCache(SODA.enum_devices, ttl=10.0)
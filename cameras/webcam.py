@@ -47,12 +47,14 @@ class Webcam(BaseCamera):
         else:
             key = None
 
+        # DirectShow chỉ có trên Windows
+        api = cv2.CAP_DSHOW if sys.platform == "win32" else cv2.CAP_ANY
         if key is not None:
             devInfo = devices[key]
-            self._cap = cv2.VideoCapture(devInfo, cv2.CAP_DSHOW)
+            self._cap = cv2.VideoCapture(devInfo, api)
             self._model_name = f"Webcam_{devInfo}"
         else:
-            self._cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
+            self._cap = cv2.VideoCapture(0, api)
             self._model_name = f"Webcam_0"
         
 
@@ -98,5 +100,9 @@ class Webcam(BaseCamera):
         ret, _mat = self._cap.read()
         if not ret:
             self._error = ERR_GRAB_FAIL
+        else:
+            # Webcam không có ROI/binning phía sensor, cắt bằng phần mềm
+            _mat = self.apply_soft_sensor(_mat)
+            self.set_frame_info()
         
         return self._error, _mat
\ No newline at end of file
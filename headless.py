@@ -0,0 +1,3 @@
+from libs.headless import main
+
+main()
@@ -0,0 +1,1343 @@
+import os
+import sys
+import copy
+import time
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import cv2 as cv
+import numpy as np
+
+from libs.constants import *
+from libs.logger import Logger
+from libs.utils import scan_dir, run_parallel
+from libs.processing import RESULT, processing_binary, put_text_dst
+from libs.vision import plot_results, BACKEND_TORCH, InferenceQueue
+from libs.model_registry import ModelRegistry
+from libs.inference_worker import InferenceWorker
+from libs.inference_pool import InferencePool
+from libs.auto_pipeline import PartContext, PipelineStage, AutoPipeline
+from libs.trigger_queue import TriggerQueue, TriggerEvent
+from libs.model_settings import ModelSettings, compile_settings
+from libs.database_lite import create_db, create_table, insert, FRAME_INFO_TABLE_SQL
+from libs.camera_thread import CameraThread
+from libs.camera_group import CameraGroup
+from libs.light_controller import LCPController, DCPController
+from libs.serial_controller import SerialController
+from libs.vision_controller import VisionController
+from libs.io_controller import IOController, OutPorts, PortState
+from libs.tcp_server import Server
+
+sys.path.append("cameras")
+from pixel_format import PIXEL_BGR8, is_bayer, to_bgr, to_gray
+
+
+# Trigger -> (loại part, bước đầu tiên)
+PART_TRIGGERS = {
+    TRIGGER_WEIGHT_AUTO: ("WEIGHT", STEP_PREPROCESS_WEIGHT_AUTO),
+    TRIGGER_OPTIC_AUTO: ("OPTIC", STEP_PREPROCESS_OPTIC_AUTO),
+    TRIGGER_UNITBOX_AUTO: ("UNITBOX", STEP_PREPROCESS_UNITBOX_AUTO),
+}
+
+# Bước đầu tiên của từng stage pipeline (acquire, process, output) theo loại part
+PART_STAGES = {
+    "WEIGHT": (STEP_PREPROCESS_WEIGHT_AUTO, STEP_PROCESSING_WEIGHT_AUTO, STEP_OUTPUT_WEIGHT_AUTO),
+    "OPTIC": (STEP_PREPROCESS_OPTIC_AUTO, STEP_PROCESSING_OPTIC_AUTO, STEP_OUTPUT_OPTIC_AUTO),
+    "UNITBOX": (STEP_PREPROCESS_UNITBOX_AUTO, STEP_PROCESSING_UNITBOX_AUTO, STEP_OUTPUT_UNITBOX_AUTO),
+}
+
+# Tên thiết bị khi mở song song (setup_loop_auto) -> thuộc tính của engine
+DEVICE_ATTRS = {
+    "camera1": "camera1",
+    "camera2": "camera2",
+    "light": "light_controller",
+    "weight": "weight_controller",
+    "vision_master": "vision_master_controller",
+    "scanner": "scanner_controller",
+    "out_com": "out_com_controller",
+    "io": "io_controller",
+    "server": "tcp_server",
+}
+
+
+class AutoEngine:
+    """
+    Luồng auto không phụ thuộc giao diện: sở hữu camera, các bộ điều khiển, model AI và các bước xử lý.
+    Kết quả và trạng thái được gửi qua các callback đã subscribe (ENGINE_* trong constants),
+    MainWindow chỉ là một subscriber, có thể chạy headless (headless.py) để chạy line hoặc benchmark.
+    Callback được gọi trên thread của engine, subscriber giao diện phải tự chuyển về thread UI (pyqtSignal).
+    """
+
+    def __init__(self, logger=None):
+        self.logger = logger if logger is not None else Logger(name="AutoEngine", log_file=LOG_DIR)
+        self._subscribers = {}
+        self._lock_subscribers = threading.Lock()
+
+        # Xác nhận kết quả NG (popup nhân viên), headless mặc định giữ NG
+        self.confirm_handler = None
+        self._lock_confirm = threading.Lock()
+
+        # Config của model đang chạy (dict gốc và bản đã biên dịch)
+        self.config = None
+        self.settings: ModelSettings = None
+        self.model_name = ""
+
+        # Camera
+        self.camera1 = None
+        self.camera2 = None
+        self.camera_group = None
+
+        # Controllers
+        self.light_controller = None
+        self.weight_controller = None
+        self.vision_master_controller = None
+        self.scanner_controller = None
+        self.out_com_controller = None
+        self.io_controller = None
+        self.tcp_server = None
+
+        # Thiết bị mở quá OPEN_DEVICE_TIMEOUT: bị bỏ khỏi lần chạy, đóng lại khi việc mở kết thúc
+        self._lock_devices = threading.Lock()
+        self._open_finished = set()
+        self._abandoned = {}
+
+        # Dữ liệu từ thiết bị
+        self.weight = None
+        self.dataVM = ""
+        self.list_code_sn = []
+
+        # Model AI, model_ai_pending: (YoloInference, model_path) đã load xong, chờ đổi giữa hai part
+        self.model_ai = None
+        self.model_ai_pending = None
+        self._lock_model_ai = threading.Lock()
+        self.inference_worker = None
+        self.inference_queue = None
+        self.inference_pool = None
+        self.max_pending_optic = 2
+        self.pending_optic = deque()
+
+        # Luồng auto
+        self.auto_events = TriggerQueue()
+        self.auto_steps = {}
+        self.b_stop_auto = True
+
+        # Chế độ pipeline (modules.pipeline.enable), None thì chạy tuần tự trên luồng auto
+        self.pipeline = None
+
+        # Thống kê
+        self.t_started = 0.0
+        self.counters = {}
+        self.latency = deque(maxlen=1000)
+        self._lock_counters = threading.Lock()
+
+    def subscribe(self, event, callback):
+        """
+        Đăng ký callback cho một sự kiện ENGINE_*, tham số của callback theo từng sự kiện.
+        """
+        with self._lock_subscribers:
+            self._subscribers.setdefault(event, []).append(callback)
+
+    def unsubscribe(self, event, callback):
+        with self._lock_subscribers:
+            callbacks = self._subscribers.get(event, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def emit(self, event, *args):
+        with self._lock_subscribers:
+            callbacks = list(self._subscribers.get(event, []))
+        for callback in callbacks:
+            try:
+                callback(*args)
+            except Exception as e:
+                self.logger.error(f"Engine callback {event} error: {str(e)}")
+
+    @property
+    def is_running(self):
+        return not self.b_stop_auto
+
+    def start(self, config, model_name: str):
+        """
+        Khởi tạo thiết bị theo config của model, mở song song rồi chạy luồng auto (không chặn).
+        config: ModelSettings (load_settings) hoặc config dict, dict được biên dịch ở đây (ValueError nếu sai).
+        """
+        if not isinstance(config, ModelSettings):
+            config = compile_settings(config, model_name)
+        self.settings = config
+        # ModelSettings dùng chung qua cache của load_settings: engine làm việc trên bản sao dict của riêng nó
+        self.config = copy.deepcopy(config.config)
+        self.model_name = model_name
+
+        self.create_devices(self.config)
+
+        # Set initial states
+        self.auto_events = TriggerQueue(
+            maxsize=config.trigger.queue_size,
+            dedup_ms=config.trigger.dedup_ms,
+            overflow=config.trigger.overflow,
+        )
+        self.b_stop_auto = False
+        self.pipeline = None
+        self.weight = config.weight.value
+        self.t_started = time.time()
+        self.counters = {}
+        self.latency.clear()
+
+        threading.Thread(target=self.setup_loop_auto, daemon=True).start()
+
+    def stop(self):
+        """
+        Dừng luồng auto, các trigger chưa xử lý bị bỏ.
+        """
+        self.b_stop_auto = True
+        self.clear_auto_triggers()
+        self.auto_events.put_event(EVENT_STOP_AUTO)
+
+    def finish(self):
+        """
+        Dừng sau khi chạy xong chu kỳ hiện tại (kết quả cuối vẫn được output và ghi log).
+        """
+        self.auto_events.put_event(EVENT_STOP_AUTO)
+
+    def release(self):
+        """
+        Tắt output IO và đóng tất cả thiết bị của engine.
+        """
+        if self.io_controller is not None:
+            for port in (OutPorts.Out_1, OutPorts.Out_2, OutPorts.Out_3):
+                self.io_controller.write_out(port, PortState.Off)
+                time.sleep(0.05)
+
+        if self.camera_group is not None:
+            self.camera_group.shutdown()
+            self.camera_group = None
+        for name in ("camera1", "camera2"):
+            camera = getattr(self, name)
+            if camera is not None:
+                camera.close_camera()
+                setattr(self, name, None)
+
+        for name in ("light_controller", "weight_controller", "vision_master_controller",
+                     "scanner_controller", "out_com_controller", "io_controller"):
+            controller = getattr(self, name)
+            if controller is not None:
+                try:
+                    controller.close()
+                except Exception as e:
+                    self.logger.error(f"Error close {name}: {str(e)}")
+                setattr(self, name, None)
+
+        if self.tcp_server is not None:
+            self.tcp_server.stop()
+            self.tcp_server = None
+
+        self.list_code_sn = []
+
+    def stats(self) -> dict:
+        """
+        Số kết quả theo step/kết quả và throughput (part/s) từ lúc start, độ trễ trigger -> kết quả (ms),
+        thống kê hàng đợi trigger, chế độ pipeline thêm thống kê từng stage.
+        """
+        elapsed = time.time() - self.t_started if self.t_started else 0.0
+        with self._lock_counters:
+            counters = dict(self.counters)
+            latency = list(self.latency)
+        total = sum(counters.values())
+        stats = {
+            "elapsed_s": elapsed,
+            "parts": total,
+            "parts_per_s": total / elapsed if elapsed > 0 else 0.0,
+            "results": {f"{step}/{result}": n for (step, result), n in counters.items()},
+            "latency_ms": {
+                "avg": float(np.mean(latency)) if latency else 0.0,
+                "p95": float(np.percentile(latency, 95)) if latency else 0.0,
+                "max": float(np.max(latency)) if latency else 0.0,
+            },
+            "triggers": self.auto_events.stats(),
+        }
+        if self.camera_group is not None:
+            stats["capture"] = self.camera_group.stats()
+        if self.pipeline is not None:
+            stats["pipeline"] = self.pipeline.stats()
+        return stats
+
+    def create_camera(self, camera_type, camera_id, camera_feature):
+        if camera_type == "Webcam":
+            return CameraThread(camera_type, {"id": camera_id, "feature": camera_feature,}, logger=self.logger)
+        elif camera_type in ("HIK", "SODA"):
+            return CameraThread(
+                camera_type,
+                {
+                    "id": camera_id,
+                    "feature": f"resources/cameras/{camera_type}/{camera_feature}.ini",
+                },
+                logger=self.logger,
+            )
+        elif camera_type in ("Replay", "Synthetic"):
+            # Camera giả lập (thư mục ảnh/video hoặc frame sinh ngẫu nhiên), feature là file yaml
+            return CameraThread(
+                camera_type,
+                {
+                    "id": camera_id,
+                    "feature": f"resources/cameras/{camera_type}/{camera_feature}.yaml" if camera_feature else "",
+                },
+                logger=self.logger,
+            )
+        # Mặc định sử dụng Webcam
+        self.logger.warning(f"Loại camera {camera_type} không được hỗ trợ, sử dụng Webcam mặc định")
+        return CameraThread("Webcam", {"id": "0", "feature": ""}, logger=self.logger)
+
+    def create_devices(self, config: dict):
+        """
+        Tạo camera và các bộ điều khiển theo config của model (chưa mở kết nối).
+        """
+        modules = config["modules"]
+
+        try:
+            for name in ("camera1", "camera2"):
+                camera_config = modules["camera_config"][name]
+                device = camera_config["device"]
+                self.logger.info(f"Khởi tạo {name}: Type={device['type']}, ID={device['id']}, Feature={device['feature']}")
+                camera = self.create_camera(device["type"], device["id"], device["feature"])
+                # ROI/binning/decimation phía sensor theo model, áp dụng khi mở camera
+                camera.set_sensor(camera_config.get("sensor"))
+                camera.cameraStatus.connect(self.logger.warning)
+                setattr(self, name, camera)
+        except Exception as e:
+            self.logger.error(f"Lỗi khi khởi tạo camera: {str(e)}")
+
+        try:
+            lighting = modules["lighting"]
+            com_port, baud_rate = lighting["comport_light"], int(lighting["baudrate_light"])
+            self.logger.info(f"Khởi tạo lighting: Controller={lighting['controller_light']}, COM={com_port}, Baud={baud_rate}")
+            if lighting["controller_light"] == "LCP":
+                self.light_controller = LCPController(com=com_port, baud=baud_rate)
+            else:
+                self.light_controller = DCPController(com=com_port, baud=baud_rate)
+        except Exception as e:
+            self.logger.error(f"Lỗi khi khởi tạo lighting: {str(e)}")
+
+        try:
+            weight = modules["weight"]
+            self.logger.info(f"Khởi tạo Weight: COM={weight['comport_weight']}, Baud={weight['baudrate_weight']}")
+            self.weight_controller = SerialController(com=weight["comport_weight"], baud=int(weight["baudrate_weight"]))
+        except Exception as e:
+            self.logger.error(f"Lỗi khi khởi tạo weight: {str(e)}")
+
+        try:
+            vision_master = modules["vision_master"]
+            self.logger.info(f"Khởi tạo Vision Master: COM={vision_master['comport_vision_master']}, Baud={vision_master['baudrate_vision_master']}")
+            self.vision_master_controller = VisionController(
+                com=vision_master["comport_vision_master"],
+                baud=int(vision_master["baudrate_vision_master"]),
+                strTrigger=vision_master["string_trigger"],
+            )
+        except Exception as e:
+            self.logger.error(f"Lỗi khi khởi tạo vision master: {str(e)}")
+
+        try:
+            scanner = modules["scanner"]
+            self.logger.info(f"Khởi tạo Scanner: COM={scanner['comport_scanner']}, Baud={scanner['baudrate_scanner']}")
+            self.scanner_controller = SerialController(com=scanner["comport_scanner"], baud=int(scanner["baudrate_scanner"]))
+        except Exception as e:
+            self.logger.error(f"Lỗi khi khởi tạo Scanner: {str(e)}")
+
+        try:
+            out_com = modules["out_com"]
+            self.logger.info(f"Khởi tạo Out COM: COM={out_com['comport_out_com']}, Baud={out_com['baudrate_out_com']}")
+            self.out_com_controller = SerialController(com=out_com["comport_out_com"], baud=int(out_com["baudrate_out_com"]))
+        except Exception as e:
+            self.logger.error(f"Lỗi khi khởi tạo Out COM: {str(e)}")
+
+        try:
+            io = modules["io"]
+            self.logger.info(f"Khởi tạo IO: COM={io['comport_io']}, Baud={io['baudrate_io']}")
+            self.io_controller = IOController(com=io["comport_io"], baud=int(io["baudrate_io"]))
+        except Exception as e:
+            self.logger.error(f"Lỗi khi khởi tạo io: {str(e)}")
+
+        try:
+            server = modules["server"]
+            self.logger.info(f"Khởi tạo server: Host={server['host']}, Port={server['port']}")
+            self.tcp_server = Server(host=server["host"], port=int(server["port"]), logger=self.logger)
+        except Exception as e:
+            self.logger.error(f"Lỗi khi khởi tạo server: {str(e)}")
+
+    def init_model_ai(self, model_path, backend=BACKEND_TORCH):
+        try:
+            self.logger.info(f"Khởi tạo model AI: Path={model_path}, Backend={backend}")
+
+            # Lấy model từ registry (đã load và warm-up thì dùng lại ngay)
+            self.model_ai = ModelRegistry.instance().get(
+                model_path=f"resources/models_ai/{model_path}.pt",
+                label=LABEL_CONFIG_PATH,
+                backend=backend,
+            )
+            return True
+        except Exception as e:
+            self.logger.error(f"Lỗi khi khởi tạo Model AI: {str(e)}")
+            return False
+
+    def swap_model_ai(self, model_path, backend=None):
+        """
+        Hot swap model AI khi đang chạy: load ở background qua registry (không chặn luồng auto),
+        luồng auto đổi sang model mới giữa hai part (apply_model_ai_swap).
+        """
+        if backend is None:
+            backend = self.settings.model_ai.backend
+        self.logger.info(f"Load model AI ở background: Path={model_path}, Backend={backend}")
+
+        def _loaded(model_ai):
+            with self._lock_model_ai:
+                self.model_ai_pending = (model_ai, model_path)
+            # Đánh thức luồng auto đang chờ trigger để đổi model ngay
+            self.auto_events.put_event(EVENT_MODEL_SWAP_AUTO)
+
+        future = ModelRegistry.instance().get_async(
+            model_path=f"resources/models_ai/{model_path}.pt",
+            label=LABEL_CONFIG_PATH,
+            backend=backend,
+            callback=_loaded,
+        )
+        future.add_done_callback(
+            lambda f: f.exception() and self.logger.error(f"Lỗi khi load model AI {model_path}: {f.exception()}")
+        )
+        return future
+
+    def apply_model_ai_swap(self):
+        """
+        Gọi trên luồng auto trước khi nhận part mới: part đã gửi detect vẫn dùng model cũ.
+        """
+        with self._lock_model_ai:
+            pending, self.model_ai_pending = self.model_ai_pending, None
+        if pending is None:
+            return
+        model_ai, model_path = pending
+        self.model_ai = model_ai
+        if self.inference_queue is not None:
+            self.inference_queue.yolo = model_ai
+        if self.inference_pool is not None:
+            # Replica chạy ở tiến trình riêng, load model mới ở lần start sau
+            self.logger.warning(f"Inference pool replicas keep the previous model until restart: {model_path}")
+        self.logger.info(f"Đã chuyển model AI auto sang: {model_path}")
+
+    def setup_loop_auto(self):
+        # Mở tất cả thiết bị song song, chung một timeout, báo kết quả theo từng thiết bị
+        with self._lock_devices:
+            self._open_finished.clear()
+        tasks = {}
+        if self.camera1 is not None and self.camera2 is not None:
+            self.camera_group = CameraGroup({"camera1": self.camera1, "camera2": self.camera2},
+                                            tolerance_ms=self.settings.capture.tolerance_ms)
+            tasks["camera1"] = lambda: self.open_camera_auto("camera1")
+            tasks["camera2"] = lambda: self.open_camera_auto("camera2")
+        if self.light_controller is not None:
+            tasks["light"] = self.open_light_auto
+        if self.weight_controller is not None:
+            tasks["weight"] = self.open_weight_controller_auto
+        if self.vision_master_controller is not None:
+            tasks["vision_master"] = self.open_vision_master_controller_auto
+        if self.scanner_controller is not None:
+            tasks["scanner"] = self.open_scanner_controller_auto
+        if self.out_com_controller is not None:
+            tasks["out_com"] = self.open_out_com_controller_auto
+        if self.io_controller is not None:
+            tasks["io"] = self.open_io_controller_auto
+        if self.tcp_server is not None:
+            tasks["server"] = self.connect_server_auto
+
+        results = run_parallel(tasks, timeout=OPEN_DEVICE_TIMEOUT, on_done=self.report_open_device)
+        for name, (ok, elapsed, error) in results.items():
+            if error == "timeout":
+                # Việc mở vẫn chạy nền: không dùng thiết bị này trong lần chạy, tránh luồng auto dùng chung
+                self.logger.error(f"Open {name} timeout after {elapsed:.2f}s, {name} is disabled")
+                self.abandon_device(name)
+                self.emit(ENGINE_DEVICE, name, False, elapsed, error)
+
+        threading.Thread(target=self.loop_auto, daemon=True).start()
+
+    def abandon_device(self, name):
+        """
+        Bỏ thiết bị mở quá thời gian khỏi engine, thiết bị được đóng khi việc mở kết thúc.
+        """
+        attr = DEVICE_ATTRS[name]
+        with self._lock_devices:
+            device = getattr(self, attr)
+            setattr(self, attr, None)
+            if device is None:
+                return
+            if name not in self._open_finished:
+                self._abandoned[name] = device
+                return
+        self.close_device(name, device)
+
+    def close_device(self, name, device):
+        try:
+            if name in ("camera1", "camera2"):
+                device.close_camera()
+            elif name == "server":
+                device.stop()
+            else:
+                device.close()
+        except Exception as e:
+            self.logger.error(f"Error close {name}: {str(e)}")
+
+    def report_open_device(self, name, ok, elapsed, error):
+        with self._lock_devices:
+            self._open_finished.add(name)
+            device = self._abandoned.pop(name, None)
+        if device is not None:
+            self.logger.warning(f"{name} finished opening after timeout ({elapsed:.2f}s), closed")
+            self.close_device(name, device)
+            return
+
+        if ok:
+            self.logger.info(f"Opened {name} in {elapsed:.2f}s")
+        else:
+            self.logger.error(f"Failed to open {name} ({elapsed:.2f}s): {error}")
+        self.emit(ENGINE_DEVICE, name, ok, elapsed, error)
+
+    def open_camera_auto(self, name):
+        camera = self.camera_group.cameras[name]
+        camera.open_camera()
+        if not camera.b_open:
+            raise RuntimeError(camera.camera.get_error() or "open camera failed")
+
+        # Chế độ auto chụp theo software trigger, không lấy frame free-run cũ
+        if not camera.set_trigger_mode(True):
+            self.logger.warning(f"{name} does not support trigger mode, use free-run grab")
+
+    def open_light_auto(self):
+        return self.light_controller.open()
+
+    def open_weight_controller_auto(self):
+        ok = self.weight_controller.open()
+        self.weight_controller.dataReceived.connect(self.wait_weight_received_from_weight_controller)
+        return ok
+
+    def wait_weight_received_from_weight_controller(self, data):
+        try:
+            # Nếu có tiền tố ST/US
+            if ',' in data:
+                status, raw_weight = data.split(',', 1)
+            else:
+                status = 'UNKNOWN'
+                raw_weight = data
+
+            # Loại bỏ đơn vị (kg, g, ...)
+            for unit in ['kg', 'g', 'lb']:
+                if unit in raw_weight:
+                    raw_weight = raw_weight.replace(unit, '').strip()
+                    break
+
+            # Loại bỏ dấu + nếu có
+            weight = float(raw_weight.replace('+', '').strip())
+
+            self.logger.info(f"[{status}] Trọng lượng: {weight}")
+
+            self.weight = weight
+            self.emit(ENGINE_WEIGHT, weight, self.check_weight(weight))
+        except Exception as e:
+            self.logger.error(f"Lỗi xử lý chuỗi value weight: {e}")
+
+    def check_weight(self, weight):
+        return self.settings.weight.min < weight < self.settings.weight.max
+
+    def open_vision_master_controller_auto(self):
+        ok = self.vision_master_controller.open()
+        self.vision_master_controller.dataReceived.connect(self.wait_data_received_from_vision_master_controller)
+        return ok
+
+    def wait_data_received_from_vision_master_controller(self, data):
+        try:
+            dataVM = [item for item in data.split(";") if len(item) ==  14]
+            self.dataVM = ';'.join(dataVM)
+        except Exception as e:
+            self.logger.error(f"Lỗi xử lý chuỗi value vision master: {e}")
+
+    def open_scanner_controller_auto(self):
+        ok = self.scanner_controller.open()
+        self.scanner_controller.dataReceived.connect(self.wait_data_received_from_scanner_controller)
+        return ok
+
+    def wait_data_received_from_scanner_controller(self, data):
+        try:
+            if data == "Check Weight":
+                self.post_auto_trigger(TRIGGER_WEIGHT_AUTO, "scanner")
+            elif data == "Check Optic":
+                self.post_auto_trigger(TRIGGER_OPTIC_AUTO, "scanner")
+            elif data == "Check UnitBox":
+                self.post_auto_trigger(TRIGGER_UNITBOX_AUTO, "scanner")
+            elif len(data) >= 10:
+                self.list_code_sn.append(data)
+                self.emit(ENGINE_CODE_SN, list(self.list_code_sn))
+        except Exception as e:
+            self.logger.error(f"Lỗi xử lý chuỗi value scanner: {e}")
+
+    def clear_code_sn(self):
+        self.list_code_sn = []
+
+    def get_code_sn(self, n=1):
+        """
+        n code SN quét gần nhất (mới nhất đứng trước), nối bằng ", ".
+        """
+        if len(self.list_code_sn) == 0:
+            return "List Code SN is Empty"
+        return ', '.join(str(code) for code in self.list_code_sn[-n:][::-1])
+
+    def open_out_com_controller_auto(self):
+        return self.out_com_controller.open()
+
+    def open_io_controller_auto(self):
+        ok = self.io_controller.open()
+        self.io_controller.write_out(OutPorts.Out_1, PortState.On)
+        self.io_controller.inputSignal.connect(self.wait_data_received_from_io_controller)
+        return ok
+
+    def wait_data_received_from_io_controller(self, commands, states):
+        for command, state in zip(commands, states):
+            if command == 'In_1' and state == PortState.On:
+                self.post_auto_trigger(TRIGGER_WEIGHT_AUTO, "io")
+            elif command == 'In_2' and state == PortState.On:
+                self.post_auto_trigger(TRIGGER_OPTIC_AUTO, "io")
+            elif command == 'In_3' and state == PortState.On:
+                self.post_auto_trigger(TRIGGER_UNITBOX_AUTO, "io")
+
+    def connect_server_auto(self):
+        self.tcp_server.start()
+        self.tcp_server.dataReceived.connect(self.wait_data_received_from_client)
+
+    def wait_data_received_from_client(self, host, address, data):
+        if data == "Check Weight":
+            self.post_auto_trigger(TRIGGER_WEIGHT_AUTO, "tcp")
+        elif data == "Check Optic":
+            self.post_auto_trigger(TRIGGER_OPTIC_AUTO, "tcp")
+        elif data == "Check UnitBox":
+            self.post_auto_trigger(TRIGGER_UNITBOX_AUTO, "tcp")
+
+    def loop_auto(self):
+        # Hàng đợi của lần chạy này, lần start sau tạo hàng đợi mới
+        events = self.auto_events
+        settings = self.settings
+
+        # Initialize model AI only once
+        model_path = settings.model_ai.model_path
+        backend = settings.model_ai.backend
+        with self._lock_model_ai:
+            self.model_ai_pending = None
+        if not self.init_model_ai(model_path, backend):
+            self.logger.error(f"Failed to initialize model AI: {model_path}")
+            self.b_stop_auto = True
+            self.emit(ENGINE_STOPPED)
+            return
+
+        # Inference chạy trên thread riêng để luồng auto không bị chặn bởi predict
+        self.pending_optic.clear()
+        self.inference_worker = InferenceWorker(max_queue=2)
+        self.max_pending_optic = self.inference_worker.max_queue
+
+        # Tuỳ chọn: nhiều tiến trình replica để dùng hết các core CPU
+        replicas = settings.model_ai.replicas
+        if replicas > 1:
+            try:
+                self.inference_pool = InferencePool(
+                    model_path=f"resources/models_ai/{model_path}.pt",
+                    label=LABEL_CONFIG_PATH,
+                    backend=backend,
+                    n_replicas=replicas,
+                )
+                self.max_pending_optic = self.inference_pool.capacity
+                self.logger.info(f"Inference pool: {replicas} replicas")
+            except Exception as e:
+                self.inference_pool = None
+                self.logger.warning(f"Failed to start inference pool, use single worker: {str(e)}")
+
+        # Một tiến trình với detect_batch: các frame optic đang chờ được gom thành một lần predict
+        if self.inference_pool is None and settings.model_ai.detect_method == "detect_batch":
+            self.inference_queue = InferenceQueue(self.model_ai, max_batch=self.max_pending_optic,
+                                                  method="detect_multi_batch")
+
+        # Mỗi bước ghi bước kế tiếp vào ctx.step của part, các bước được nối liền không sleep
+        self.auto_steps = {
+            STEP_PREPROCESS_WEIGHT_AUTO: self.handle_preprocess_weight_auto,
+            STEP_PROCESSING_WEIGHT_AUTO: self.handle_processing_weight_auto,
+            STEP_OUTPUT_WEIGHT_AUTO: self.handle_output_weight_auto,
+            STEP_PREPROCESS_OPTIC_AUTO: self.handle_preprocess_optic_auto,
+            STEP_PROCESSING_OPTIC_AUTO: self.handle_processing_optic_auto,
+            STEP_OUTPUT_OPTIC_AUTO: self.handle_output_optic_auto,
+            STEP_PREPROCESS_UNITBOX_AUTO: self.handle_preprocess_unitbox_auto,
+            STEP_PROCESSING_UNITBOX_AUTO: self.handle_processing_unitbox_auto,
+            STEP_OUTPUT_UNITBOX_AUTO: self.handle_output_unitbox_auto,
+            STEP_RELEASE_AUTO: lambda ctx, settings: self.handle_release_auto(ctx),
+        }
+
+        # Pipeline: chụp / xử lý / output chạy trên các worker riêng, mỗi part một context
+        if settings.pipeline.enable:
+            queue_size = settings.pipeline.queue_size
+            self.pipeline = AutoPipeline([
+                PipelineStage("acquire", lambda ctx: self.run_part_stage(ctx, 0, settings), queue_size, self.logger),
+                PipelineStage("process", lambda ctx: self.run_part_stage(ctx, 1, settings), queue_size, self.logger),
+                PipelineStage("output", lambda ctx: self.run_part_stage(ctx, 2, settings), queue_size, self.logger),
+            ])
+            self.pipeline.start()
+            self.logger.info(f"Auto pipeline: queue size {queue_size}")
+
+        self.emit(ENGINE_STARTED)
+
+        while True:
+            # Chờ sự kiện (trigger, optic detect xong, stop), không polling
+            # Worker đầy thì để trigger optic lại trong hàng đợi cho tới khi có chỗ (backpressure)
+            optic_full = self.pipeline is None and len(self.pending_optic) >= self.max_pending_optic
+            # Có part optic đang detect thì chỉ chờ tới hạn INFERENCE_TIMEOUT của part đầu tiên
+            timeout = None
+            if self.pending_optic:
+                timeout = max(0.0, INFERENCE_TIMEOUT - self.pending_optic[0].age_ms() / 1000)
+            item = events.get(timeout=timeout, skip=(TRIGGER_OPTIC_AUTO,) if optic_full else ())
+            # Model AI mới load xong thì đổi ở đây, giữa hai part
+            self.apply_model_ai_swap()
+            if item is None:
+                # Replica treo, không có kết quả: bỏ part (timeout ở bước processing) để không chặn trigger
+                self.run_auto_steps(self.pending_optic.popleft(), settings)
+                continue
+
+            if item.event == EVENT_MODEL_SWAP_AUTO:
+                continue
+
+            # Kiểm tra nếu đã bị dừng
+            if item.event == EVENT_STOP_AUTO or self.b_stop_auto:
+                # finish(): các part đã nhận vẫn chạy hết pipeline, stop(): các stage bỏ part còn lại
+                if self.pipeline is not None:
+                    self.pipeline.close()
+                # finish(): các part optic đang detect vẫn được xử lý, output và ghi log trước khi dừng worker
+                while self.pending_optic and not self.b_stop_auto:
+                    self.run_auto_steps(self.pending_optic.popleft(), settings)
+                self.inference_worker.stop()
+                if self.inference_queue is not None:
+                    self.inference_queue.stop()
+                    self.inference_queue = None
+                if self.inference_pool is not None:
+                    self.inference_pool.close()
+                    self.inference_pool = None
+                self.pending_optic.clear()
+                self.b_stop_auto = True
+                self.logger.debug(f"Auto thread stopped, triggers: {events.stats()}")
+                for name in ("camera1", "camera2"):
+                    camera = getattr(self, name)
+                    if camera is not None:
+                        self.logger.debug(f"{name} frame pool: {camera.stats().get('pool')}")
+                break
+
+            self.handle_auto_event(item, settings)
+
+        self.emit(ENGINE_STOPPED)
+
+    def post_auto_trigger(self, trigger, source="software"):
+        """
+        Gọi từ IO/scanner/TCP/UI (thread bất kỳ): đưa trigger vào hàng đợi và đánh thức luồng auto.
+        Trả về False nếu trigger bị bỏ (trùng trong dedup_ms hoặc hàng đợi đầy).
+        """
+        accepted, dropped = self.auto_events.put(trigger, source)
+        if dropped is not None:
+            self.logger.warning(f"Trigger queue full, drop {dropped.event} from {dropped.source}")
+        return accepted
+
+    def clear_auto_triggers(self):
+        """
+        Bỏ các trigger đang chờ, giữ lại sự kiện stop và kết quả optic.
+        """
+        n = self.auto_events.clear_triggers()
+        if n > 0:
+            self.logger.warning(f"Clear {n} waiting triggers")
+
+    def new_part(self, item: TriggerEvent) -> PartContext:
+        kind, step = PART_TRIGGERS[item.event]
+        return PartContext(kind, step, source=item.source, t_trigger=item.timestamp)
+
+    def run_auto_steps(self, ctx: PartContext, settings, until=STEP_WAIT_TRIGGER_AUTO):
+        """
+        Chạy liên tiếp các bước của part cho tới bước until hoặc khi part quay về bước chờ trigger.
+        """
+        while ctx.step not in (STEP_WAIT_TRIGGER_AUTO, until) and not self.b_stop_auto:
+            self.auto_steps[ctx.step](ctx, settings)
+
+    def run_part_stage(self, ctx: PartContext, index, settings):
+        """
+        Stage index của pipeline: chạy các bước của part tới bước đầu của stage kế tiếp.
+        Trả về False nếu part bị lỗi (đã quay về bước chờ trigger) hoặc engine đã dừng.
+        """
+        stage_steps = PART_STAGES[ctx.kind]
+        until = stage_steps[index + 1] if index + 1 < len(stage_steps) else STEP_WAIT_TRIGGER_AUTO
+        self.run_auto_steps(ctx, settings, until)
+        return ctx.step == until and not ctx.failed and not self.b_stop_auto
+
+    def abort_part(self, ctx: PartContext):
+        """
+        Part bị lỗi: quay lại bước chờ trigger, chế độ tuần tự bỏ luôn các trigger đang chờ.
+        """
+        ctx.step = STEP_WAIT_TRIGGER_AUTO
+        ctx.failed = True
+        if self.pipeline is None:
+            self.clear_auto_triggers()
+
+    def handle_auto_event(self, item: TriggerEvent, settings):
+        event = item.event
+        if self.pipeline is not None:
+            # Hàng đợi acquire đầy thì chặn ở đây (backpressure), kết quả optic do stage process chờ
+            if event in PART_TRIGGERS:
+                self.emit(ENGINE_STATUS, "Waiting...")
+                self.pipeline.put(self.new_part(item))
+            return
+
+        if event in (TRIGGER_WEIGHT_AUTO, TRIGGER_UNITBOX_AUTO):
+            ctx = self.new_part(item)
+            self.logger.debug(f"Step Auto: Wait Trigger {ctx.kind.capitalize()}")
+            self.emit(ENGINE_STATUS, "Waiting...")
+            self.run_auto_steps(ctx, settings)
+
+        # Frame optic đã detect xong thì xử lý kết quả theo thứ tự chụp
+        while self.pending_optic and self.pending_optic[0].future.done() and not self.b_stop_auto:
+            self.run_auto_steps(self.pending_optic.popleft(), settings)
+
+        # Trigger optic chỉ được lấy ra khi worker còn chỗ (xem loop_auto)
+        if event == TRIGGER_OPTIC_AUTO and not self.b_stop_auto:
+            self.logger.debug("Step Auto: Wait Trigger Optic")
+            self.emit(ENGINE_STATUS, "Waiting...")
+            ctx = self.new_part(item)
+            # Quay lại chờ trigger, kết quả detect được xử lý khi worker chạy xong
+            self.run_auto_steps(ctx, settings, until=STEP_PROCESSING_OPTIC_AUTO)
+            if ctx.step == STEP_PROCESSING_OPTIC_AUTO:
+                self.pending_optic.append(ctx)
+
+    def confirm(self, message, settings):
+        """
+        Kết quả NG cần nhân viên xác nhận (popup), trả về "PASS" hoặc "FAIL".
+        Không có confirm_handler (headless) thì giữ kết quả FAIL.
+        """
+        if self.confirm_handler is None:
+            self.logger.warning(f"{message} -> {RESULT_FAIL}")
+            return RESULT_FAIL
+        with self._lock_confirm:
+            return self.confirm_handler(message, settings.scanner.comport, settings.scanner.baudrate)
+
+    def set_lighting(self, camera_name, settings, on=True):
+        """
+        Bật/tắt các kênh đèn của camera theo config.
+        """
+        if self.light_controller is None:
+            return
+        type_light = settings.lighting.controller
+        for i, value in enumerate(settings.cameras[camera_name].channels):
+            if value > 0:
+                if not on:
+                    self.light_controller.off_channel(i)
+                elif type_light == "LCP":
+                    self.light_controller.on_channel(i)
+                    self.light_controller.set_light_value(i, value)
+                else:  # DCP controller
+                    self.light_controller.on_channel(i, value)
+
+    def grab_frame_auto(self, camera_name, settings, ctx: PartContext = None):
+        """
+        Chụp theo trigger, camera phơi sáng sau khi đèn ổn định (trigger delay = delay đèn).
+        Có camera group thì chụp qua group (thống kê độ trễ/độ lệch), capture sync bật thì chụp
+        đồng bộ tất cả camera trong một bộ, frame của các camera khác lưu vào ctx.views.
+        """
+        camera = getattr(self, camera_name)
+        if camera is None:
+            return None
+        if self.camera_group is None:
+            frame = camera.trigger_grab_frame(delay_ms=settings.cameras[camera_name].delay)
+        else:
+            names = list(self.camera_group.cameras) if settings.capture.sync else [camera_name]
+            delays = {name: settings.cameras[name].delay for name in names}
+            frame_set = self.camera_group.grab(delays, names=names)
+            frame = frame_set.frames.get(camera_name)
+            if len(names) > 1:
+                if not frame_set.aligned:
+                    self.logger.warning(f"Capture set not aligned: skew {frame_set.skew:.1f} ms "
+                                        f"(tolerance {self.camera_group.tolerance_ms} ms)")
+                if ctx is not None:
+                    ctx.views = {name: view for name, view in frame_set.frames.items()
+                                 if name != camera_name and view is not None}
+        if frame is None:
+            self.logger.warning("Image not found")
+        elif frame.latency_ms is not None:
+            self.logger.debug(f"{frame.camera} frame {frame.frame_id}: trigger -> frame {frame.latency_ms:.1f} ms, "
+                              f"exposure {frame.exposure_us:.0f} us, lost packets {frame.lost_packets}")
+        return frame
+
+    def detach_frame(self, ctx: PartContext):
+        """
+        Đã dùng xong ảnh gốc của part: trả mảng về pool của driver để lần grab sau dùng lại.
+        ctx.src (RESULT giữ tới khi lưu/hiển thị xong) còn trỏ vào mảng của pool thì giữ bản copy.
+        """
+        frame = ctx.frame
+        if frame is not None and frame.pool is not None:
+            if ctx.src is frame.mat:
+                ctx.src = frame.mat.copy()
+            frame.release()
+        for view in ctx.views.values():
+            if view.pool is not None:
+                mat = view.mat.copy()
+                view.release()
+                view.mat = mat
+
+    def publish_result(self, ctx: PartContext, result: RESULT, camera_name):
+        ctx.result = result
+        key = (result.step, result.result)
+        latency = ctx.age_ms()
+        ctx.timings["trigger_to_result"] = latency
+        with self._lock_counters:
+            self.counters[key] = self.counters.get(key, 0) + 1
+            self.latency.append(latency)
+        self.logger.info(f"Part {ctx.part_id} {ctx.kind} ({ctx.source}): trigger -> result {latency:.1f} ms")
+        self.emit(ENGINE_RESULT, result, camera_name)
+
+    def handle_preprocess_weight_auto(self, ctx: PartContext, settings):
+        try:
+            ctx.start_elappsed_time()
+            self.logger.debug("Step Auto: Preprocess Weight")
+
+            self.set_lighting("camera1", settings, on=True)
+            ctx.frame = self.grab_frame_auto("camera1", settings, ctx)
+            ctx.src = ctx.frame.mat if ctx.frame is not None else None
+            self.set_lighting("camera1", settings, on=False)
+
+            # Trọng lượng và code SN lấy lúc chụp, part sau có thể đã tới khi part này được xử lý
+            ctx.weight = self.weight
+            ctx.code_sn = self.get_code_sn(1)
+
+            ctx.step = STEP_PROCESSING_WEIGHT_AUTO
+            elapsed_time = ctx.get_elappsed_time("preprocess")
+            self.logger.info(f"Auto preprocess weight time: {elapsed_time:.3f} seconds")
+        except Exception as e:
+            self.logger.error(f"Auto preprocess weight error: {str(e)}")
+            # Trong trường hợp lỗi, quay lại bước chờ trigger
+            self.abort_part(ctx)
+
+    def handle_processing_weight_auto(self, ctx: PartContext, settings):
+        try:
+            ctx.start_elappsed_time()
+            self.logger.debug("Step Auto: Processing Weight")
+            src = ctx.src
+            pixel_format = ctx.frame.pixel_format
+
+            binary = processing_binary(src, settings.processing, pixel_format)
+
+            # Bayer thô chỉ demosaic ở đây, khi cần ảnh màu để lưu/hiển thị kết quả
+            if is_bayer(pixel_format):
+                ctx.src = to_bgr(src, pixel_format)
+                pixel_format = PIXEL_BGR8
+            self.detach_frame(ctx)
+            src = ctx.src
+
+            # Ghi lỗi: trọng lượng lấy từ bộ cân, không đọc lại từ giao diện
+            weight = ctx.weight
+            if weight > settings.weight.min and weight < settings.weight.max:
+                msg = RESULT_PASS
+            else:
+                if weight <= settings.weight.min:
+                    message = "Trọng lượng cân nhỏ hơn yêu cầu"
+                else:
+                    message = "Trọng lượng cân lơn hơn yêu cầu"
+                msg = self.confirm(message, settings)
+
+            code_sn = ctx.code_sn
+
+            dst = to_bgr(src, pixel_format, copy=True)
+
+            time_check = time.strftime(DATETIME_FORMAT)
+            dst = put_text_dst(dst, msg, time_check, self.model_name, code_sn)
+
+            # Tạo kết quả cuối cùng cho auto
+            self.publish_result(ctx, RESULT(
+                step="WEIGHT",
+                time_check=time_check,
+                model_name=self.model_name,
+                result=msg,
+                src=src,
+                binary=binary,
+                dst=dst,
+                code_sn=code_sn,
+                weight=str(weight),
+                error_type=None,
+                config=self.config,
+                frame_info=ctx.frame.meta(),
+            ), "Camera1")
+
+            ctx.step = STEP_OUTPUT_WEIGHT_AUTO
+            elapsed_time = ctx.get_elappsed_time("processing")
+            self.logger.info(f"Auto processing weight time: {elapsed_time:.3f} seconds")
+        except Exception as e:
+            self.logger.error(f"Auto processing weight error: {str(e)}")
+            # Trong trường hợp lỗi, quay lại bước chờ trigger
+            self.abort_part(ctx)
+
+    def handle_output_weight_auto(self, ctx: PartContext, settings):
+        try:
+            ctx.start_elappsed_time()
+            self.logger.debug("Step Auto: Output Weight")
+
+            if ctx.result is not None:
+                if ctx.result.result == RESULT_PASS and self.out_com_controller is not None:
+                    self.out_com_controller.send_data(ctx.result.code_sn)
+
+                self.write_label_result(ctx.result.result)
+
+                # Ghi log database
+                self.write_log_database(ctx.result, settings)
+
+            ctx.step = STEP_RELEASE_AUTO
+            elapsed_time = ctx.get_elappsed_time("output")
+            self.logger.info(f"Auto output weight time: {elapsed_time:.3f} seconds")
+        except Exception as e:
+            self.logger.error(f"Auto output weight error: {str(e)}")
+            # Trong trường hợp lỗi, quay lại bước chờ trigger
+            self.abort_part(ctx)
+
+    def handle_preprocess_optic_auto(self, ctx: PartContext, settings):
+        try:
+            ctx.start_elappsed_time()
+            self.logger.debug("Step Auto: Preprocess Optic")
+
+            self.set_lighting("camera2", settings, on=True)
+            ctx.frame = self.grab_frame_auto("camera2", settings, ctx)
+
+            # Đưa ảnh vào inference worker, không chờ kết quả (model cần ảnh BGR 3 kênh)
+            frame = ctx.frame
+            ctx.src = to_bgr(frame.mat, frame.pixel_format) if frame is not None else None
+            if frame is not None and ctx.src is not frame.mat:
+                # Đã chuyển sang ảnh BGR mới, ảnh gốc của driver không còn dùng
+                self.detach_frame(ctx)
+            if ctx.src is not None:
+                ctx.code_sn = self.get_code_sn(5)
+                if self.inference_pool is not None:
+                    ctx.future = self.inference_pool.submit(ctx.src, method=settings.model_ai.detect_method,
+                                                            **settings.model_ai.detect_kwargs)
+                elif self.inference_queue is not None:
+                    ctx.future = self.inference_queue.submit(ctx.src, **settings.model_ai.detect_kwargs)
+                else:
+                    ctx.future = self.inference_worker.submit(self.detect_optic, ctx.src, settings, self.model_ai)
+                # Detect xong thì đánh thức luồng auto để xử lý kết quả
+                events = self.auto_events
+                ctx.future.add_done_callback(lambda _: events.put_event(EVENT_OPTIC_DONE_AUTO))
+
+            self.set_lighting("camera2", settings, on=False)
+
+            # Không có ảnh thì bỏ part, ngược lại chờ kết quả detect ở bước processing
+            ctx.step = STEP_PROCESSING_OPTIC_AUTO if ctx.future is not None else STEP_WAIT_TRIGGER_AUTO
+            elapsed_time = ctx.get_elappsed_time("preprocess")
+            self.logger.info(f"Auto preprocess optic time: {elapsed_time:.3f} seconds")
+        except Exception as e:
+            self.logger.error(f"Auto preprocess optic error: {str(e)}")
+            # Trong trường hợp lỗi, quay lại bước chờ trigger
+            self.abort_part(ctx)
+
+    def handle_processing_optic_auto(self, ctx: PartContext, settings):
+        try:
+            ctx.start_elappsed_time()
+            self.logger.debug("Step Auto: Processing Optic")
+
+            src = ctx.src
+            code_sn = ctx.code_sn
+
+            binary = processing_binary(src, settings.processing)
+
+            dst = src.copy()
+
+            # Kết quả phát hiện từ inference worker (pipeline: chờ ở stage process)
+            timeout = max(0.0, INFERENCE_TIMEOUT - ctx.age_ms() / 1000)
+            try:
+                results = ctx.future.result(timeout=timeout)
+            except FutureTimeoutError:
+                raise TimeoutError(f"Không có kết quả detect part {ctx.part_id} sau {INFERENCE_TIMEOUT}s")
+            # Detect xong, ảnh gốc (nếu vẫn là mảng của driver) không còn ai đọc
+            self.detach_frame(ctx)
+            src = ctx.src
+
+            # Ghi lỗi
+            counts = results.count_classes(n_classes=2)
+            count_empty = int(counts[0])
+            count_optic = int(counts[1])
+            self.emit(ENGINE_OPTIC_COUNT, count_empty, count_optic)
+            if count_optic + count_empty != 5 or count_empty > 0:
+                if count_optic < 5:
+                    message = "Số lượng Optic bị thiếu"
+                elif count_optic > 5:
+                    message = "Số lượng Optic bị thừa"
+                else:
+                    message = "Có vị trí Optic trống"
+                msg = self.confirm(message, settings)
+            else:
+                msg = RESULT_PASS
+
+            dst = plot_results(results, dst, self.model_ai.label_map, self.model_ai.color_map)
+
+            time_check = time.strftime(DATETIME_FORMAT)
+            dst = put_text_dst(dst, msg, time_check, self.model_name, code_sn)
+
+            # Tạo kết quả cuối cùng cho auto
+            self.publish_result(ctx, RESULT(
+                step="OPTIC",
+                time_check=time_check,
+                model_name=self.model_name,
+                result=msg,
+                src=src,
+                binary=binary,
+                dst=dst,
+                code_sn=code_sn,
+                weight="",
+                error_type=None,
+                config=self.config,
+                frame_info=ctx.frame.meta(),
+            ), "Camera2")
+
+            ctx.step = STEP_OUTPUT_OPTIC_AUTO
+            elapsed_time = ctx.get_elappsed_time("processing")
+            self.logger.info(f"Auto processing optic time: {elapsed_time:.3f} seconds")
+        except Exception as e:
+            self.logger.error(f"Auto processing optic error: {str(e)}")
+            # Trong trường hợp lỗi, quay lại bước chờ trigger
+            self.abort_part(ctx)
+
+    def handle_output_optic_auto(self, ctx: PartContext, settings):
+        try:
+            ctx.start_elappsed_time()
+            self.logger.debug("Step Auto: Output Optic")
+
+            if ctx.result is not None:
+                self.write_label_result(ctx.result.result)
+
+                # Ghi log database
+                self.write_log_database(ctx.result, settings)
+
+            ctx.step = STEP_RELEASE_AUTO
+            elapsed_time = ctx.get_elappsed_time("output")
+            self.logger.info(f"Auto output optic time: {elapsed_time:.3f} seconds")
+        except Exception as e:
+            self.logger.error(f"Auto output optic error: {str(e)}")
+            # Trong trường hợp lỗi, quay lại bước chờ trigger
+            self.abort_part(ctx)
+
+    def handle_preprocess_unitbox_auto(self, ctx: PartContext, settings):
+        try:
+            ctx.start_elappsed_time()
+            self.logger.debug("Step Auto: Preprocess UnitBox")
+
+            self.set_lighting("camera2", settings, on=True)
+            ctx.frame = self.grab_frame_auto("camera2", settings, ctx)
+            ctx.src = ctx.frame.mat if ctx.frame is not None else None
+            self.set_lighting("camera2", settings, on=False)
+
+            ctx.code_sn = self.get_code_sn(5)
+
+            ctx.step = STEP_PROCESSING_UNITBOX_AUTO
+            elapsed_time = ctx.get_elappsed_time("preprocess")
+            self.logger.info(f"Auto preprocess unitbox time: {elapsed_time:.3f} seconds")
+        except Exception as e:
+            self.logger.error(f"Auto preprocess unitbox error: {str(e)}")
+            # Trong trường hợp lỗi, quay lại bước chờ trigger
+            self.abort_part(ctx)
+
+    def handle_processing_unitbox_auto(self, ctx: PartContext, settings):
+        try:
+            ctx.start_elappsed_time()
+            self.logger.debug("Step Auto: Processing UnitBox")
+
+            src = ctx.src
+            pixel_format = ctx.frame.pixel_format
+
+            binary = processing_binary(src, settings.processing, pixel_format)
+
+            # Đọc barcode chỉ cần ảnh gray, Bayer thô chuyển thẳng sang gray
+            if is_bayer(pixel_format):
+                ctx.src = to_gray(src, pixel_format)
+            self.detach_frame(ctx)
+            src = ctx.src
+
+            code_sn = ctx.code_sn
+
+            # Xoá tất cả các file trong thư mục
+            for filename in os.listdir(InputBarCodePath):
+                file_path = os.path.join(InputBarCodePath, filename)
+                if os.path.isfile(file_path):
+                    os.remove(file_path)
+            if os.path.exists(OutputBarCodePath):
+                os.remove(OutputBarCodePath)
+
+            # Lưu ảnh barcode cho Vision Master
+            image_path = os.path.join(InputBarCodePath, "BarCode.jpg")
+            cv.imwrite(image_path, src)
+
+            time.sleep(0.05)
+            # Send Trigger Vission Master
+            self.vision_master_controller.send_trigger()
+
+            while not os.path.exists(OutputBarCodePath):
+                if self.b_stop_auto:
+                    return
+                time.sleep(0.01)
+
+            time.sleep(0.05)
+
+            # Ghi lỗi
+            parts = self.dataVM.strip().split(";")
+            same_code = all(p == parts[0] for p in parts)
+            if same_code and len(parts) == 5:
+                self.emit(ENGINE_MODEL_CODE, parts[0], True)
+                msg = RESULT_PASS
+            else:
+                self.emit(ENGINE_MODEL_CODE, "DECODE FAIL", False)
+
+                if not same_code:
+                    message = "Sai code trong UnitBox"
+                elif len(parts) < 5:
+                    message = "Thiếu code trong UnitBox"
+                else:
+                    message = "Thừa code trong UnitBox"
+                msg = self.confirm(message, settings)
+
+            dst = cv.imread(OutputBarCodePath)
+
+            time_check = time.strftime(DATETIME_FORMAT)
+            dst = put_text_dst(dst, msg, time_check, self.model_name, code_sn)
+
+            # Tạo kết quả cuối cùng cho auto
+            self.publish_result(ctx, RESULT(
+                step="UNITBOX",
+                time_check=time_check,
+                model_name=self.model_name,
+                result=msg,
+                src=src,
+                binary=binary,
+                dst=dst,
+                code_sn=code_sn,
+                weight="",
+                error_type=None,
+                config=self.config,
+                frame_info=ctx.frame.meta(),
+            ), "Camera2")
+
+            ctx.step = STEP_OUTPUT_UNITBOX_AUTO
+            elapsed_time = ctx.get_elappsed_time("processing")
+            self.logger.info(f"Auto processing unitbox time: {elapsed_time:.3f} seconds")
+        except Exception as e:
+            self.logger.error(f"Auto processing unitbox error: {str(e)}")
+            # Trong trường hợp lỗi, quay lại bước chờ trigger
+            self.abort_part(ctx)
+
+    def handle_output_unitbox_auto(self, ctx: PartContext, settings):
+        try:
+            ctx.start_elappsed_time()
+            self.logger.debug("Step Auto: Output UnitBox")
+
+            if ctx.result is not None:
+                self.write_label_result(ctx.result.result)
+
+                # Ghi log database
+                self.write_log_database(ctx.result, settings)
+
+            ctx.step = STEP_RELEASE_AUTO
+            elapsed_time = ctx.get_elappsed_time("output")
+            self.logger.info(f"Auto output unitbox time: {elapsed_time:.3f} seconds")
+        except Exception as e:
+            self.logger.error(f"Auto output unitbox error: {str(e)}")
+            # Trong trường hợp lỗi, quay lại bước chờ trigger
+            self.abort_part(ctx)
+
+    def handle_release_auto(self, ctx: PartContext):
+        try:
+            self.logger.debug("Step Auto: Release")
+            self.logger.debug(f"Part {ctx.part_id} {ctx.kind}: {ctx.age_ms():.1f} ms, "
+                              + ", ".join(f"{name} {ms:.1f} ms" for name, ms in ctx.timings.items()))
+
+            # Trigger đến trong lúc chạy chu kỳ vẫn nằm trong hàng đợi, được xử lý ngay sau bước này
+            ctx.step = STEP_WAIT_TRIGGER_AUTO
+        except Exception as e:
+            self.logger.error(f"Auto release error: {str(e)}")
+            # Trong trường hợp lỗi, quay lại bước chờ trigger
+            self.abort_part(ctx)
+
+    def detect_optic(self, src, settings, model_ai=None):
+        """
+        Phát hiện optic trên ảnh src theo cấu hình model (chạy trên inference worker).
+        Hàm detect và tham số đã được chọn khi biên dịch cấu hình (model_settings).
+        model_ai: model lúc part được chụp (hot swap không đổi model của part đang detect).
+        """
+        detect = getattr(model_ai or self.model_ai, settings.model_ai.detect_method)
+        return detect(src, **settings.model_ai.detect_kwargs)
+
+    def write_label_result(self, result: str):
+        if result == RESULT_PASS:
+            status, outputs = "Pass", (PortState.On, PortState.Off, PortState.Off)
+        elif result == RESULT_FAIL:
+            status, outputs = "Fail", (PortState.Off, PortState.On, PortState.Off)
+        else:
+            status, outputs = "Wait", (PortState.Off, PortState.Off, PortState.On)
+        self.emit(ENGINE_STATUS, status)
+
+        if self.io_controller is not None:
+            for i, (port, state) in enumerate(zip((OutPorts.Out_1, OutPorts.Out_2, OutPorts.Out_3), outputs)):
+                if i > 0:
+                    time.sleep(0.05)
+                self.io_controller.write_out(port, state)
+
+    def write_log_database(self, result: RESULT, settings: ModelSettings):
+        try:
+            model_name = result.model_name
+            date_now = time.strftime(FOLDER_DATE_FORMAT)
+
+            log_dir = settings.system.log_dir
+            log_size = settings.system.log_size
+
+            if result is not None:
+                os.makedirs(log_dir, exist_ok=True)
+
+                image_folder = os.path.join(log_dir, "images", date_now, model_name, result.step)
+                os.makedirs(image_folder, exist_ok=True)
+
+                filename = result.result + "_" + time.strftime(FILENAME_FORMAT)
+
+                image_folder_input = f"{image_folder}\\input"
+                os.makedirs(image_folder_input, exist_ok=True)
+                image_path_input = os.path.join(image_folder_input, filename.replace(".jpg", "_input.jpg"))
+                cv.imwrite(image_path_input, result.src)
+
+                if result.dst is not None:
+                    image_folder_output = f"{image_folder}\\output"
+                    os.makedirs(image_folder_output, exist_ok=True)
+                    image_path_output = os.path.join(image_folder_output, filename.replace(".jpg", "_output.jpg"))
+                    cv.imwrite(image_path_output, result.dst)
+
+                threading.Thread(target=self.scan_log_dir, args=(log_dir, log_size), daemon=True).start()
+
+                conn = create_db(settings.system.database_path)
+
+                values = (result.step, result.time_check, result.model_name, result.result, image_path_input, result.code_sn, result.weight, result.error_type)
+                sql = "INSERT INTO history (step, time_check, model_name, result, img_path, code_sn, weight, error_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                insert(conn, sql, values)
+
+                # Metadata của frame đã chụp, liên kết với history qua img_path
+                if result.frame_info:
+                    info = result.frame_info
+                    create_table(conn, FRAME_INFO_TABLE_SQL)
+                    values = (image_path_input, info["camera"], info["frame_id"], info["timestamp"], info["device_timestamp"],
+                              info["exposure_us"], info["gain"], info["lost_packets"], info["skipped"], info["latency_ms"])
+                    sql = "INSERT INTO frame_info (img_path, camera, frame_id, timestamp, device_timestamp, exposure_us, gain, lost_packets, skipped, latency_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                    insert(conn, sql, values)
+        except Exception as e:
+            self.logger.error(f"Error write log database: {str(e)}")
+
+    def scan_log_dir(self, log_dir, max_size):
+        self.logger.debug(f"Scanning log dir '{log_dir}' ...")
+        try:
+            log_images = os.path.join(log_dir, "images")
+            size = scan_dir(log_images)
+            if size > max_size:
+                if log_images is not None:
+                    shutil.rmtree(log_images)
+                    self.logger.debug(f"Log dir size > {max_size} --> Remove log dir.")
+        except Exception as e:
+            self.logger.error(f"Error scan log dir: {str(e)}")
@@ -0,0 +1,171 @@
+import time
+import queue
+import threading
+import itertools
+
+
+class PartContext:
+    """
+    Trạng thái của một part đi qua luồng auto (trigger -> chụp -> xử lý -> output).
+    Mỗi part có context riêng nên nhiều part có thể nằm ở các stage khác nhau cùng lúc.
+    """
+    _ids = itertools.count(1)
+
+    __slots__ = ("part_id", "kind", "step", "source", "t_trigger", "t_step", "timings",
+                 "frame", "views", "src", "future", "code_sn", "weight", "result", "failed")
+
+    def __init__(self, kind: str, step: str, source=None, t_trigger=None):
+        """
+        @kind: "WEIGHT", "OPTIC" hoặc "UNITBOX"
+        @step: bước đầu tiên (STEP_PREPROCESS_*_AUTO)
+        @source: nguồn trigger (io/scanner/tcp/software)
+        @t_trigger: thời điểm nhận trigger (time.perf_counter()), mặc định là lúc tạo part
+        """
+        self.part_id = next(PartContext._ids)
+        self.kind = kind
+        self.step = step
+        self.source = source
+        self.t_trigger = time.perf_counter() if t_trigger is None else t_trigger
+        self.t_step = self.t_trigger
+        self.timings = {}
+
+        self.frame = None           # Frame từ camera
+        self.views = {}             # Frame của các camera khác chụp cùng bộ (capture sync)
+        self.src = None             # ảnh dùng để xử lý
+        self.future = None          # kết quả detect (optic)
+        self.code_sn = ""
+        self.weight = None
+        self.result = None          # RESULT sau bước processing
+        self.failed = False         # lỗi ở một bước, part bị bỏ
+
+    def start_elappsed_time(self):
+        self.t_step = time.perf_counter()
+
+    def get_elappsed_time(self, name=None):
+        """
+        Thời gian từ start_elappsed_time (giây), name != None thì lưu vào timings (ms).
+        """
+        elapsed = time.perf_counter() - self.t_step
+        if name is not None:
+            self.timings[name] = elapsed * 1000
+        return elapsed
+
+    def age_ms(self):
+        return (time.perf_counter() - self.t_trigger) * 1000
+
+    def __repr__(self):
+        return f"PartContext(part_id={self.part_id}, kind={self.kind}, step={self.step})"
+
+
+class PipelineStage:
+    """
+    Một stage của pipeline: worker thread riêng và hàng đợi giới hạn maxsize.
+    handler(ctx) trả về True để chuyển part sang stage kế tiếp, False để bỏ part.
+    Hàng đợi của stage sau đầy thì stage trước bị chặn (backpressure tới trigger).
+    """
+
+    def __init__(self, name, handler, maxsize=2, logger=None):
+        """
+        @logger: ghi lỗi của handler (tên stage, part_id), None thì chỉ đếm part bị bỏ
+        """
+        self.name = name
+        self.handler = handler
+        self.logger = logger
+        self.next_stage = None
+        self._queue = queue.Queue(maxsize=max(1, int(maxsize)))
+        self._thread = threading.Thread(target=self._run, name=f"Stage-{name}", daemon=True)
+        self._lock_stats = threading.Lock()
+        self._n_done = 0
+        self._n_dropped = 0
+        self._busy_time = 0.0
+        self._blocked_time = 0.0
+        self._t_start = 0.0
+
+    def start(self):
+        self._t_start = time.perf_counter()
+        self._thread.start()
+
+    def put(self, ctx: PartContext, timeout=None):
+        self._queue.put(ctx, timeout=timeout)
+
+    def close(self):
+        """
+        Đóng stage sau khi xử lý hết các part đã nhận, stage kế tiếp được đóng theo.
+        """
+        self._queue.put(None)
+
+    def join(self, timeout=None):
+        self._thread.join(timeout=timeout)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            ctx = self._queue.get()
+            if ctx is None:
+                if self.next_stage is not None:
+                    self.next_stage.close()
+                break
+
+            t0 = time.perf_counter()
+            try:
+                ok = self.handler(ctx)
+            except Exception as e:
+                ok = False
+                if self.logger is not None:
+                    self.logger.error(f"Stage {self.name} part {ctx.part_id} error: {e}")
+            t1 = time.perf_counter()
+
+            if ok and self.next_stage is not None:
+                self.next_stage.put(ctx)
+            t2 = time.perf_counter()
+
+            with self._lock_stats:
+                self._busy_time += t1 - t0
+                self._blocked_time += t2 - t1
+                if ok:
+                    self._n_done += 1
+                else:
+                    self._n_dropped += 1
+
+    def stats(self) -> dict:
+        with self._lock_stats:
+            elapsed = time.perf_counter() - self._t_start if self._t_start else 0.0
+            return {
+                "done": self._n_done,
+                "dropped": self._n_dropped,
+                "pending": self._queue.qsize(),
+                "busy": self._busy_time / elapsed if elapsed > 0 else 0.0,
+                "blocked": self._blocked_time / elapsed if elapsed > 0 else 0.0,
+            }
+
+
+class AutoPipeline:
+    """
+    Chuỗi stage nối tiếp: part N+1 được chụp trong lúc part N đang detect và part N-1 đang ghi log.
+    Thứ tự part được giữ vì mỗi stage chỉ có một worker.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        for stage, next_stage in zip(self.stages, self.stages[1:]):
+            stage.next_stage = next_stage
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def put(self, ctx: PartContext, timeout=None):
+        self.stages[0].put(ctx, timeout=timeout)
+
+    def close(self, timeout=5.0):
+        """
+        Chờ các part đang chạy đi hết pipeline rồi dừng các worker (tối đa timeout giây mỗi stage).
+        """
+        self.stages[0].close()
+        for stage in self.stages:
+            stage.join(timeout=timeout)
+
+    def stats(self) -> dict:
+        return {stage.name: stage.stats() for stage in self.stages}
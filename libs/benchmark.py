@@ -0,0 +1,257 @@
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import platform
+import threading
+
+import cv2
+import numpy as np
+import psutil
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs.vision import YoloInference, BACKEND_TORCH, BACKENDS, get_num_threads
+
+
+METHODS = ["detect", "detect_batch", "detect_multi", "classify"]
+IMAGE_EXTS = (".bmp", ".png", ".jpg", ".jpeg", ".tif", ".tiff")
+
+
+class PeakRSS:
+    '''
+    Theo dõi RSS lớn nhất của process trong lúc benchmark (lấy mẫu trên thread riêng).
+    '''
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = self.process.memory_info().rss
+        self._running = False
+        self._thread = None
+
+    def sample(self):
+        self.peak = max(self.peak, self.process.memory_info().rss)
+        return self.peak
+
+    def _run(self):
+        while self._running:
+            self.sample()
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._running = False
+        self._thread.join()
+        self.sample()
+
+
+def percentile_ms(values, q):
+    return float(np.percentile(values, q) * 1000) if len(values) else 0.0
+
+
+def summarize(latencies, splits, n_images):
+    '''
+    @latencies: thời gian (giây) của mỗi lần gọi
+    @splits: list dict {"preprocess", "model", "nms", "postprocess"} (ms) của mỗi lần gọi
+    @n_images: số ảnh trong mỗi lần gọi
+    '''
+    total = sum(latencies)
+    summary = {
+        "iterations": len(latencies),
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "p99_ms": percentile_ms(latencies, 99),
+        "mean_ms": float(np.mean(latencies) * 1000) if latencies else 0.0,
+        "throughput_fps": n_images * len(latencies) / total if total > 0 else 0.0,
+    }
+    if splits:
+        summary["split_ms"] = {k: float(np.mean([s[k] for s in splits])) for k in splits[0]}
+    return summary
+
+
+def load_images(images_dir, resolutions, seed=0):
+    '''
+    Ảnh thật trong images_dir, hoặc ảnh ngẫu nhiên (BGR) theo các độ phân giải WxH.
+    '''
+    if images_dir:
+        paths = sorted(p for p in glob.glob(os.path.join(images_dir, "*")) if p.lower().endswith(IMAGE_EXTS))
+        mats = [cv2.imread(p) for p in paths]
+        mats = [mat for mat in mats if mat is not None]
+        if not mats:
+            raise FileNotFoundError(f"No images found in {images_dir}")
+        return mats
+
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (h, w, 3), dtype=np.uint8) for w, h in resolutions]
+
+
+def run_once(yolo:YoloInference, method, mats, conf, imgsz):
+    '''
+    Gọi đúng YoloInference.<method> như luồng auto và tách thời gian từng phần.
+    preprocess/model/nms lấy từ result.speed của lần predict cuối (predictor.results),
+    postprocess là phần còn lại (postprocess của libs.vision và overhead của ultralytics).
+    '''
+    t0 = time.perf_counter()
+    getattr(yolo, method)(mats if method == "detect_multi" else mats[0], conf=conf, imgsz=imgsz)
+    total = time.perf_counter() - t0
+
+    results = getattr(yolo.model.predictor, "results", None) or []
+    speed = [getattr(r, "speed", None) or {} for r in results]
+    split = {
+        "preprocess": sum(s.get("preprocess", 0.0) for s in speed),
+        "model": sum(s.get("inference", 0.0) for s in speed),
+        "nms": sum(s.get("postprocess", 0.0) for s in speed),
+    }
+    split["postprocess"] = max(0.0, total * 1000 - sum(split.values()))
+    return total, split
+
+
+def bench_case(yolo, method, images, batch_size, imgsz, conf, warmup, iterations):
+    n = batch_size if method == "detect_multi" else 1
+    batches = [[images[(i * n + j) % len(images)] for j in range(n)] for i in range(max(1, len(images)))]
+
+    t0 = time.perf_counter()
+    run_once(yolo, method, batches[0], conf, imgsz)
+    first_call = time.perf_counter() - t0
+
+    for i in range(warmup):
+        run_once(yolo, method, batches[i % len(batches)], conf, imgsz)
+
+    latencies, splits = [], []
+    for i in range(iterations):
+        dt, split = run_once(yolo, method, batches[i % len(batches)], conf, imgsz)
+        latencies.append(dt)
+        splits.append(split)
+
+    result = {
+        "method": method,
+        "batch_size": n,
+        "imgsz": imgsz,
+        "first_call_ms": first_call * 1000,
+    }
+    result.update(summarize(latencies, splits, n))
+    return result
+
+
+def benchmark(model, label, backend=BACKEND_TORCH, methods=("detect",), images_dir=None,
+              resolutions=((2448, 2048),), batch_sizes=(1,), imgszs=(640,), conf=0.25,
+              warmup=5, iterations=50, num_threads=None):
+    '''
+    Benchmark YoloInference, trả về dict kết quả (có thể lưu JSON).
+    '''
+    report = {
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "model": model,
+        "backend": backend,
+        "num_threads": get_num_threads(num_threads),
+        "platform": {
+            "system": platform.platform(),
+            "processor": platform.processor(),
+            "python": platform.python_version(),
+            "cpu_physical": psutil.cpu_count(logical=False),
+            "cpu_logical": psutil.cpu_count(logical=True),
+        },
+        "images": images_dir or "synthetic",
+        "cases": [],
+    }
+
+    with PeakRSS() as rss:
+        rss_before = rss.sample()
+
+        # Cold start: load model + warm-up của load_model
+        t0 = time.perf_counter()
+        yolo = YoloInference(model=model, label=label, backend=backend, num_threads=num_threads)
+        report["cold_start_ms"] = (time.perf_counter() - t0) * 1000
+        if yolo.model is None:
+            raise RuntimeError(f"Load model failed: {model}")
+        # Các hàm của YoloInference không truyền verbose, tắt log mỗi lần predict của ultralytics
+        yolo.model.overrides["verbose"] = False
+        report["model_rss_mb"] = (rss.sample() - rss_before) / 1024**2
+
+        images = load_images(images_dir, resolutions)
+        report["resolutions"] = sorted({f"{m.shape[1]}x{m.shape[0]}" for m in images})
+
+        for method in methods:
+            if method == "classify" and yolo.model.task != "classify":
+                print(f"- Skip classify: model task is {yolo.model.task}")
+                continue
+            for imgsz in imgszs:
+                for batch_size in (batch_sizes if method == "detect_multi" else (1,)):
+                    case = bench_case(yolo, method, images, batch_size, imgsz, conf, warmup, iterations)
+                    report["cases"].append(case)
+                    print(f"- {method:<12} bs={case['batch_size']:<3} imgsz={imgsz:<5} "
+                          f"p50={case['p50_ms']:.1f}ms p95={case['p95_ms']:.1f}ms p99={case['p99_ms']:.1f}ms "
+                          f"{case['throughput_fps']:.1f} img/s")
+
+    report["peak_rss_mb"] = rss.peak / 1024**2
+    return report
+
+
+def parse_resolutions(text):
+    '''
+    "2448x2048,1280x1024" -> [(2448, 2048), (1280, 1024)]
+    '''
+    return [tuple(int(v) for v in item.lower().split("x")) for item in text.split(",") if item]
+
+
+def parse_ints(text):
+    return [int(v) for v in text.split(",") if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark YoloInference")
+    parser.add_argument("--model", required=True, help="Đường dẫn model .pt")
+    parser.add_argument("--label", default="resources/models_ai/labels.yaml")
+    parser.add_argument("--backend", default=BACKEND_TORCH, choices=BACKENDS)
+    parser.add_argument("--methods", default="detect,detect_multi", help=",".join(METHODS))
+    parser.add_argument("--images", default=None, help="Thư mục ảnh thật, bỏ trống thì dùng ảnh ngẫu nhiên")
+    parser.add_argument("--resolutions", default="2448x2048", help="Độ phân giải ảnh ngẫu nhiên WxH,WxH")
+    parser.add_argument("--batch-sizes", default="1,2,4", help="Batch size cho detect_multi")
+    parser.add_argument("--imgsz", default="640", help="Danh sách imgsz")
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--output", default=None, help="File JSON kết quả")
+    args = parser.parse_args(argv)
+
+    methods = [m for m in args.methods.split(",") if m]
+    for method in methods:
+        if method not in METHODS:
+            parser.error(f"Unknown method: {method}")
+
+    report = benchmark(
+        model=args.model,
+        label=args.label,
+        backend=args.backend,
+        methods=methods,
+        images_dir=args.images,
+        resolutions=parse_resolutions(args.resolutions),
+        batch_sizes=parse_ints(args.batch_sizes),
+        imgszs=parse_ints(args.imgsz),
+        conf=args.conf,
+        warmup=args.warmup,
+        iterations=args.iterations,
+        num_threads=args.threads,
+    )
+
+    output = args.output
+    if output is None:
+        name = os.path.splitext(os.path.basename(args.model))[0]
+        output = f"benchmark_{name}_{args.backend}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"- Cold start: {report['cold_start_ms']:.0f}ms, peak RSS: {report['peak_rss_mb']:.0f}MB")
+    print(f"- Saved: {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
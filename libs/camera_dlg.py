@@ -26,6 +26,7 @@ class CameraDlg(QWidget):
         self.canvas_screen = canvas_screen
         self.camera_thread = None
         self.current_image = None
+        self.sensor_config = {"roi": [], "binning": 1, "decimation": 1}
 
         self.project_name = "ProjectName"
         self.log_path = "logs"
@@ -89,7 +90,8 @@ class CameraDlg(QWidget):
                     self.ui.spin_channel_2.value(),
                     self.ui.spin_channel_3.value()
                 ],
-            }
+            },
+            "sensor": self.sensor_config,
         }
 
         return camera_config
@@ -99,7 +101,7 @@ class CameraDlg(QWidget):
         if "device" in config:
             camera_config = config["device"]
             self.add_combox_item(
-                self.ui.combo_type_camera, ["Webcam", "HIK", "SODA"]
+                self.ui.combo_type_camera, ["Webcam", "HIK", "SODA", "Replay", "Synthetic"]
             )
             self.set_combobox_text(
                 self.ui.combo_type_camera, camera_config.get("type", "Webcam")
@@ -119,6 +121,9 @@ class CameraDlg(QWidget):
                 self.ui.combo_feature, camera_config.get("feature", "")
             )
 
+        # Cấu hình sensor (ROI, binning, decimation) chỉ sửa trong config.json
+        self.sensor_config = config.get("sensor", {"roi": [], "binning": 1, "decimation": 1})
+
         # Áp dụng cấu hình lighting
         if "lighting" in config:
             lighting_config = config["lighting"]
@@ -165,6 +170,15 @@ class CameraDlg(QWidget):
                         "feature": f"resources/cameras/SODA/{camera_feature}.ini",
                     },
                 )
+            elif camera_type in ("Replay", "Synthetic"):
+                # Camera giả lập (thư mục ảnh/video hoặc frame sinh ngẫu nhiên), feature là file yaml
+                self.camera_thread = CameraThread(
+                    camera_type,
+                    {
+                        "id": camera_id,
+                        "feature": f"resources/cameras/{camera_type}/{camera_feature}.yaml" if camera_feature else "",
+                    },
+                )
             else:
                 # Mặc định sử dụng Webcam
                 self.ui_logger.warning(
@@ -195,8 +209,8 @@ class CameraDlg(QWidget):
         for item in items:
             combobox.addItem(item)
         
-    def find_camera_devices(self, type: str):
-        devices = get_camera_devices(type)
+    def find_camera_devices(self, type: str, refresh=False):
+        devices = get_camera_devices(type, refresh)
 
         if devices is not None:
             id_camera = list(devices.keys())
@@ -206,7 +220,7 @@ class CameraDlg(QWidget):
                 features = [
                     name.split('.')[0]
                     for name in os.listdir(feature_dir)
-                    if name.endswith(".ini") or name.endswith(".pfs")
+                    if name.endswith(".ini") or name.endswith(".pfs") or name.endswith(".yaml")
                 ]
                 features.append("")
         if not devices:
@@ -215,8 +229,8 @@ class CameraDlg(QWidget):
 
         return id_camera, features
 
-    def load_camera_devices(self, type: str):
-        id_camera, features = self.find_camera_devices(type)
+    def load_camera_devices(self, type: str, refresh=False):
+        id_camera, features = self.find_camera_devices(type, refresh)
         self.add_combox_item(self.ui.combo_id_camera, id_camera)
         self.add_combox_item(self.ui.combo_feature, features)
         self.ui.combo_feature.setCurrentIndex(0)
@@ -224,7 +238,8 @@ class CameraDlg(QWidget):
     def on_change_camera_type(self):
         """Xử lý sự kiện khi thay đổi lựa chọn trong combo_type_camera."""
         type = self.ui.combo_type_camera.currentText()
-        self.load_camera_devices(type)
+        # Người dùng chọn lại loại camera thì liệt kê lại thiết bị
+        self.load_camera_devices(type, refresh=True)
 
     def on_click_open_camera(self):
         if self.ui.btn_open_camera.text() == "Open":
@@ -276,6 +291,7 @@ class CameraDlg(QWidget):
     def start_camera(self):
         try:
             self.camera_thread.frameCaptured.connect(self.update_frame)
+            self.camera_thread.cameraStatus.connect(self.ui_logger.warning)
             self.camera_thread.start()
 
             self.ui.btn_start_camera.setText("Stop")
@@ -293,6 +309,7 @@ class CameraDlg(QWidget):
         try:
             self.camera_thread.stop_camera()
             self.camera_thread.frameCaptured.disconnect()
+            self.camera_thread.cameraStatus.disconnect()
 
             self.ui.btn_start_camera.setText("Start")
             self.ui.btn_start_camera.setProperty("class", "success")
@@ -304,7 +321,14 @@ class CameraDlg(QWidget):
         except Exception as e:
             self.ui_logger.error(f"Error Stop Camera: {e}")
 
-    def update_frame(self, frame):
+    def update_frame(self, seq):
+        # Lấy frame mới nhất trong ring của camera thread, các frame cũ hơn bị bỏ qua
+        if self.camera_thread is None:
+            return
+        # Ảnh hiển thị: mono giữ 1 kênh, Bayer thô (demosaic=False) chỉ demosaic nửa độ phân giải
+        frame = self.camera_thread.take_latest(preview=True)
+        if frame is None:
+            return
         self.current_image = frame
 
         self.canvas_screen.load_pixmap(ndarray2pixmap(self.current_image))
@@ -0,0 +1,130 @@
+import time
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from libs.camera_thread import CameraThread
+
+
+# frames (Frame hoặc None)/timestamps/latency theo tên camera, skew (ms) giữa frame sớm nhất và muộn nhất
+FrameSet = namedtuple("FrameSet", ["frames", "timestamps", "latency", "skew", "aligned"])
+
+
+class CameraGroup:
+    """
+    Nhóm N camera chụp cùng lúc cho một chu kỳ: mở song song, trigger gần như đồng thời
+    và trả về bộ frame đã căn theo thời gian (sai lệch tối đa tolerance_ms).
+    Mỗi camera vẫn chụp qua CameraThread.trigger_grab_frame (đếm lỗi, kết nối lại, frame gap),
+    camera không hỗ trợ trigger thì grab free-run.
+    """
+
+    def __init__(self, cameras: dict, tolerance_ms=5.0, timeout=1000, history=500):
+        """
+        @cameras: {tên: CameraThread}
+        @tolerance_ms: sai lệch thời gian tối đa giữa các frame trong một bộ
+        @timeout: thời gian chờ frame của mỗi camera (ms)
+        """
+        self.cameras = dict(cameras)
+        self.tolerance_ms = tolerance_ms
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.cameras)),
+                                            thread_name_prefix="CameraGroup")
+        self._lock = threading.Lock()
+        self._latency = {name: deque(maxlen=history) for name in self.cameras}
+        self._skew = deque(maxlen=history)
+        self._n_sets = 0
+        self._n_misaligned = 0
+
+    def _map(self, fn, names=None):
+        names = list(self.cameras) if names is None else names
+        futures = {name: self._executor.submit(fn, name, self.cameras[name]) for name in names}
+        return {name: future.result() for name, future in futures.items()}
+
+    def open(self) -> dict:
+        """
+        Mở các camera song song, trả về {tên: True/False}.
+        """
+        def _open(name, camera: CameraThread):
+            try:
+                camera.open_camera()
+                return bool(camera.b_open)
+            except Exception:
+                return False
+        return self._map(_open)
+
+    def set_trigger_mode(self, enable: bool) -> dict:
+        return self._map(lambda name, camera: camera.set_trigger_mode(enable))
+
+    def close(self):
+        self._map(lambda name, camera: camera.close_camera())
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def grab(self, delay_ms=0, names=None) -> FrameSet:
+        """
+        Chụp một bộ frame từ các camera (mặc định tất cả), các camera bắt đầu trigger cùng lúc qua barrier.
+        @delay_ms: trigger delay (ms), một số hoặc {tên: delay}
+        """
+        names = list(self.cameras) if names is None else list(names)
+        delays = delay_ms if isinstance(delay_ms, dict) else {name: delay_ms for name in names}
+        barrier = threading.Barrier(len(names)) if names else None
+        t_start = {}
+
+        def _grab(name, camera: CameraThread):
+            try:
+                barrier.wait(timeout=self.timeout / 1000)
+            except threading.BrokenBarrierError:
+                pass
+            t_start[name] = time.perf_counter()
+            frame = camera.trigger_grab_frame(delay_ms=delays.get(name, 0), timeout=self.timeout)
+            return frame
+
+        frames = self._map(_grab, names)
+
+        timestamps, latency = {}, {}
+        for name, frame in frames.items():
+            if frame is None:
+                continue
+            timestamps[name] = frame.grab_time
+            # Free-run không có thời điểm trigger: tính từ lúc bắt đầu grab
+            latency[name] = frame.latency_ms if frame.latency_ms is not None else \
+                (frame.grab_time - t_start[name]) * 1000
+
+        stamps = list(timestamps.values())
+        skew = (max(stamps) - min(stamps)) * 1000 if stamps else 0.0
+        aligned = len(stamps) == len(names) and skew <= self.tolerance_ms
+
+        with self._lock:
+            self._n_sets += 1
+            if not aligned:
+                self._n_misaligned += 1
+            self._skew.append(skew)
+            for name, value in latency.items():
+                self._latency[name].append(value)
+
+        return FrameSet(frames, timestamps, latency, skew, aligned)
+
+    def stats(self) -> dict:
+        """
+        Độ trễ trigger -> frame của từng camera và độ lệch giữa các camera (ms).
+        """
+        def _summary(values):
+            values = list(values)
+            if not values:
+                return {"avg": 0.0, "p95": 0.0, "max": 0.0}
+            return {
+                "avg": float(np.mean(values)),
+                "p95": float(np.percentile(values, 95)),
+                "max": float(np.max(values)),
+            }
+
+        with self._lock:
+            return {
+                "sets": self._n_sets,
+                "misaligned": self._n_misaligned,
+                "skew_ms": _summary(self._skew),
+                "latency_ms": {name: _summary(values) for name, values in self._latency.items()},
+            }
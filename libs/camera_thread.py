@@ -1,21 +1,34 @@
 from PyQt5.QtCore import QThread, pyqtSignal
 import cv2 as cv
 import time
+import logging
+import threading
 import sys 
+from collections import deque
+
+import numpy as np
 
 sys.path.append("cameras")
 
 from hik import HIK
 from soda import SODA
 from webcam import Webcam
-from base_camera import NO_ERROR
+from simulated import Replay, Synthetic
+from base_camera import NO_ERROR, ERR_GRAB_FAIL
+from pixel_format import PIXEL_BGR8, is_bayer, to_bgr, to_preview
+from libs.frame_ring import FrameRing
 
 
 class CameraThread(QThread):
+    # seq của frame mới nhất trong ring, chỉ phát lại khi UI đã lấy frame (take_latest)
     frameCaptured = pyqtSignal(object)
+    # Thông báo mất kết nối/kết nối lại camera
+    cameraStatus = pyqtSignal(str)
 
-    def __init__(self, camera, config: dict = {"id": "0", "feature": ""}, parent=None):
+    def __init__(self, camera, config: dict = {"id": "0", "feature": ""}, parent=None,
+                 ring_size=8, max_fps=0, max_errors=3, backoff=(0.5, 10.0), gap_factor=3.0, logger=None):
         super().__init__(parent)
+        self.logger = logger if logger else logging.getLogger("CameraThread")
 
         if camera == "HIK":
             self.camera = HIK(config)
@@ -23,44 +36,344 @@ class CameraThread(QThread):
             self.camera = SODA(config)
         elif camera == "Webcam":
             self.camera = Webcam(config)
+        elif camera == "Replay":
+            self.camera = Replay(config)
+        elif camera == "Synthetic":
+            self.camera = Synthetic(config)
         self.b_open = None
         self.frame = None
         self.running = False
 
+        # Frame được ghi vào ring cấp phát sẵn, các consumer tự đọc frame mới nhất
+        self.ring = FrameRing(ring_size)
+        self.ui_reader = self.ring.reader()
+        self.max_fps = max_fps
+        self._notify_pending = False
+
+        # ROI/binning/decimation phía sensor, áp dụng khi mở camera
+        self.sensor = None
+        # Pixel format của các frame trong ring (Mono8, BGR8, BayerRG8, ...)
+        self.pixel_format = PIXEL_BGR8
+
+        # Giám sát: sau max_errors lỗi grab liên tiếp thì đóng/mở lại camera,
+        # thời gian chờ giữa các lần thử tăng gấp đôi từ backoff[0] tới backoff[1] giây
+        self.max_errors = max_errors
+        self.backoff = backoff
+        self.gap_factor = gap_factor
+        self._reconnect_lock = threading.Lock()
+        # Grab và đóng/mở lại camera (reconnect chạy nền) không được dùng SDK cùng lúc
+        self._device_lock = threading.RLock()
+        self._closed = False
+        self._n_fail = 0
+        self._t_last_frame = None
+        self._period = None
+        self.last_frame = None
+        self._last_frame_id = None
+        self._latencies = deque(maxlen=500)
+        self.counters = {
+            "frames": 0,
+            "dropped_frames": 0,
+            "lost_packets": 0,
+            "errors": 0,
+            "error_codes": {},
+            "frame_gaps": 0,
+            "max_gap_ms": 0.0,
+            "reconnects": 0,
+            "reconnect_attempts": 0,
+            "last_error": "",
+            "downtime_s": 0.0,
+        }
+
+    def set_sensor(self, sensor: dict):
+        """
+        sensor: {"roi": [x, y, w, h], "binning": 1, "decimation": 1}
+        """
+        self.sensor = sensor or None
+
     def open_camera(self):
+        self._closed = False
+        self._open_device()
+
+    def _open_device(self):
         self.b_open = self.camera.open()
+        if self.b_open and self.sensor:
+            ok = self.camera.set_sensor(
+                roi=self.sensor.get("roi") or None,
+                binning=self.sensor.get("binning", 1),
+                decimation=self.sensor.get("decimation", 1),
+            )
+            if not ok:
+                self.logger.warning(f"Camera sensor config error: {self.camera.get_error()}")
         self.b_open &= self.camera.start_grabbing()
 
     def grab_camera(self):
-        if self.b_open:
-            err, self.frame = self.camera.grab()
-            return self.frame
+        if not self.b_open:
+            return None
+
+        # Thread đang stream thì lấy frame mới nhất trong ring, không grab chồng lên
+        if self.running:
+            item = self.ring.latest()
+            frame = item[2] if item is not None else None
         else:
+            with self._device_lock:
+                if not self.b_open:
+                    return None
+                err, frame = self.camera.grab()
+            if err != NO_ERROR or frame is None:
+                return None
+            _, grabbed = self.record_frame(frame)
+            if grabbed.pool is not None:
+                # Ảnh trả về được giữ lâu (teaching): chuyển/copy sang mảng riêng rồi trả mảng về pool của driver
+                frame = to_bgr(frame, self.pixel_format) if is_bayer(self.pixel_format) else frame.copy()
+                grabbed.release()
+                return frame
+
+        # Ảnh chụp lẻ dùng cho các bước xử lý thủ công cần màu: demosaic frame Bayer thô
+        if frame is not None and is_bayer(self.pixel_format):
+            frame = to_bgr(frame, self.pixel_format)
+        return frame
+
+    def set_trigger_mode(self, enable: bool) -> bool:
+        if not self.b_open:
+            return False
+        return self.camera.set_trigger_mode(enable)
+
+    def trigger_grab(self, delay_ms=0, timeout=1000):
+        """
+        Chụp một frame theo software trigger (camera không hỗ trợ thì chờ delay rồi grab).
+        """
+        frame = self.trigger_grab_frame(delay_ms=delay_ms, timeout=timeout)
+        return frame.mat if frame is not None else None
+
+    def trigger_grab_frame(self, delay_ms=0, timeout=1000):
+        """
+        Như trigger_grab nhưng trả về Frame (ảnh kèm frame_id, timestamp, exposure, latency, ...).
+        """
+        with self._device_lock:
+            # Đang kết nối lại (b_open = False) thì bỏ qua, không gọi SDK trên camera đã đóng
+            if not self.b_open:
+                return None
+            err, frame = self.camera.trigger_grab(delay_ms=delay_ms, timeout=timeout)
+        if err != NO_ERROR or frame is None:
+            self.logger.warning(f"Camera trigger error: {err}")
+            if self._on_error(err or ERR_GRAB_FAIL):
+                self.cameraStatus.emit(
+                    f"Camera {self.camera.get_model_name()} lost ({self._n_fail} errors: {err}), reconnecting"
+                )
+                # Luồng auto không bị chặn, kết nối lại chạy nền
+                threading.Thread(target=self.reconnect, daemon=True).start()
+            return None
+
+        _, frame = self.record_frame(frame)
+        return frame
+
+    def take_latest(self, copy=True, preview=False):
+        '''
+        Frame mới nhất cho UI, gọi trong slot nhận frameCaptured.
+        preview=True: ảnh để hiển thị (mono giữ 1 kênh, Bayer demosaic nửa độ phân giải).
+        '''
+        self._notify_pending = False
+        item = self.ui_reader.read_latest(copy=copy)
+        if item is None:
             return None
+        return to_preview(item[2], self.pixel_format) if preview else item[2]
+
+    def reader(self):
+        '''
+        Con trỏ đọc riêng cho consumer khác (luồng auto, recorder, ...).
+        '''
+        return self.ring.reader()
+
+    def stats(self) -> dict:
+        stats = self.ring.stats()
+        stats["ui_dropped"] = self.ui_reader.dropped
+        stats.update(self.counters)
+        stats["error_codes"] = dict(self.counters["error_codes"])
+        latencies = list(self._latencies)
+        stats["trigger_latency_ms"] = {
+            "avg": float(np.mean(latencies)) if latencies else 0.0,
+            "p95": float(np.percentile(latencies, 95)) if latencies else 0.0,
+            "max": float(np.max(latencies)) if latencies else 0.0,
+        }
+        # Mảng output của driver có được dùng lại không (frame phải được release sau khi dùng)
+        pool = getattr(self.camera, "_pool", None)
+        if pool is not None:
+            stats["pool"] = pool.stats()
+        return stats
+
+    def frame_meta(self, seq):
+        '''
+        Metadata (frame_id, timestamp, exposure, ...) của frame seq trong ring.
+        '''
+        return self.ring.meta(seq)
+
+    def record_frame(self, mat):
+        """
+        Đóng gói frame vừa grab (Frame + metadata), ghi vào ring và cập nhật bộ đếm:
+        frame bị mất (frame_id không liên tục), packet mất, latency trigger -> frame,
+        khoảng trống (frame gap) lớn hơn gap_factor lần chu kỳ frame trung bình.
+        Trả về (seq, Frame).
+        """
+        frame = self.camera.make_frame(mat)
+        self.frame = mat
+        self.last_frame = frame
+        self.pixel_format = frame.pixel_format
+
+        if self._last_frame_id is not None and frame.frame_id > self._last_frame_id:
+            self.counters["dropped_frames"] += frame.frame_id - self._last_frame_id - 1
+        self._last_frame_id = frame.frame_id
+        self.counters["dropped_frames"] += frame.skipped
+        self.counters["lost_packets"] += frame.lost_packets
+        if frame.latency_ms is not None:
+            self._latencies.append(frame.latency_ms)
+
+        seq = self.ring.put(mat, timestamp=frame.timestamp, meta=frame.meta())
+
+        now = frame.grab_time
+        self._n_fail = 0
+        self.counters["frames"] += 1
+        if self._t_last_frame is not None:
+            dt = now - self._t_last_frame
+            if self._period is not None and dt > self.gap_factor * self._period:
+                self.counters["frame_gaps"] += 1
+                self.counters["max_gap_ms"] = max(self.counters["max_gap_ms"], dt * 1000)
+            else:
+                self._period = dt if self._period is None else 0.9 * self._period + 0.1 * dt
+        self._t_last_frame = now
+        return seq, frame
+
+    def _on_error(self, err) -> bool:
+        """
+        Ghi nhận lỗi grab, trả về True khi cần kết nối lại camera.
+        """
+        self._n_fail += 1
+        self.counters["errors"] += 1
+        self.counters["last_error"] = err
+        codes = self.counters["error_codes"]
+        codes[err] = codes.get(err, 0) + 1
+        return self._n_fail >= self.max_errors and not self._reconnect_lock.locked()
+
+    def _sleep(self, seconds, keep_running) -> bool:
+        # Ngủ từng đoạn ngắn để dừng được ngay khi stop
+        t_end = time.perf_counter() + seconds
+        while keep_running():
+            remain = t_end - time.perf_counter()
+            if remain <= 0:
+                return True
+            time.sleep(min(0.05, remain))
+        return False
+
+    def reconnect(self, keep_running=None) -> bool:
+        """
+        Đóng rồi mở lại camera cho tới khi thành công, thời gian chờ tăng theo cấp số nhân.
+        keep_running(): trả về False để dừng thử lại (mặc định chạy tới khi thread bị stop
+        hoặc, khi không stream, tới khi camera bị đóng).
+        """
+        if not self._reconnect_lock.acquire(blocking=False):
+            return False
+        try:
+            if keep_running is None:
+                streaming = self.running
+                keep_running = (lambda: self.running) if streaming else (lambda: not self._closed)
+
+            trigger_mode = self.camera.is_trigger_mode()
+            with self._device_lock:
+                self.b_open = False
+            t_start = time.perf_counter()
+            delay, max_delay = self.backoff
+            attempt = 0
+            while keep_running():
+                attempt += 1
+                self.counters["reconnect_attempts"] += 1
+                with self._device_lock:
+                    try:
+                        self.camera.stop_grabbing()
+                        self.camera.close()
+                        self.camera.reset_device()
+                        self._open_device()
+                        if self.b_open and trigger_mode:
+                            self.camera.set_trigger_mode(True)
+                    except Exception as ex:
+                        self.b_open = False
+                        self.counters["last_error"] = str(ex)
+
+                if self.b_open:
+                    downtime = time.perf_counter() - t_start
+                    self.counters["reconnects"] += 1
+                    self.counters["downtime_s"] += downtime
+                    self._n_fail = 0
+                    self._t_last_frame = None
+                    self._last_frame_id = None
+                    self.cameraStatus.emit(
+                        f"Camera {self.camera.get_model_name()} reconnected after {attempt} attempt(s), {downtime:.1f}s"
+                    )
+                    return True
+
+                self.cameraStatus.emit(
+                    f"Camera {self.camera.get_model_name()} reconnect attempt {attempt} failed "
+                    f"({self.camera.get_error() or self.counters['last_error']}), retry in {delay:.1f}s"
+                )
+                if not self._sleep(delay, keep_running):
+                    break
+                delay = min(delay * 2, max_delay)
+            return False
+        finally:
+            self._reconnect_lock.release()
 
     def run(self):
         if self.b_open:
             self.running = True
+            min_period = 1.0 / self.max_fps if self.max_fps else 0.0
             while self.running:
-                err, self.frame = self.camera.grab()
+                t0 = time.perf_counter()
+                with self._device_lock:
+                    err, frame = self.camera.grab()
 
-                if err != NO_ERROR:
-                    print("Camera error: ", err)
-                    break
-                else:
-                    self.frameCaptured.emit(self.frame)
+                if err != NO_ERROR or frame is None:
+                    self.logger.warning(f"Camera error: {err}")
+                    if self._on_error(err or ERR_GRAB_FAIL):
+                        self.cameraStatus.emit(
+                            f"Camera {self.camera.get_model_name()} lost ({self._n_fail} errors: {err}), reconnecting"
+                        )
+                        self.reconnect()
+                    else:
+                        # Chờ tăng dần tới backoff[0] trước lần grab sau, không quay vòng chiếm CPU
+                        self._sleep(self.backoff[0] * self._n_fail / self.max_errors, lambda: self.running)
+                    continue
+
+                seq, info = self.record_frame(frame)
+                # Ring đã copy ảnh: trả mảng về pool của driver cho lần grab sau, không giữ lại ảnh này
+                info.release()
+                self.frame = None
+                # UI chưa lấy frame trước thì không phát thêm, tránh dồn hàng đợi signal
+                if not self._notify_pending:
+                    self._notify_pending = True
+                    self.frameCaptured.emit(seq)
 
-                self.msleep(50)
+                if min_period:
+                    remain = min_period - (time.perf_counter() - t0)
+                    if remain > 0:
+                        time.sleep(remain)
+            self.running = False
 
     def stop_camera(self):
         self.running = False
-        self.msleep(50)
+        self.wait(1000)
+        self._notify_pending = False
 
     def close_camera(self):
+        self._closed = True
         self.stop_camera()
+        # Chờ lần kết nối lại đang chạy nền (nếu có) kết thúc
+        if self._reconnect_lock.acquire(timeout=5):
+            self._reconnect_lock.release()
         if hasattr(self, 'camera') and self.camera:
-            self.camera.stop_grabbing()
-            self.camera.close()
+            with self._device_lock:
+                # Trả camera về free-run cho lần mở sau (live view)
+                if self.b_open and self.camera.is_trigger_mode():
+                    self.camera.set_trigger_mode(False)
+                self.camera.stop_grabbing()
+                self.camera.close()
         self.wait()
 
     # def __init__(self, parent=None):
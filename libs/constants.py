@@ -8,6 +8,28 @@ ABOUT = "Version %s \n-updates: " % VERSION
 STEP_WAIT_TRIGGER_AUTO = "STEP_WAIT_TRIGGER_AUTO"
 STEP_RELEASE_AUTO = "STEP_RELEASE_AUTO"
 
+# AUTO EVENTS (trigger từ IO/scanner/TCP/UI và sự kiện nội bộ, đưa vào hàng đợi của luồng auto)
+TRIGGER_WEIGHT_AUTO = "TRIGGER_WEIGHT_AUTO"
+TRIGGER_OPTIC_AUTO = "TRIGGER_OPTIC_AUTO"
+TRIGGER_UNITBOX_AUTO = "TRIGGER_UNITBOX_AUTO"
+EVENT_OPTIC_DONE_AUTO = "EVENT_OPTIC_DONE_AUTO"
+EVENT_STOP_AUTO = "EVENT_STOP_AUTO"
+EVENT_MODEL_SWAP_AUTO = "EVENT_MODEL_SWAP_AUTO"
+OPEN_DEVICE_TIMEOUT = 10 # giây, chờ mở tất cả thiết bị khi start auto
+INFERENCE_TIMEOUT = 10 # giây tính từ lúc nhận trigger, quá thời gian chưa có kết quả detect thì bỏ part
+TRIGGER_DEDUP_MS = {"io": 20, "scanner": 20, "tcp": 20} # trigger trùng từ cùng nguồn trong khoảng này bị bỏ, software không lọc
+
+# ENGINE EVENTS (AutoEngine gọi các callback đã subscribe, UI hoặc chạy headless)
+ENGINE_STARTED = "started"          # () thiết bị đã mở, model đã load, bắt đầu nhận trigger
+ENGINE_RESULT = "result"            # (result: RESULT, camera: str)
+ENGINE_STATUS = "status"            # (text: "Waiting..." / "Pass" / "Fail" / "Wait")
+ENGINE_WEIGHT = "weight"            # (weight: float, ok: bool)
+ENGINE_OPTIC_COUNT = "optic_count"  # (count_empty: int, count_optic: int)
+ENGINE_MODEL_CODE = "model_code"    # (model_code: str, ok: bool)
+ENGINE_CODE_SN = "code_sn"          # (list_code_sn: list)
+ENGINE_DEVICE = "device"            # (name: str, ok: bool, elapsed: float, error: str)
+ENGINE_STOPPED = "stopped"          # ()
+
 # WEIGHT
 STEP_PREPROCESS_WEIGHT_AUTO = "STEP_PREPROCESS_WEIGHT_AUTO"
 STEP_PROCESSING_WEIGHT_AUTO = "STEP_PROCESSING_WEIGHT_AUTO"
@@ -5,6 +5,18 @@ from datetime import datetime
 
 # from constant import *
 
+FRAME_INFO_TABLE_SQL = """create table if not exists frame_info(
+    img_path text,
+    camera text,
+    frame_id integer,
+    timestamp real,
+    device_timestamp integer,
+    exposure_us real,
+    gain real,
+    lost_packets integer,
+    skipped integer,
+    latency_ms real)"""
+
 def create_db(db_file):
     """ create a database connection to the SQLite database
         specified by db_file
@@ -0,0 +1,161 @@
+import time
+
+import numpy as np
+
+
+class FrameRing:
+    '''
+    Ring buffer cố định các frame đã cấp phát sẵn, một thread ghi (grab) và nhiều thread đọc.
+    Thread ghi không bao giờ bị chặn: frame mới ghi đè slot cũ nhất.
+    Mỗi slot có số thứ tự (seq) và timestamp, slot được đánh dấu không hợp lệ (-1) trong lúc ghi
+    nên người đọc kiểm tra lại seq sau khi copy để phát hiện frame bị ghi đè giữa chừng.
+    '''
+    def __init__(self, capacity=8):
+        self.capacity = max(2, int(capacity))
+        self._frames = [None] * self.capacity
+        self._seqs = [-1] * self.capacity
+        self._stamps = [0.0] * self.capacity
+        self._metas = [None] * self.capacity
+        self._head = -1
+        self._shape = None
+        self._dtype = None
+
+        self.written = 0
+        self.overruns = 0
+
+    def _allocate(self, frame:np.ndarray):
+        self._frames = [np.empty_like(frame) for _ in range(self.capacity)]
+        self._seqs = [-1] * self.capacity
+        self._shape = frame.shape
+        self._dtype = frame.dtype
+
+    def put(self, frame:np.ndarray, timestamp=None, meta=None) -> int:
+        '''
+        Copy frame vào slot kế tiếp, trả về seq của frame.
+        meta: metadata của frame (Frame.meta()), đọc lại bằng meta(seq)
+        '''
+        if frame.shape != self._shape or frame.dtype != self._dtype:
+            self._allocate(frame)
+
+        seq = self._head + 1
+        idx = seq % self.capacity
+        self._seqs[idx] = -1
+        np.copyto(self._frames[idx], frame)
+        self._stamps[idx] = time.time() if timestamp is None else timestamp
+        self._metas[idx] = meta
+        self._seqs[idx] = seq
+        self._head = seq
+        self.written += 1
+        return seq
+
+    @property
+    def latest_seq(self):
+        return self._head
+
+    def get(self, seq, copy=True):
+        '''
+        Trả về (timestamp, frame) của seq, None nếu frame đã bị ghi đè.
+        copy=False trả về view của slot (chỉ dùng khi đọc xong trước khi slot bị ghi lại).
+        '''
+        if seq < 0:
+            return None
+        idx = seq % self.capacity
+        if self._seqs[idx] != seq:
+            return None
+        frame = self._frames[idx]
+        timestamp = self._stamps[idx]
+        if copy:
+            frame = frame.copy()
+            if self._seqs[idx] != seq:
+                self.overruns += 1
+                return None
+        return timestamp, frame
+
+    def meta(self, seq):
+        '''
+        Metadata của seq, None nếu không có hoặc frame đã bị ghi đè.
+        '''
+        if seq < 0:
+            return None
+        idx = seq % self.capacity
+        meta = self._metas[idx]
+        return meta if self._seqs[idx] == seq else None
+
+    def latest(self, copy=True):
+        '''
+        Trả về (seq, timestamp, frame) mới nhất, None nếu chưa có frame.
+        '''
+        while True:
+            seq = self._head
+            if seq < 0:
+                return None
+            item = self.get(seq, copy=copy)
+            if item is not None:
+                return (seq,) + item
+
+    def reader(self):
+        return FrameReader(self)
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "written": self.written,
+            "latest_seq": self._head,
+            "overruns": self.overruns,
+        }
+
+
+class FrameReader:
+    '''
+    Con trỏ đọc riêng của từng consumer (UI, luồng auto, recorder, ...).
+    dropped: số frame bị bỏ qua vì consumer chỉ lấy frame mới nhất
+    overruns: số frame bị ghi đè trước khi consumer kịp đọc bằng read_next
+    '''
+    def __init__(self, ring:FrameRing):
+        self.ring = ring
+        self.last_seq = ring.latest_seq
+        self.dropped = 0
+        self.overruns = 0
+
+    def pending(self):
+        return self.ring.latest_seq - self.last_seq
+
+    def read_latest(self, copy=True):
+        '''
+        Frame mới nhất chưa đọc, (seq, timestamp, frame) hoặc None nếu không có frame mới.
+        '''
+        if self.ring.latest_seq <= self.last_seq:
+            return None
+        item = self.ring.latest(copy=copy)
+        if item is None:
+            return None
+        seq = item[0]
+        self.dropped += max(0, seq - self.last_seq - 1)
+        self.last_seq = seq
+        return item
+
+    def read_next(self, copy=True):
+        '''
+        Frame kế tiếp chưa đọc theo thứ tự, (seq, timestamp, frame) hoặc None.
+        Nếu đã bị ghi đè thì nhảy tới frame cũ nhất còn trong ring.
+        '''
+        while self.ring.latest_seq > self.last_seq:
+            seq = self.last_seq + 1
+            oldest = self.ring.latest_seq - self.ring.capacity + 1
+            if seq < oldest:
+                self.overruns += oldest - seq
+                seq = oldest
+            item = self.ring.get(seq, copy=copy)
+            self.last_seq = seq
+            if item is not None:
+                return (seq,) + item
+            self.overruns += 1
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "last_seq": self.last_seq,
+            "pending": self.pending(),
+            "dropped": self.dropped,
+            "overruns": self.overruns,
+        }
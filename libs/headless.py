@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+
+from PyQt5.QtCore import QCoreApplication, QTimer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs.constants import *
+from libs.logger import Logger
+from libs.database_lite import create_databse
+from libs.auto_engine import AutoEngine
+from libs.model_settings import load_settings
+
+
+TRIGGERS = {
+    "weight": TRIGGER_WEIGHT_AUTO,
+    "optic": TRIGGER_OPTIC_AUTO,
+    "unitbox": TRIGGER_UNITBOX_AUTO,
+}
+
+
+def ensure_database(settings):
+    """
+    Tạo database log (history, frame_info) nếu chưa có, không hỏi xác nhận như trên giao diện.
+    """
+    database_path = settings.system.database_path
+    if not os.path.exists(database_path):
+        os.makedirs(os.path.dirname(database_path), exist_ok=True)
+        create_databse(database_path, "resources/database/database.sql")
+
+
+def run(model_name, trigger=None, count=0, interval=0.0, duration=0.0, log_dir=LOG_DIR):
+    """
+    Chạy luồng auto không có giao diện.
+    Trigger đến từ IO/scanner/TCP như trên line; trigger != None thì tự phát count trigger
+    (cách nhau interval giây) để benchmark. Dừng khi đủ count kết quả, hết duration hoặc Ctrl+C.
+    Trả về engine.stats().
+    """
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    logger = Logger(name="Headless", log_file=log_dir)
+    engine = AutoEngine(logger=logger)
+    n_results = [0]
+
+    def on_result(result, camera):
+        n_results[0] += 1
+        logger.info(f"[{n_results[0]}] {result.step} {result.result} ({camera}) code SN: {result.code_sn}")
+        if count and n_results[0] >= count:
+            engine.finish()
+
+    def post_triggers():
+        for _ in range(count):
+            # Benchmark đo throughput nên chờ hàng đợi trigger có chỗ, không để trigger bị bỏ
+            while engine.is_running and engine.auto_events.qsize() >= engine.auto_events.maxsize:
+                time.sleep(0.001)
+            if not engine.is_running:
+                break
+            engine.post_auto_trigger(TRIGGERS[trigger])
+            if interval > 0:
+                time.sleep(interval)
+
+    def on_started():
+        if trigger is not None:
+            threading.Thread(target=post_triggers, daemon=True).start()
+
+    engine.subscribe(ENGINE_STARTED, on_started)
+    engine.subscribe(ENGINE_RESULT, on_result)
+    engine.subscribe(ENGINE_STOPPED, app.quit)
+
+    # Ctrl+C dừng engine, timer để Python xử lý được signal trong lúc Qt event loop chạy
+    signal.signal(signal.SIGINT, lambda *args: engine.stop())
+    timer = QTimer()
+    timer.timeout.connect(lambda: None)
+    timer.start(200)
+    if duration > 0:
+        QTimer.singleShot(int(duration * 1000), engine.stop)
+
+    settings = load_settings(model_name)
+    ensure_database(settings)
+    engine.start(settings, model_name)
+    app.exec_()
+
+    stats = engine.stats()
+    engine.release()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chạy luồng auto không có giao diện")
+    parser.add_argument("--model", required=True, help="Tên model trong thư mục models")
+    parser.add_argument("--trigger", default=None, choices=list(TRIGGERS), help="Tự phát software trigger để benchmark")
+    parser.add_argument("--count", type=int, default=0, help="Số kết quả rồi dừng (0 = chạy liên tục)")
+    parser.add_argument("--interval", type=float, default=0.0, help="Khoảng cách giữa các trigger (giây)")
+    parser.add_argument("--duration", type=float, default=0.0, help="Thời gian chạy tối đa (giây, 0 = không giới hạn)")
+    parser.add_argument("--output", default=None, help="File JSON thống kê")
+    args = parser.parse_args(argv)
+
+    if args.trigger is not None and args.count <= 0:
+        parser.error("--trigger cần --count > 0")
+
+    stats = run(args.model, args.trigger, args.count, args.interval, args.duration)
+
+    print(f"- Parts: {stats['parts']} in {stats['elapsed_s']:.1f}s ({stats['parts_per_s']:.2f} part/s)")
+    for key, n in stats["results"].items():
+        print(f"  {key}: {n}")
+    latency = stats["latency_ms"]
+    print(f"- Trigger -> result: avg {latency['avg']:.1f} ms, p95 {latency['p95']:.1f} ms, max {latency['max']:.1f} ms")
+    triggers = stats["triggers"]
+    print(f"- Triggers: {triggers['accepted']}/{triggers['received']} accepted, "
+          f"{triggers['duplicated']} duplicated, {triggers['dropped']} dropped, max depth {triggers['max_depth']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=4)
+        print(f"- Saved: {args.output}")
+    return stats
+
+
+if __name__ == "__main__":
+    main()
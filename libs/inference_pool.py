@@ -0,0 +1,250 @@
+import time
+import queue
+import threading
+import itertools
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import Future
+
+import numpy as np
+
+from libs.vision import BACKEND_TORCH, get_num_threads
+
+
+def _worker_main(replica_id, model_path, label, backend, num_threads, shm_names, req_q, resp_q):
+    """
+    Tiến trình replica: load một YoloInference riêng, đọc frame từ shared memory
+    rồi trả DetectionBatch về qua resp_q.
+    """
+    from libs.vision import YoloInference
+
+    shms = [shared_memory.SharedMemory(name=name) for name in shm_names]
+    try:
+        try:
+            yolo = YoloInference(model=model_path, label=label, backend=backend, num_threads=num_threads)
+            error = None if yolo.model is not None else "model is None"
+        except Exception as ex:
+            error = f"{type(ex).__name__}: {ex}"
+        resp_q.put(("ready", replica_id, error is None, error, 0.0))
+        if error is not None:
+            return
+
+        while True:
+            item = req_q.get()
+            if item is None:
+                break
+
+            req_id, slot, shape, dtype, method, kwargs = item
+            t0 = time.perf_counter()
+            try:
+                mat = np.ndarray(shape, dtype=dtype, buffer=shms[slot].buf)
+                result = getattr(yolo, method)(mat, **kwargs)
+                resp_q.put((req_id, replica_id, True, result, time.perf_counter() - t0))
+            except Exception as ex:
+                resp_q.put((req_id, replica_id, False, f"{type(ex).__name__}: {ex}", time.perf_counter() - t0))
+    finally:
+        for shm in shms:
+            shm.close()
+
+
+class InferencePool:
+    """
+    Nhiều tiến trình, mỗi tiến trình một replica YoloInference, để dùng hết các core CPU
+    (tránh GIL ở pre/post-process). Frame được copy vào shared memory của replica thay vì pickle,
+    request được chia cho replica đang rảnh nhất.
+    """
+
+    def __init__(self, model_path, label, backend=BACKEND_TORCH, n_replicas=2,
+                 slots_per_replica=2, max_frame_bytes=4096 * 3072 * 3, start_timeout=120):
+        """
+        @n_replicas: số tiến trình (replica) model
+        @slots_per_replica: số frame tối đa đang chờ trên mỗi replica
+        @max_frame_bytes: kích thước lớn nhất của một frame (byte)
+        """
+        self.n_replicas = max(1, int(n_replicas))
+        self.slots_per_replica = max(1, int(slots_per_replica))
+        self.max_frame_bytes = int(max_frame_bytes)
+
+        # Chia đều số core cho các replica
+        num_threads = max(1, get_num_threads() // self.n_replicas)
+
+        ctx = mp.get_context("spawn")
+        self._resp_q = ctx.Queue()
+        self._req_qs = []
+        self._procs = []
+        self._shms = []
+        self._free_slots = []
+        for replica_id in range(self.n_replicas):
+            shms = [shared_memory.SharedMemory(create=True, size=self.max_frame_bytes)
+                    for _ in range(self.slots_per_replica)]
+            req_q = ctx.Queue()
+            proc = ctx.Process(
+                target=_worker_main,
+                args=(replica_id, model_path, label, backend, num_threads,
+                      [shm.name for shm in shms], req_q, self._resp_q),
+                daemon=True,
+            )
+            proc.start()
+            self._shms.append(shms)
+            self._req_qs.append(req_q)
+            self._procs.append(proc)
+            self._free_slots.append(list(range(self.slots_per_replica)))
+
+        self._cond = threading.Condition()
+        self._futures = {}  # req_id -> (future, replica_id, slot)
+        self._dead = set()  # replica đã chết, không nhận request nữa
+        self._req_ids = itertools.count()
+        self._running = True
+
+        self._t_start = time.perf_counter()
+        self._busy_time = [0.0] * self.n_replicas
+        self._n_done = [0] * self.n_replicas
+
+        self._wait_ready(start_timeout)
+
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def _wait_ready(self, timeout):
+        n_ready = 0
+        t_end = time.perf_counter() + timeout
+        while n_ready < self.n_replicas:
+            try:
+                tag, replica_id, ok, error, _ = self._resp_q.get(timeout=0.5)
+            except queue.Empty:
+                dead = [i for i, proc in enumerate(self._procs) if not proc.is_alive()]
+                if dead or time.perf_counter() > t_end:
+                    self.close()
+                    raise RuntimeError(f"Replica {dead} not ready" if dead else "Replicas start timeout")
+                continue
+            if tag != "ready":
+                continue
+            if not ok:
+                self.close()
+                raise RuntimeError(f"Replica {replica_id} load model failed: {error}")
+            n_ready += 1
+
+    def submit(self, mat:np.ndarray, method="detect_batch", timeout=None, **kwargs) -> Future:
+        """
+        Gửi frame tới replica rảnh nhất, trả về Future chứa kết quả của YoloInference.<method>.
+        Khi tất cả slot đều bận thì chờ (backpressure).
+        """
+        if mat.nbytes > self.max_frame_bytes:
+            raise ValueError(f"Frame {mat.nbytes} bytes > max_frame_bytes {self.max_frame_bytes}")
+
+        with self._cond:
+            ok = self._cond.wait_for(
+                lambda: not self._running or len(self._dead) == self.n_replicas or any(self._free_slots),
+                timeout=timeout,
+            )
+            if not self._running:
+                raise RuntimeError("InferencePool is closed")
+            if len(self._dead) == self.n_replicas:
+                raise RuntimeError("All inference replicas are dead")
+            if not ok:
+                raise TimeoutError("No free inference slot")
+
+            # Replica ít việc nhất (nhiều slot trống nhất)
+            replica_id = max(range(self.n_replicas), key=lambda i: len(self._free_slots[i]))
+            slot = self._free_slots[replica_id].pop()
+            req_id = next(self._req_ids)
+            future = Future()
+            self._futures[req_id] = (future, replica_id, slot)
+
+        buf = np.ndarray(mat.shape, dtype=mat.dtype, buffer=self._shms[replica_id][slot].buf)
+        np.copyto(buf, mat)
+        self._req_qs[replica_id].put((req_id, slot, mat.shape, mat.dtype.str, method, kwargs))
+        return future
+
+    def detect(self, mat, method="detect_batch", timeout=None, **kwargs):
+        return self.submit(mat, method=method, timeout=timeout, **kwargs).result(timeout=timeout)
+
+    def _check_replicas(self):
+        """
+        Replica chết (crash, bị kill) thì không bao giờ trả kết quả: báo lỗi cho các future
+        đang chờ trên replica đó và không chia request cho nó nữa.
+        """
+        failed = []
+        changed = False
+        with self._cond:
+            for replica_id, proc in enumerate(self._procs):
+                if replica_id in self._dead or proc.is_alive():
+                    continue
+                self._dead.add(replica_id)
+                self._free_slots[replica_id] = []
+                changed = True
+                for req_id, (future, rid, _) in list(self._futures.items()):
+                    if rid == replica_id:
+                        del self._futures[req_id]
+                        failed.append((future, replica_id, proc.exitcode))
+            if changed:
+                self._cond.notify_all()
+
+        for future, replica_id, exitcode in failed:
+            future.set_exception(RuntimeError(f"Replica {replica_id} died (exitcode {exitcode})"))
+
+    def _collect(self):
+        while self._running:
+            self._check_replicas()
+            try:
+                req_id, replica_id, ok, result, dt = self._resp_q.get(timeout=0.1)
+            except (queue.Empty, OSError, ValueError):
+                continue
+
+            with self._cond:
+                item = self._futures.pop(req_id, None)
+                if item is None:
+                    continue
+                future, _, slot = item
+                self._free_slots[replica_id].append(slot)
+                self._busy_time[replica_id] += dt
+                self._n_done[replica_id] += 1
+                self._cond.notify_all()
+
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(result))
+
+    @property
+    def capacity(self):
+        return self.n_replicas * self.slots_per_replica
+
+    def stats(self) -> dict:
+        """
+        Mức độ bận của từng replica (tỉ lệ thời gian chạy model trên tổng thời gian).
+        """
+        with self._cond:
+            elapsed = time.perf_counter() - self._t_start
+            return {
+                "replicas": [
+                    {
+                        "pid": self._procs[i].pid,
+                        "alive": i not in self._dead and self._procs[i].is_alive(),
+                        "done": self._n_done[i],
+                        "in_flight": 0 if i in self._dead else self.slots_per_replica - len(self._free_slots[i]),
+                        "busy": self._busy_time[i] / elapsed if elapsed > 0 else 0.0,
+                    }
+                    for i in range(self.n_replicas)
+                ],
+            }
+
+    def close(self, timeout=2.0):
+        with self._cond:
+            self._running = False
+            futures = list(self._futures.values())
+            self._futures.clear()
+            self._cond.notify_all()
+        for future, _, _ in futures:
+            future.set_exception(RuntimeError("InferencePool is closed"))
+
+        for req_q in self._req_qs:
+            req_q.put(None)
+        for proc in self._procs:
+            proc.join(timeout=timeout)
+            if proc.is_alive():
+                proc.terminate()
+        for shms in self._shms:
+            for shm in shms:
+                shm.close()
+                shm.unlink()
@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class InferenceWorker:
+    """
+    Thread riêng để chạy inference, luồng auto chỉ submit rồi nhận Future.
+    Hàng đợi có giới hạn max_queue: khi đầy, submit sẽ chờ (backpressure)
+    hoặc báo queue.Full nếu block=False.
+    """
+
+    def __init__(self, max_queue=2, name="InferenceWorker"):
+        self.max_queue = max(1, int(max_queue))
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._running = True
+
+        self._lock_stats = threading.Lock()
+        self._n_submitted = 0
+        self._n_done = 0
+        self._n_failed = 0
+        self._busy_time = 0.0
+        self._t_start = time.perf_counter()
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, block=True, timeout=None, **kwargs) -> Future:
+        """
+        Đưa fn(*args, **kwargs) vào hàng đợi, trả về Future chứa kết quả.
+        """
+        if not self._running:
+            raise RuntimeError("InferenceWorker is stopped")
+
+        future = Future()
+        self._queue.put((future, fn, args, kwargs), block=block, timeout=timeout)
+        with self._lock_stats:
+            self._n_submitted += 1
+        return future
+
+    def is_full(self):
+        return self._queue.full()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while self._running:
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+
+            future, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            t0 = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+                future.set_result(result)
+                failed = False
+            except Exception as ex:
+                future.set_exception(ex)
+                failed = True
+
+            with self._lock_stats:
+                self._busy_time += time.perf_counter() - t0
+                if failed:
+                    self._n_failed += 1
+                else:
+                    self._n_done += 1
+
+    def stats(self) -> dict:
+        with self._lock_stats:
+            elapsed = time.perf_counter() - self._t_start
+            return {
+                "submitted": self._n_submitted,
+                "done": self._n_done,
+                "failed": self._n_failed,
+                "pending": self._queue.qsize(),
+                "busy": self._busy_time / elapsed if elapsed > 0 else 0.0,
+            }
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        # Huỷ các việc còn trong hàng đợi
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[0].cancel()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=timeout)
@@ -1,6 +1,4 @@
 # from utils import *
-from PyQt5.QtWidgets import *
-from PyQt5.QtGui import *
 from PyQt5.QtCore import *
 
 from serial import Serial
@@ -0,0 +1,120 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import psutil
+
+from libs.vision import YoloInference, BACKEND_TORCH
+
+
+class ModelRegistry:
+    """
+    Registry dùng chung trong process cho các YoloInference đã load và warm-up.
+    Key là (đường dẫn model, mtime của file, backend) nên khi file .pt được ghi đè
+    thì model sẽ được load lại. Các model được giữ trong RAM theo LRU trong giới hạn
+    memory_budget_mb, model ít dùng nhất sẽ bị giải phóng trước.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, memory_budget_mb=2048):
+        self.memory_budget = memory_budget_mb * 1024**2
+        self._models = OrderedDict()  # key -> (YoloInference, size)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @staticmethod
+    def instance():
+        with ModelRegistry._instance_lock:
+            if ModelRegistry._instance is None:
+                ModelRegistry._instance = ModelRegistry()
+            return ModelRegistry._instance
+
+    @staticmethod
+    def make_key(model_path, backend=BACKEND_TORCH):
+        return (os.path.abspath(model_path), os.path.getmtime(model_path), backend)
+
+    def get(self, model_path, label, backend=BACKEND_TORCH) -> YoloInference:
+        """
+        Trả về model đã load sẵn, hoặc load (và warm-up) nếu chưa có.
+        """
+        key = ModelRegistry.make_key(model_path, backend)
+        yolo = self._lookup(key)
+        if yolo is not None:
+            return yolo
+
+        # Chỉ load một model tại một thời điểm, tránh load trùng cùng một key
+        with self._load_lock:
+            yolo = self._lookup(key)
+            if yolo is not None:
+                return yolo
+
+            process = psutil.Process()
+            rss_before = process.memory_info().rss
+            yolo = YoloInference(model=model_path, label=label, backend=backend)
+            if yolo.model is None:
+                raise RuntimeError(f"Load model failed: {model_path}")
+            rss_after = process.memory_info().rss
+            size = max(rss_after - rss_before, os.path.getsize(model_path))
+
+            with self._lock:
+                # Bỏ các bản cũ của cùng file (mtime khác)
+                for old_key in [k for k in self._models if k[0] == key[0] and k[2] == key[2]]:
+                    del self._models[old_key]
+                self._models[key] = (yolo, size)
+                self._evict(keep=key)
+            return yolo
+
+    def get_async(self, model_path, label, backend=BACKEND_TORCH, callback=None) -> Future:
+        """
+        Load model ở background (hot swap). callback(yolo) được gọi trên thread load
+        khi model sẵn sàng.
+        """
+        future = Future()
+
+        def _load():
+            try:
+                yolo = self.get(model_path, label, backend)
+                future.set_result(yolo)
+                if callback is not None:
+                    callback(yolo)
+            except Exception as ex:
+                future.set_exception(ex)
+
+        threading.Thread(target=_load, daemon=True).start()
+        return future
+
+    def _lookup(self, key):
+        with self._lock:
+            item = self._models.get(key)
+            if item is None:
+                return None
+            self._models.move_to_end(key)
+            return item[0]
+
+    def _evict(self, keep=None):
+        while self.memory_usage() > self.memory_budget and len(self._models) > 1:
+            key = next(iter(self._models))
+            if key == keep:
+                self._models.move_to_end(key)
+                key = next(iter(self._models))
+            del self._models[key]
+
+    def memory_usage(self):
+        return sum(size for _, size in self._models.values())
+
+    def loaded_models(self):
+        with self._lock:
+            return [(key[0], key[2], size) for key, (_, size) in self._models.items()]
+
+    def remove(self, model_path, backend=BACKEND_TORCH):
+        path = os.path.abspath(model_path)
+        with self._lock:
+            for key in [k for k in self._models if k[0] == path and k[2] == backend]:
+                del self._models[key]
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
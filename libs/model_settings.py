@@ -0,0 +1,189 @@
+import os
+import json
+import copy
+import threading
+from types import MappingProxyType
+from collections import namedtuple
+
+from libs.constants import *
+from libs.vision import BACKEND_TORCH
+from libs.processing import compile_processing
+from libs.trigger_queue import OVERFLOW_POLICIES, OVERFLOW_DROP_OLDEST
+
+
+CameraSettings = namedtuple("CameraSettings", ["name", "type", "id", "feature", "delay", "channels"])
+WeightSettings = namedtuple("WeightSettings", ["min", "max", "value"])
+ScannerSettings = namedtuple("ScannerSettings", ["comport", "baudrate"])
+LightingSettings = namedtuple("LightingSettings", ["controller", "comport", "baudrate"])
+SystemSettings = namedtuple("SystemSettings", ["log_dir", "log_size", "database_path"])
+ModelAISettings = namedtuple("ModelAISettings", ["model_path", "backend", "replicas", "confidence",
+                                                 "detect_method", "detect_kwargs"])
+PipelineSettings = namedtuple("PipelineSettings", ["enable", "queue_size"])
+TriggerSettings = namedtuple("TriggerSettings", ["queue_size", "dedup_ms", "overflow"])
+CaptureSettings = namedtuple("CaptureSettings", ["sync", "tolerance_ms"])
+
+# Cấu hình model đã biên dịch, chỉ đọc. config: bản sao dict gốc (tạo thiết bị, lưu kèm RESULT),
+# dùng chung qua cache của load_settings nên không được sửa, cần sửa thì deepcopy (AutoEngine.start)
+ModelSettings = namedtuple(
+    "ModelSettings",
+    ["model_name", "path", "mtime", "config", "cameras", "lighting", "weight", "scanner",
+     "system", "model_ai", "processing", "pipeline", "trigger",
+     "capture"],
+)
+
+
+def _section(config, *keys):
+    value = config
+    for key in keys:
+        if not isinstance(value, dict) or key not in value:
+            raise ValueError(f"Thiếu cấu hình: {'/'.join(keys)}")
+        value = value[key]
+    return value
+
+
+def _compile_cameras(modules) -> MappingProxyType:
+    cameras = {}
+    for name, camera in _section(modules, "camera_config").items():
+        device = _section(camera, "device")
+        lighting = _section(camera, "lighting")
+        channels = tuple(int(value) for value in lighting["channels"][:4])
+        if any(value < 0 for value in channels):
+            raise ValueError(f"Giá trị kênh đèn {name} không hợp lệ: {channels}")
+        cameras[name] = CameraSettings(
+            name=name,
+            type=device["type"],
+            id=device["id"],
+            feature=device["feature"],
+            delay=int(lighting["delay"]),
+            channels=channels,
+        )
+    return MappingProxyType(cameras)
+
+
+def _compile_model_ai(config, modules) -> ModelAISettings:
+    model_ai = _section(modules, "model_ai")
+    confidence = float(model_ai["confidence"])
+    if not 0 <= confidence <= 1:
+        raise ValueError(f"Confidence ngoài khoảng 0-1: {confidence}")
+
+    # Hàm detect của YoloInference và tham số tương ứng, chọn một lần khi biên dịch
+    tiling = model_ai.get("tiling", {})
+    rois = tuple(tuple(shape["box"]) for shape in config.get("shapes", {}).values())
+    if tiling.get("enable", False):
+        # Detect theo tile ở độ phân giải gốc (tuỳ chọn chỉ trong các ROI)
+        tiling_rois = tuple(tuple(roi) for roi in tiling.get("rois") or ())
+        method, kwargs = "detect_tiled", {
+            "conf": confidence,
+            "tile_size": int(tiling.get("tile_size", 640)),
+            "overlap": float(tiling.get("overlap", 0.2)),
+            "rois": tiling_rois or rois or None,
+        }
+    elif rois:
+        # Chỉ detect trong các ROI đã vẽ trên canvas
+        method, kwargs = "detect_rois", {"rois": rois, "conf": confidence, "imgsz": 640}
+    else:
+        method, kwargs = "detect_batch", {"conf": confidence, "imgsz": 640}
+
+    return ModelAISettings(
+        model_path=model_ai["model_path"],
+        backend=model_ai.get("backend", BACKEND_TORCH),
+        replicas=int(model_ai.get("replicas", 0)),
+        confidence=confidence,
+        detect_method=method,
+        detect_kwargs=MappingProxyType(kwargs),
+    )
+
+
+def compile_settings(config: dict, model_name="", path=None, mtime=0) -> ModelSettings:
+    """
+    Kiểm tra và biên dịch config của model thành ModelSettings (chỉ đọc).
+    Raise ValueError nếu thiếu mục hoặc giá trị không hợp lệ.
+    """
+    config = copy.deepcopy(config)
+    modules = _section(config, "modules")
+
+    try:
+        lighting = _section(modules, "lighting")
+        weight = _section(modules, "weight")
+        scanner = _section(modules, "scanner")
+        system = _section(modules, "system")
+        pipeline = modules.get("pipeline", {})
+        trigger = modules.get("trigger", {})
+        capture = modules.get("capture", {})
+
+        min_weight, max_weight = float(weight["min_weight"]), float(weight["max_weight"])
+        if min_weight >= max_weight:
+            raise ValueError(f"min_weight ({min_weight}) phải nhỏ hơn max_weight ({max_weight})")
+
+        try:
+            log_size = int(system["log_size"]) * 1024
+        except (KeyError, ValueError):
+            log_size = 10 * 1024
+
+        dedup_ms = trigger.get("dedup_ms", TRIGGER_DEDUP_MS)
+        dedup_ms = MappingProxyType(dict(dedup_ms)) if isinstance(dedup_ms, dict) else float(dedup_ms)
+        overflow = trigger.get("overflow", OVERFLOW_DROP_OLDEST)
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow phải là một trong {OVERFLOW_POLICIES}: {overflow}")
+
+        return ModelSettings(
+            model_name=model_name,
+            path=path,
+            mtime=mtime,
+            config=config,
+            cameras=_compile_cameras(modules),
+            lighting=LightingSettings(
+                controller=lighting["controller_light"],
+                comport=lighting["comport_light"],
+                baudrate=int(lighting["baudrate_light"]),
+            ),
+            weight=WeightSettings(min=min_weight, max=max_weight, value=float(weight["value_weight"])),
+            scanner=ScannerSettings(comport=scanner["comport_scanner"], baudrate=str(scanner["baudrate_scanner"])),
+            system=SystemSettings(
+                log_dir=system["log_dir"],
+                log_size=log_size,
+                database_path=os.path.join(system["log_dir"], system["database_path"]),
+            ),
+            model_ai=_compile_model_ai(config, modules),
+            processing=compile_processing(_section(modules, "processing")),
+            pipeline=PipelineSettings(
+                enable=bool(pipeline.get("enable", False)),
+                queue_size=int(pipeline.get("queue_size", 2)),
+            ),
+            trigger=TriggerSettings(
+                queue_size=int(trigger.get("queue_size", 16)),
+                dedup_ms=dedup_ms,
+                overflow=overflow,
+            ),
+            capture=CaptureSettings(
+                sync=bool(capture.get("sync", False)),
+                tolerance_ms=float(capture.get("tolerance_ms", 5.0)),
+            ),
+        )
+    except KeyError as e:
+        raise ValueError(f"Thiếu cấu hình: {e}")
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Cấu hình model {model_name} không hợp lệ: {e}")
+
+
+_cache = {}
+_lock_cache = threading.Lock()
+
+
+def load_settings(model_name, models_dir="models") -> ModelSettings:
+    """
+    Đọc models/<model_name>/config.json đã biên dịch, chỉ đọc và biên dịch lại khi file thay đổi (mtime).
+    """
+    path = os.path.join(models_dir, model_name, "config.json")
+    mtime = os.stat(path).st_mtime_ns
+    with _lock_cache:
+        settings = _cache.get(path)
+    if settings is not None and settings.mtime == mtime:
+        return settings
+
+    with open(path, "r") as f:
+        config = json.load(f)
+    settings = compile_settings(config, model_name, path, mtime)
+    with _lock_cache:
+        _cache[path] = settings
+    return settings
@@ -0,0 +1,231 @@
+import sys
+import enum
+from functools import partial
+from collections import namedtuple
+
+import cv2 as cv
+
+sys.path.append("cameras")
+
+from pixel_format import to_bgr, to_gray
+
+
+RESULT = namedtuple(
+    "result",
+    [
+        "step",
+        "time_check",
+        "model_name",
+        "result",
+        "src",
+        "binary",
+        "dst",
+        "code_sn",
+        "weight",
+        "error_type",
+        "config",
+        "frame_info",
+    ],
+    defaults=11 * [None],
+)
+
+
+class ColorType(enum.Enum):
+    GRAY = (cv.COLOR_BGR2GRAY, "GRAY")
+    RGB = (cv.COLOR_BGR2RGB, "RGB")
+    BGR = (cv.COLOR_RGB2BGR, "BGR")
+    HSV = (cv.COLOR_BGR2HSV, "HSV")
+
+    def __init__(self, value, label):
+        self._value_ = value
+        self.label = label
+
+    @classmethod
+    def from_label(cls, label: str):
+        for item in cls:
+            if item.label == label:
+                return item
+        raise ValueError(f"Không tìm thấy kiểu color từ label: {label}")
+
+    @classmethod
+    def from_value(cls, value: int):
+        for item in cls:
+            if item.value == value:
+                return item
+        raise ValueError(f"Không tìm thấy kiểu color từ giá trị: {value}")
+    
+    @classmethod
+    def list_labels(cls):
+        return [item.label for item in cls]
+    
+class BlurType(enum.Enum):
+    GAUSSIAN = (cv.GaussianBlur, "Gaussian Blur")
+    MEDIAN = (cv.medianBlur, "Median Blur")
+    BILATERAL = (cv.blur, "Average Blur")
+
+    def __init__(self, value, label):
+        self._value_ = value
+        self.label = label
+
+    @classmethod
+    def from_label(cls, label: str):
+        for item in cls:
+            if item.label == label:
+                return item
+        raise ValueError(f"Không tìm thấy kiểu blur từ label: {label}")
+
+    @classmethod
+    def from_value(cls, value):
+        for item in cls:
+            if item.value == value:
+                return item
+        raise ValueError(f"Không tìm thấy kiểu blur từ giá trị: {value}")
+    
+    @classmethod
+    def list_labels(cls):
+        return [item.label for item in cls]
+
+class ThresholdType(enum.Enum):
+    BINARY = (cv.THRESH_BINARY, "Thresh Binary")
+    BINARY_INV = (cv.THRESH_BINARY_INV, "Thresh Binary Inverted")
+    TRUNC = (cv.THRESH_TRUNC, "Thresh Truncate")
+    TOZERO = (cv.THRESH_TOZERO, "Thresh To Zero")
+    TOZERO_INV = (cv.THRESH_TOZERO_INV, "Thresh To Zero Inverted")
+
+    def __init__(self, value, label):
+        self._value_ = value
+        self.label = label
+
+    @classmethod
+    def from_label(cls, label: str):
+        for item in cls:
+            if item.label == label:
+                return item
+        raise ValueError(f"Không tìm thấy kiểu threshold từ label: {label}")
+
+    @classmethod
+    def from_value(cls, value: int):
+        for item in cls:
+            if item.value == value:
+                return item
+        raise ValueError(f"Không tìm thấy kiểu threshold từ giá trị: {value}")
+    
+    @classmethod
+    def list_labels(cls):
+        return [item.label for item in cls]
+    
+class MorphType(enum.Enum):
+    ERODE = (cv.MORPH_ERODE, "Erode")
+    DILATE = (cv.MORPH_DILATE, "Dilate")
+    OPEN = (cv.MORPH_OPEN, "Open")
+    CLOSE = (cv.MORPH_CLOSE, "Close")
+
+    def __init__(self, value, label):
+        self._value_ = value
+        self.label = label
+    
+    @classmethod
+    def from_label(cls, label: str):
+        for item in cls:
+            if item.label == label:
+                return item
+        raise ValueError(f"Không tìm thấy kiểu morph từ label: {label}")
+    
+    @classmethod
+    def from_value(cls, value: int):
+        for item in cls:
+            if item.value == value:
+                return item
+        raise ValueError(f"Không tìm thấy kiểu morph từ giá trị: {value}")
+    
+    @classmethod
+    def list_labels(cls):
+        return [item.label for item in cls]
+
+
+# Cấu hình processing đã biên dịch: hằng số OpenCV và structuring element tạo sẵn, không tra label mỗi frame
+ProcessingSettings = namedtuple(
+    "ProcessingSettings",
+    ["color", "color_code", "blur", "threshold_value", "threshold_type", "morph_op", "morph_kernel", "morph_iterations"],
+)
+
+
+def compile_processing(processing: dict) -> ProcessingSettings:
+    """
+    Biên dịch config["modules"]["processing"] thành ProcessingSettings, raise ValueError nếu cấu hình sai.
+    """
+    try:
+        color = ColorType.from_label(processing["color"])
+        blur_type = BlurType.from_label(processing["blur"]["type_blur"])
+        kernel_blur = int(processing["blur"]["kernel_size_blur"])
+        threshold_type = ThresholdType.from_label(processing["threshold"]["type_threshold"])
+        threshold_value = float(processing["threshold"]["value_threshold"])
+        morph_type = MorphType.from_label(processing["morphological"]["type_morph"])
+        iterations = int(processing["morphological"]["iteration"])
+        kernel_size = int(processing["morphological"]["kernel_size_morph"])
+    except KeyError as e:
+        raise ValueError(f"Thiếu cấu hình processing: {e}")
+
+    if kernel_blur < 1 or (blur_type != BlurType.BILATERAL and kernel_blur % 2 == 0):
+        raise ValueError(f"Kernel blur phải là số lẻ dương: {kernel_blur}")
+    if not 0 <= threshold_value <= 255:
+        raise ValueError(f"Ngưỡng threshold ngoài khoảng 0-255: {threshold_value}")
+    if kernel_size < 1 or iterations < 1:
+        raise ValueError(f"Kernel morph ({kernel_size}) và số lần lặp ({iterations}) phải dương")
+
+    # Median blur nhận ksize là số, Gaussian cần thêm sigma
+    if blur_type == BlurType.GAUSSIAN:
+        blur = partial(cv.GaussianBlur, ksize=(kernel_blur, kernel_blur), sigmaX=0)
+    elif blur_type == BlurType.MEDIAN:
+        blur = partial(cv.medianBlur, ksize=kernel_blur)
+    else:
+        blur = partial(cv.blur, ksize=(kernel_blur, kernel_blur))
+
+    kernel = cv.getStructuringElement(cv.MORPH_RECT, (kernel_size, kernel_size))
+    kernel.setflags(write=False)
+
+    return ProcessingSettings(
+        color=color,
+        color_code=None if color == ColorType.GRAY else color.value,
+        blur=blur,
+        threshold_value=threshold_value,
+        threshold_type=threshold_type.value,
+        morph_op=morph_type.value,
+        morph_kernel=kernel,
+        morph_iterations=iterations,
+    )
+
+
+def processing_binary(src, processing, pixel_format=None):
+    """
+    Tạo ảnh binary theo cấu hình processing của model (color, blur, threshold, morphological).
+    processing: ProcessingSettings đã biên dịch, hoặc config dict của model (biên dịch lại mỗi lần gọi).
+    """
+    if not isinstance(processing, ProcessingSettings):
+        processing = compile_processing(processing["modules"]["processing"])
+
+    if processing.color_code is None:
+        # Mono dùng thẳng, Bayer chuyển thẳng sang gray không demosaic màu
+        gray = to_gray(src, pixel_format)
+    else:
+        gray = cv.cvtColor(to_bgr(src, pixel_format), processing.color_code)
+
+    blur = processing.blur(gray)
+    _, thresh = cv.threshold(blur, processing.threshold_value, 255, processing.threshold_type)
+    binary = cv.morphologyEx(thresh, processing.morph_op, processing.morph_kernel,
+                             iterations=processing.morph_iterations)
+    return binary
+
+
+def put_text_dst(image, result, time_check, model_name, code_sn):
+    """
+    Vẽ kết quả OK/NG, thời gian, tên model và code SN lên ảnh kết quả.
+    """
+    if result == "PASS":
+        image = cv.putText(image, "OK", (100, 500), cv.FONT_HERSHEY_SIMPLEX, fontScale=10, color=(0, 255, 0), thickness=15, lineType=cv.LINE_AA)
+    elif result == "FAIL":
+        image = cv.putText(image, "NG", (100, 500), cv.FONT_HERSHEY_SIMPLEX, fontScale=10, color=(0, 0, 255), thickness=15, lineType=cv.LINE_AA)
+    image = cv.putText(image, time_check, (100, 2500), cv.FONT_HERSHEY_SIMPLEX, fontScale=3, color=(0, 255, 0), thickness=8, lineType=cv.LINE_4)
+    image = cv.putText(image, model_name, (100, 2750), cv.FONT_HERSHEY_SIMPLEX, fontScale=3, color=(0, 255, 0), thickness=8, lineType=cv.LINE_4)
+    dst = cv.putText(image, code_sn, (100, 3000), cv.FONT_HERSHEY_SIMPLEX, fontScale=2.5, color=(0, 255, 0), thickness=8, lineType=cv.LINE_4)
+    return dst
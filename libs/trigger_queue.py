@@ -0,0 +1,152 @@
+import time
+import threading
+from collections import deque, namedtuple
+from collections.abc import Mapping
+
+
+# Trigger hoặc sự kiện nội bộ trong hàng đợi, timestamp theo time.perf_counter()
+TriggerEvent = namedtuple("TriggerEvent", ["event", "source", "timestamp", "seq"])
+
+OVERFLOW_DROP_OLDEST = "drop_oldest"   # bỏ trigger cũ nhất, giữ trigger mới
+OVERFLOW_DROP_NEWEST = "drop_newest"   # bỏ trigger mới
+OVERFLOW_BLOCK = "block"               # chờ có chỗ (tối đa block_timeout) rồi bỏ trigger mới
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST, OVERFLOW_BLOCK)
+
+
+class TriggerQueue:
+    """
+    Hàng đợi trigger có giới hạn, mỗi trigger mang nguồn (io/scanner/tcp/software) và thời điểm nhận.
+    Trigger giống nhau từ cùng một nguồn trong dedup_ms được coi là một (chống dội IO, gửi lặp),
+    dedup_ms là một số cho mọi nguồn hoặc {nguồn: ms}, nguồn không có trong dict thì không lọc trùng.
+    Sự kiện nội bộ (stop, optic detect xong) không tính vào giới hạn và không bị bỏ.
+    """
+
+    def __init__(self, maxsize=16, dedup_ms=20.0, overflow=OVERFLOW_DROP_OLDEST, block_timeout=1.0):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.maxsize = max(1, int(maxsize))
+        self.dedup_ms = dict(dedup_ms) if isinstance(dedup_ms, Mapping) else float(dedup_ms)
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self._items = deque()
+        self._n_triggers = 0
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._last = {}
+
+        self._n_received = 0
+        self._n_accepted = 0
+        self._n_duplicated = 0
+        self._n_dropped = 0
+        self._max_depth = 0
+        self._sources = {}
+
+    def _append(self, item: TriggerEvent, is_trigger):
+        self._items.append(item)
+        if is_trigger:
+            self._n_triggers += 1
+            self._max_depth = max(self._max_depth, self._n_triggers)
+        # Producer chế độ block cũng chờ trên condition này nên đánh thức tất cả
+        self._cond.notify_all()
+
+    def _pop_oldest_trigger(self):
+        for item in self._items:
+            if item.source is not None:
+                self._items.remove(item)
+                self._n_triggers -= 1
+                return item
+        return None
+
+    def put(self, trigger, source="software", timestamp=None):
+        """
+        Thêm trigger, trả về (accepted, dropped).
+        accepted: False nếu trigger bị bỏ (trùng hoặc hàng đợi đầy)
+        dropped: TriggerEvent bị bỏ vì hàng đợi đầy (trigger cũ với drop_oldest), None nếu không có
+        """
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        with self._cond:
+            self._n_received += 1
+            key = (source, trigger)
+            last = self._last.get(key)
+            dedup_ms = self.dedup_ms.get(source, 0.0) if isinstance(self.dedup_ms, dict) else self.dedup_ms
+            if last is not None and (timestamp - last) * 1000 < dedup_ms:
+                self._n_duplicated += 1
+                return False, None
+            self._last[key] = timestamp
+
+            self._seq += 1
+            item = TriggerEvent(trigger, source, timestamp, self._seq)
+            dropped = None
+            if self._n_triggers >= self.maxsize:
+                if self.overflow == OVERFLOW_DROP_OLDEST:
+                    dropped = self._pop_oldest_trigger()
+                elif self.overflow == OVERFLOW_BLOCK:
+                    self._cond.wait_for(lambda: self._n_triggers < self.maxsize, timeout=self.block_timeout)
+                if self._n_triggers >= self.maxsize:
+                    self._n_dropped += 1
+                    return False, item
+            if dropped is not None:
+                self._n_dropped += 1
+
+            self._n_accepted += 1
+            self._sources[source] = self._sources.get(source, 0) + 1
+            self._append(item, True)
+            return True, dropped
+
+    def put_event(self, event):
+        """
+        Sự kiện nội bộ của luồng auto, luôn được thêm.
+        """
+        with self._cond:
+            self._seq += 1
+            self._append(TriggerEvent(event, None, time.perf_counter(), self._seq), False)
+
+    def _first(self, skip):
+        for item in self._items:
+            if item.event not in skip:
+                return item
+        return None
+
+    def get(self, timeout=None, skip=()) -> TriggerEvent:
+        """
+        Lấy trigger/sự kiện theo thứ tự đến, None nếu hết timeout.
+        skip: các trigger chưa xử lý được (ví dụ worker đầy), để lại trong hàng đợi và vẫn tính vào giới hạn
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._first(skip) is not None, timeout=timeout):
+                return None
+            item = self._first(skip)
+            self._items.remove(item)
+            if item.source is not None:
+                self._n_triggers -= 1
+                self._cond.notify_all()
+            return item
+
+    def clear_triggers(self) -> int:
+        """
+        Bỏ các trigger đang chờ, giữ sự kiện nội bộ. Trả về số trigger đã bỏ.
+        """
+        with self._cond:
+            n = self._n_triggers
+            self._items = deque(item for item in self._items if item.source is None)
+            self._n_triggers = 0
+            self._n_dropped += n
+            self._cond.notify_all()
+            return n
+
+    def qsize(self):
+        with self._cond:
+            return self._n_triggers
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "received": self._n_received,
+                "accepted": self._n_accepted,
+                "duplicated": self._n_duplicated,
+                "dropped": self._n_dropped,
+                "pending": self._n_triggers,
+                "max_depth": self._max_depth,
+                "sources": dict(self._sources),
+            }
@@ -4,6 +4,7 @@ from PyQt5.QtCore import *
 import os
 import time
 import cv2
+import numpy as np
 
 # ==========================================
 # UI STYLE AND APPEARANCE
@@ -449,13 +450,23 @@ class struct(object):
 
 
 def ndarray2pixmap(arr):
-    """Chuyển đổi numpy.ndarray thành QPixmap."""
-    if len(arr.shape) == 2:
-        rgb = cv2.cvtColor(arr, cv2.COLOR_GRAY2RGB)
+    """Chuyển đổi numpy.ndarray (gray hoặc BGR) thành QPixmap."""
+    if arr.ndim == 3 and arr.shape[2] == 1:
+        arr = arr.reshape(arr.shape[:2])
+    if arr.ndim == 2:
+        # Ảnh mono hiển thị trực tiếp, không chuyển sang 3 kênh
+        arr = np.ascontiguousarray(arr)
+        h, w = arr.shape
+        qimage = QImage(arr.data, w, h, arr.strides[0], QImage.Format_Grayscale8)
+    elif hasattr(QImage, "Format_BGR888"):
+        # Qt >= 5.14 đọc thẳng BGR, bỏ bước cvtColor
+        arr = np.ascontiguousarray(arr)
+        h, w, channel = arr.shape
+        qimage = QImage(arr.data, w, h, arr.strides[0], QImage.Format_BGR888)
     else:
-        rgb = cv2.cvtColor(arr, cv2.COLOR_BGR2RGB)
-    h, w, channel = rgb.shape
-    qimage = QImage(rgb.data, w, h, channel * w, QImage.Format_RGB888)
+        arr = cv2.cvtColor(arr, cv2.COLOR_BGR2RGB)
+        h, w, channel = arr.shape
+        qimage = QImage(arr.data, w, h, channel * w, QImage.Format_RGB888)
     pixmap = QPixmap.fromImage(qimage)
     return pixmap
 
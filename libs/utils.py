@@ -234,6 +234,41 @@ def runThread(target, args=(), daemon=False):
     return thread
 
 
+def run_parallel(tasks: dict, timeout=None, on_done=None) -> dict:
+    """
+    Chạy song song các hàm {tên: fn} và chờ tất cả với chung một timeout (giây).
+    on_done(name, ok, elapsed, error) được gọi khi từng việc xong.
+    Trả về {tên: (ok, elapsed, error)}, việc chưa xong khi hết timeout có error="timeout".
+    """
+    results = {}
+    cond = threading.Condition()
+    t_start = time.perf_counter()
+
+    def _run(name, fn):
+        try:
+            ok = fn() is not False
+            error = None if ok else "failed"
+        except Exception as ex:
+            ok, error = False, str(ex)
+        elapsed = time.perf_counter() - t_start
+        with cond:
+            results[name] = (ok, elapsed, error)
+            cond.notify_all()
+        if on_done is not None:
+            on_done(name, ok, elapsed, error)
+
+    for name, fn in tasks.items():
+        runThread(_run, args=(name, fn), daemon=True)
+
+    with cond:
+        cond.wait_for(lambda: len(results) == len(tasks), timeout=timeout)
+        elapsed = time.perf_counter() - t_start
+        for name in tasks:
+            if name not in results:
+                results[name] = (False, elapsed, "timeout")
+        return dict(results)
+
+
 def decorator_dt(f):
     """Decorator để đo thời gian thực thi của hàm."""
     t0 = time.time()
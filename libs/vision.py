@@ -3,7 +3,10 @@ import numpy as np
 import random
 import os
 import time
+import threading
+import psutil
 from collections import namedtuple, deque
+from concurrent.futures import Future
 
 import ultralytics
 from ultralytics import YOLO
@@ -97,6 +100,202 @@ class DNNRESULT:
             line += f" {round(x, 5)} {round(y, 5)}"
         return line
 
+class DetectionBatch:
+    '''
+    Tập kết quả detect của một ảnh lưu dạng struct-of-arrays:
+        boxes: (N, 4) float32 (x1, y1, x2, y2)
+        classes: (N,) int64
+        confs: (N,) float32
+        polygon (tuỳ chọn): lưu ragged gồm points (M, 2) int32 và offsets (N + 1,) int64,
+            polygon thứ i là points[offsets[i]:offsets[i + 1]]
+    Các filter/đếm đều chạy trên mảng numpy; DNNRESULT chỉ được tạo khi duyệt (lazy view)
+    để code cũ vẫn dùng được.
+    '''
+    def __init__(self, boxes=None, classes=None, confs=None,
+                 points=None, offsets=None, rects=None, imgsz=None) -> None:
+        '''
+        @boxes, @classes, @confs: mảng cùng độ dài N
+        @points, @offsets: ragged polygon store (None nếu model không có mask)
+        @rects: list minAreaRect theo từng object (None nếu không tính)
+        @imgsz: tuple size (width, height) of image
+        '''
+        self.boxes = np.zeros((0, 4), np.float32) if boxes is None else np.asarray(boxes, np.float32).reshape(-1, 4)
+        self.classes = np.zeros(0, np.int64) if classes is None else np.asarray(classes, np.int64).reshape(-1)
+        self.confs = np.zeros(0, np.float32) if confs is None else np.asarray(confs, np.float32).reshape(-1)
+        self.points = points
+        self.offsets = offsets
+        self.rects = rects
+        self.imgsz = imgsz
+
+    @staticmethod
+    def from_polygons(boxes, classes, confs, polygons=None, rects=None, imgsz=None):
+        '''
+        Tạo batch từ list polygon (mỗi phần tử là mảng (K, 2)).
+        '''
+        points = offsets = None
+        if polygons is not None:
+            lengths = np.array([len(poly) for poly in polygons], dtype=np.int64)
+            offsets = np.zeros(len(polygons) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+            if len(polygons):
+                points = np.concatenate([np.asarray(poly, np.int32).reshape(-1, 2) for poly in polygons])
+            else:
+                points = np.zeros((0, 2), np.int32)
+        return DetectionBatch(boxes, classes, confs, points, offsets, rects, imgsz)
+
+    @staticmethod
+    def from_results(results, imgsz=None):
+        '''
+        Tạo batch từ list DNNRESULT (code cũ).
+        '''
+        results = list(results)
+        has_mask = any(r.mask is not None for r in results)
+        polygons = [r.mask if r.mask is not None else np.zeros((0, 2), np.int32) for r in results] if has_mask else None
+        if imgsz is None and results:
+            imgsz = results[0].imgsz
+        return DetectionBatch.from_polygons(
+            boxes=[r.box for r in results],
+            classes=[r.class_index for r in results],
+            confs=[r.conf for r in results],
+            polygons=polygons,
+            imgsz=imgsz,
+        )
+
+    @property
+    def has_mask(self):
+        return self.offsets is not None
+
+    def __len__(self):
+        return len(self.confs)
+
+    def polygon(self, i):
+        if not self.has_mask:
+            return None
+        return self.points[self.offsets[i]:self.offsets[i + 1]]
+
+    def polygons(self):
+        return [self.polygon(i) for i in range(len(self))]
+
+    def __getitem__(self, i) -> DNNRESULT:
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError(i)
+        return DNNRESULT(
+            class_index=int(self.classes[i]),
+            box=self.boxes[i].astype(np.uint64),
+            mask=self.polygon(i),
+            conf=float(self.confs[i]),
+            rect=self.rects[i] if self.rects is not None else None,
+            imgsz=self.imgsz
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_list(self):
+        return list(self)
+
+    def select(self, keep):
+        '''
+        Lấy ra batch con theo mask bool hoặc mảng index (giữ nguyên thứ tự).
+        '''
+        keep = np.asarray(keep)
+        index = np.flatnonzero(keep) if keep.dtype == bool else keep.astype(np.int64)
+
+        points = offsets = None
+        if self.has_mask:
+            lengths = (self.offsets[1:] - self.offsets[:-1])[index]
+            offsets = np.zeros(len(index) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+            if len(index):
+                points = np.concatenate([self.points[self.offsets[i]:self.offsets[i + 1]] for i in index.tolist()])
+            else:
+                points = np.zeros((0, 2), np.int32)
+        rects = [self.rects[i] for i in index.tolist()] if self.rects is not None else None
+        return DetectionBatch(self.boxes[index], self.classes[index], self.confs[index],
+                              points, offsets, rects, self.imgsz)
+
+    def filter_class(self, class_indexes):
+        '''
+        Giữ lại các object có class thuộc class_indexes (int hoặc list int).
+        '''
+        return self.select(np.isin(self.classes, np.atleast_1d(class_indexes)))
+
+    def filter_conf(self, min_conf):
+        return self.select(self.confs >= min_conf)
+
+    def filter_roi(self, roi, use_center=True):
+        '''
+        Giữ lại các object nằm trong roi (x, y, w, h) - cùng định dạng Shape.cvBox.
+        @use_center: True - chỉ cần tâm box nằm trong roi, False - cả box phải nằm trong roi
+        '''
+        x, y, w, h = roi
+        x1, y1, x2, y2 = self.boxes.T
+        if use_center:
+            cx = (x1 + x2) / 2
+            cy = (y1 + y2) / 2
+            keep = (cx >= x) & (cx <= x + w) & (cy >= y) & (cy <= y + h)
+        else:
+            keep = (x1 >= x) & (y1 >= y) & (x2 <= x + w) & (y2 <= y + h)
+        return self.select(keep)
+
+    def sort_by_conf(self):
+        return self.select(np.argsort(-self.confs, kind="stable"))
+
+    def count_classes(self, n_classes=0):
+        '''
+        Số lượng object theo từng class, mảng có độ dài tối thiểu n_classes.
+        '''
+        return np.bincount(self.classes, minlength=n_classes)
+
+    def count(self, class_index):
+        return int(np.count_nonzero(self.classes == class_index))
+
+    def translate(self, dx, dy, imgsz=None):
+        '''
+        Dịch toàn bộ toạ độ (box, polygon, rect) đi (dx, dy), dùng để đưa kết quả
+        của một tile/ROI về toạ độ ảnh gốc.
+        '''
+        boxes = self.boxes + np.array([dx, dy, dx, dy], dtype=np.float32)
+        points = self.points + np.array([dx, dy], dtype=np.int32) if self.has_mask else None
+        rects = None
+        if self.rects is not None:
+            rects = [((r[0][0] + dx, r[0][1] + dy), r[1], r[2]) if r is not None else None for r in self.rects]
+        return DetectionBatch(boxes, self.classes.copy(), self.confs.copy(), points,
+                              self.offsets, rects, imgsz or self.imgsz)
+
+    @staticmethod
+    def concat(batches, imgsz=None):
+        '''
+        Ghép nhiều batch (ví dụ từ nhiều tile/ROI) thành một.
+        '''
+        batches = list(batches)
+        if not batches:
+            return DetectionBatch(imgsz=imgsz)
+        if imgsz is None:
+            imgsz = batches[0].imgsz
+
+        points = offsets = None
+        if any(b.has_mask for b in batches):
+            polygons = []
+            for b in batches:
+                polygons.extend(b.polygons() if b.has_mask else [np.zeros((0, 2), np.int32)] * len(b))
+            tmp = DetectionBatch.from_polygons(None, None, None, polygons)
+            points, offsets = tmp.points, tmp.offsets
+
+        rects = None
+        if all(b.rects is not None for b in batches):
+            rects = [r for b in batches for r in b.rects]
+        return DetectionBatch(
+            np.concatenate([b.boxes for b in batches]),
+            np.concatenate([b.classes for b in batches]),
+            np.concatenate([b.confs for b in batches]),
+            points, offsets, rects, imgsz
+        )
+
+
 def plot_text(text, img:np.ndarray, org:tuple=None, color:tuple=None, line_thickness=5):
     """
     Helper function for drawing single min area rect on image
@@ -175,21 +374,19 @@ def plot_results(results, img:np.ndarray, label_map=None, colors=None, lw=5):
         """
         Helper function for drawing bounding boxes on image
         Parameters:
-            results: list DNNRESULT("class_index", "box", "mask", "conf")
+            results: list DNNRESULT("class_index", "box", "mask", "conf") or DetectionBatch
             source_image (np.ndarray): input image for drawing
             label_map; (Dict[int, str]): label_id to class name mapping
         Returns:
 
         """
-        result:DNNRESULT = None
-        for result in results:
-            box = result.box
-            mask = result.mask
-            rect = result.rect
-            cls_index = result.class_index
-            conf = result.conf
+        if isinstance(results, DetectionBatch):
+            items = zip(results.boxes, results.classes.tolist(), results.confs.tolist(),
+                        results.polygons() if results.has_mask else [None] * len(results))
+        else:
+            items = ((r.box, r.class_index, r.conf, r.mask) for r in results)
 
-            h, w = img.shape[:2]
+        for box, cls_index, conf, mask in items:
 
             if label_map is not None:
                 label = f'{label_map[cls_index]}, {conf:.2f}'
@@ -241,17 +438,280 @@ def load_labels(label_path:str):
     return label_map
     
 
+def clip_roi(roi, width, height):
+    '''
+    Giới hạn roi (x, y, w, h) trong ảnh width x height, trả về None nếu roi nằm ngoài ảnh.
+    '''
+    x, y, w, h = map(int, roi)
+    x2, y2 = min(x + w, width), min(y + h, height)
+    x, y = max(0, x), max(0, y)
+    if x2 <= x or y2 <= y:
+        return None
+    return (x, y, x2 - x, y2 - y)
+
+
+def make_tiles(width, height, tile_size=640, overlap=0.2, rois=None):
+    '''
+    Chia ảnh (hoặc từng ROI) thành các tile (x, y, w, h) kích thước tối đa tile_size,
+    chồng lấn nhau theo tỉ lệ overlap. Tile cuối luôn sát mép nên số tile là cố định với
+    mỗi kích thước ảnh/ROI.
+    @rois: list (x, y, w, h) - None thì dùng toàn ảnh
+    '''
+    def _positions(start, length):
+        if length <= tile_size:
+            return [(start, length)]
+        stride = max(1, int(tile_size * (1 - overlap)))
+        n = int(np.ceil((length - tile_size) / stride)) + 1
+        xs = np.linspace(start, start + length - tile_size, n).round().astype(int)
+        return [(int(x), tile_size) for x in xs]
+
+    if not rois:
+        rois = [(0, 0, width, height)]
+
+    tiles = []
+    for roi in rois:
+        roi = clip_roi(roi, width, height)
+        if roi is None:
+            continue
+        x, y, w, h = roi
+        for ty, th in _positions(y, h):
+            for tx, tw in _positions(x, w):
+                tiles.append((tx, ty, tw, th))
+    return tiles
+
+
+def nms_batch(batch:DetectionBatch, iou_thres=0.5, match_metric="ios", class_agnostic=False):
+    '''
+    NMS trên DetectionBatch để gộp kết quả trùng giữa các tile.
+    @match_metric: "iou" - intersection over union,
+                   "ios" - intersection over smaller (box bị cắt ở mép tile vẫn bị gộp)
+    '''
+    if len(batch) <= 1:
+        return batch
+
+    boxes = batch.boxes.astype(np.float64)
+    if not class_agnostic:
+        # Tách các class ra xa nhau để không suppress chéo class
+        boxes = boxes + (batch.classes.astype(np.float64) * (boxes.max() + 1))[:, None]
+
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-batch.confs, kind="stable")
+
+    keep = []
+    while len(order):
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        if match_metric == "ios":
+            overlap = inter / np.maximum(np.minimum(areas[i], areas[rest]), 1e-9)
+        else:
+            overlap = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[overlap <= iou_thres]
+
+    return batch.select(np.array(keep, dtype=np.int64))
+
+
+BACKEND_TORCH = "torch"
+BACKEND_ONNX = "onnx"
+BACKEND_OPENVINO = "openvino"
+BACKENDS = [BACKEND_TORCH, BACKEND_ONNX, BACKEND_OPENVINO]
+TORCH_AUX_THREADS = 2 # thread torch cho pre/post-process khi suy luận bằng ONNX Runtime / OpenVINO
+
+
+def get_num_threads(num_threads=None):
+    '''
+    Số thread của runtime suy luận: mặc định dùng số core vật lý (hyper-thread không giúp gì cho conv).
+    '''
+    if num_threads:
+        return int(num_threads)
+    n_cores = psutil.cpu_count(logical=False)
+    return n_cores or os.cpu_count() or 1
+
+
+def get_torch_threads(backend=BACKEND_TORCH, num_threads=None):
+    '''
+    Số thread của torch theo backend: backend torch thì torch chạy cả suy luận (dùng hết num_threads),
+    ONNX Runtime / OpenVINO thì torch chỉ còn letterbox và NMS, giới hạn ở TORCH_AUX_THREADS
+    để không tranh core với session của runtime.
+    '''
+    n_threads = get_num_threads(num_threads)
+    if backend == BACKEND_TORCH:
+        return n_threads
+    return min(n_threads, TORCH_AUX_THREADS)
+
+
+def set_num_threads(backend=BACKEND_TORCH, num_threads=None):
+    '''
+    Gọi sau khi đã biết backend thực sự của model (export lỗi thì quay về torch), trước warm-up.
+    Số thread của torch là thiết lập chung cho cả process (get_torch_threads);
+    ONNX Runtime / OpenVINO nhận số thread qua session của chính nó (xem _runtime_session).
+    Trả về số thread của runtime suy luận.
+    '''
+    n_threads = get_num_threads(num_threads)
+    torch.set_num_threads(get_torch_threads(backend, n_threads))
+    return n_threads
+
+
+def get_exported_path(model_path, backend):
+    '''
+    Đường dẫn model đã convert nằm cạnh file .pt (theo quy ước tên của ultralytics export):
+        resources/models_ai/<name>.onnx
+        resources/models_ai/<name>_openvino_model/
+    '''
+    base, _ = os.path.splitext(model_path)
+    if backend == BACKEND_ONNX:
+        return f"{base}.onnx"
+    elif backend == BACKEND_OPENVINO:
+        return f"{base}_openvino_model"
+    return model_path
+
+
+def export_model(model_path, backend, imgsz=640):
+    '''
+    Convert file .pt sang backend và cache lại. Chỉ export lại khi file .pt mới hơn bản cache.
+    '''
+    exported_path = get_exported_path(model_path, backend)
+    if backend == BACKEND_TORCH:
+        return exported_path
+
+    if os.path.exists(exported_path) and os.path.getmtime(exported_path) >= os.path.getmtime(model_path):
+        return exported_path
+
+    start_time = time.perf_counter()
+    # dynamic=True để dùng được batch > 1 (detect_multi) và imgsz bất kỳ
+    path = YOLO(model_path).export(format=backend, imgsz=imgsz, dynamic=True)
+    print(f"- Exporting the network to {backend} took {time.perf_counter()-start_time:.2f} seconds.")
+    return str(path)
+
+
+def _runtime_session(exported_path, backend, num_threads):
+    '''
+    Tạo session của runtime với số thread cố định và đọc task từ metadata của bản export,
+    để không phải load model .pt chỉ để lấy task.
+    Trả về (session, task): onnxruntime.InferenceSession hoặc openvino CompiledModel.
+    '''
+    if backend == BACKEND_ONNX:
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.inter_op_num_threads = 1
+        session = ort.InferenceSession(exported_path, options, providers=["CPUExecutionProvider"])
+        task = session.get_modelmeta().custom_metadata_map.get("task")
+        return session, task
+
+    import openvino as ov
+    with open(os.path.join(exported_path, "metadata.yaml"), "r") as f:
+        task = (yaml.safe_load(f) or {}).get("task")
+    xml = next(name for name in os.listdir(exported_path) if name.endswith(".xml"))
+    core = ov.Core()
+    session = core.compile_model(core.read_model(os.path.join(exported_path, xml)), "CPU",
+                                 config={"PERFORMANCE_HINT": "LATENCY", "INFERENCE_NUM_THREADS": num_threads})
+    return session, task
+
+
+def _setup_predictor(model):
+    '''
+    Tạo predictor của ultralytics như lần predict đầu tiên của YOLO.predict nhưng chưa chạy ảnh nào,
+    để gắn session đã giới hạn thread trước khi warm-up.
+    '''
+    args = {**model.overrides, "conf": 0.25, "batch": 1, "save": False, "mode": "predict"}
+    model.predictor = model._smart_load("predictor")(overrides=args, _callbacks=model.callbacks)
+    model.predictor.setup_model(model=model.model, verbose=False)
+
+
+def _attach_session(model, backend, session):
+    '''
+    Thay session mặc định của ultralytics (dùng mọi core) bằng session đã giới hạn thread.
+    Gọi sau _setup_predictor, trước lần predict đầu tiên.
+    '''
+    autobackend = model.predictor.model
+    if backend == BACKEND_ONNX:
+        autobackend.session = session
+    else:
+        autobackend.ov_compiled_model = session
+
+
+def postprocess_batch(result, imgsz, approxy_contour=False, epsilon=0.001, min_rect=False):
+    '''
+    Chuyển kết quả predict của ultralytics (một ảnh) thành DetectionBatch, sắp xếp theo conf giảm dần.
+    Box/class/conf được lấy ra một lần dưới dạng mảng numpy; approxPolyDP và minAreaRect
+    chỉ chạy khi được yêu cầu.
+    @result: ultralytics Results của một ảnh
+    @imgsz: tuple size (width, height) của ảnh gốc
+    @approxy_contour: xấp xỉ polygon của mask bằng approxPolyDP
+    @epsilon: hệ số epsilon (theo chu vi) cho approxPolyDP
+    @min_rect: tính minAreaRect của mask
+    '''
+    boxes = result.boxes
+    if boxes is None or not len(boxes):
+        return DetectionBatch(imgsz=imgsz)
+
+    n_bndBox = boxes.xyxy.cpu().numpy()
+    n_conf = boxes.conf.cpu().numpy()
+    n_class_index = boxes.cls.cpu().numpy()
+
+    # Sắp xếp một lần trên mảng thay vì sort list object
+    order = np.argsort(-n_conf, kind="stable")
+
+    polygons = rects = None
+    if result.masks is not None:
+        xy = result.masks.xy
+        polygons = [xy[i].astype(np.int32) for i in order.tolist()]
+        if approxy_contour:
+            polygons = [cv2.approxPolyDP(poly, epsilon*cv2.arcLength(poly, True), True).reshape(-1, 2)
+                        if len(poly) else poly for poly in polygons]
+        if min_rect:
+            rects = [cv2.minAreaRect(poly) if len(poly) else None for poly in polygons]
+
+    return DetectionBatch.from_polygons(n_bndBox[order], n_class_index[order], n_conf[order],
+                                        polygons=polygons, rects=rects, imgsz=imgsz)
+
+
+def postprocess(result, imgsz, approxy_contour=False, epsilon=0.001, min_rect=False):
+    '''
+    Giống postprocess_batch nhưng trả về list DNNRESULT như trước.
+    '''
+    return postprocess_batch(result, imgsz, approxy_contour=approxy_contour,
+                             epsilon=epsilon, min_rect=min_rect).to_list()
+
+
 class YoloInference():
-    def __init__(self, model, label) -> None:
-        self.model = YoloInference.load_model(model)
+    def __init__(self, model, label, backend=BACKEND_TORCH, num_threads=None) -> None:
+        backend = backend if backend in BACKENDS else BACKEND_TORCH
+        self.num_threads = get_num_threads(num_threads)
+        self.model, self.backend = YoloInference.load_model(model, backend, self.num_threads)
+        # Predictor của ultralytics không thread-safe, model dùng chung (ModelRegistry) giữa GUI và luồng auto
+        self._predict_lock = threading.Lock()
         self.label_map = load_labels(label)
         np.random.seed(0)
         self.color_map = np.random.uniform(0, 255, size=(len(self.label_map), 3))
     
-    def load_model(model_path):
+    def load_model(model_path, backend=BACKEND_TORCH, num_threads=1):
+        '''
+        Trả về (model, backend thực sự dùng), export/load backend lỗi thì quay về torch.
+        '''
         start_time = time.perf_counter()
         try:
-            model = YOLO(model_path)
+            session = None
+            if backend != BACKEND_TORCH:
+                try:
+                    exported_path = export_model(model_path, backend)
+                    session, task = _runtime_session(exported_path, backend, num_threads)
+                    model = YOLO(exported_path, task=task)
+                except Exception as ex:
+                    print(f"- Load {backend} backend failed, fallback to {BACKEND_TORCH}: {ex}")
+                    session, backend = None, BACKEND_TORCH
+            if backend == BACKEND_TORCH:
+                model = YOLO(model_path)
+            set_num_threads(backend, num_threads)
+            if session is not None:
+                # Warm-up chạy trên session đã giới hạn thread, không phải session mặc định của ultralytics
+                _setup_predictor(model)
+                _attach_session(model, backend, session)
             model.predict(np.zeros((640, 640, 3), dtype=np.uint8))
             end_time = time.perf_counter()
             msg = f"- Loading the network took {end_time-start_time:.2f} seconds."
@@ -259,102 +719,261 @@ class YoloInference():
         except Exception as ex:
             print(str(ex))
             model = None
-        return model 
+        return model, backend
 
-    def detect(self, mat, conf=0.25, imgsz=640, approxy_contour=False, epsilon=0.001):
-        result = self.model.predict(mat, conf=conf, imgsz=imgsz)[0]
-        
-        boxes = result.boxes
-        masks = result.masks
-        
-        n_points = n_bndBox = n_class_index = n_conf = []
-
-        if masks is not None:
-            n_points = masks.xy
-
-        if len(boxes):
-            n_bndBox = boxes.xyxy.cpu().numpy().astype(np.uint64)
-            n_class_index = list(map(int, boxes.cls))
-            n_conf = list(map(float, boxes.conf))
-
-        results = []
-        for i in range(len(n_bndBox)):
-            mask = n_points[i].astype(np.uint64) if masks is not None else None
-            # 
-            if approxy_contour and mask is not None:
-                length = epsilon*cv2.arcLength(mask, True)
-                mask = cv2.approxPolyDP(mask, length, True)
-            # 
-            rect = cv2.minAreaRect(mask) if mask is not None else None
-
-            im_size = mat.shape[:2][::-1]
-
-            results.append(DNNRESULT(
-                class_index=n_class_index[i],
-                box=n_bndBox[i],
-                mask=mask,
-                conf=n_conf[i],
-                rect=rect,
-                imgsz=im_size
-            ))
-
-        results = sorted(results, key=lambda x: x.conf, reverse=True)
-
-        return results
+    def predict(self, source, **kwargs):
+        '''
+        model.predict, mỗi lúc chỉ một thread được predict trên cùng một model.
+        '''
+        with self._predict_lock:
+            return self.model.predict(source, **kwargs)
+
+    def detect(self, mat, conf=0.25, imgsz=640, approxy_contour=False, epsilon=0.001, min_rect=False):
+        result = self.predict(mat, conf=conf, imgsz=imgsz)[0]
+        return postprocess(result, mat.shape[:2][::-1], approxy_contour=approxy_contour,
+                           epsilon=epsilon, min_rect=min_rect)
     
+    def detect_batch(self, mat, conf=0.25, imgsz=640, approxy_contour=False, epsilon=0.001, min_rect=False):
+        '''
+        Giống detect nhưng trả về DetectionBatch.
+        '''
+        result = self.predict(mat, conf=conf, imgsz=imgsz)[0]
+        return postprocess_batch(result, mat.shape[:2][::-1], approxy_contour=approxy_contour,
+                                 epsilon=epsilon, min_rect=min_rect)
+
     def detect_multi(self, mats, conf=0.25, imgsz=640, 
-                     approxy_contour=False, epsilon=0.001):
-        t0 = time.time()
-        results = self.model.predict(mats, conf=conf, imgsz=imgsz)
-        dt = time.time() - t0
+                     approxy_contour=False, epsilon=0.001, min_rect=False):
+        results = self.predict(mats, conf=conf, imgsz=imgsz)
         
         _results = []
-        for i, result in enumerate(results):
-            boxes = result.boxes
-            masks = result.masks
-            
-            n_points = n_bndBox = n_class_index = n_conf = []
-
-            if masks is not None:
-                n_points = masks.xy
-
-            if len(boxes):
-                n_bndBox = boxes.xyxy.cpu().numpy().astype(np.uint64)
-                n_class_index = list(map(int, boxes.cls))
-                n_conf = list(map(float, boxes.conf))
-
-            _preds = []
-            for i in range(len(n_bndBox)):
-                mask = n_points[i].astype(np.uint64) if masks is not None else None
-                # 
-                if approxy_contour and mask is not None:
-                    length = epsilon*cv2.arcLength(mask, True)
-                    mask = cv2.approxPolyDP(mask, length, True)
-                # 
-                rect = cv2.minAreaRect(mask) if mask is not None else None
-
-                im_size = mats[i].shape[:2][::-1]
-
-                _preds.append(DNNRESULT(
-                    class_index=n_class_index[i],
-                    box=n_bndBox[i],
-                    mask=mask,
-                    conf=n_conf[i],
-                    rect=rect,
-                    imgsz=im_size
-                ))
-            
-            _results.append(_preds)
+        for mat, result in zip(mats, results):
+            _results.append(postprocess(result, mat.shape[:2][::-1], approxy_contour=approxy_contour,
+                                        epsilon=epsilon, min_rect=min_rect))
 
         return _results
 
+    def detect_multi_batch(self, mats, conf=0.25, imgsz=640,
+                           approxy_contour=False, epsilon=0.001, min_rect=False):
+        '''
+        Giống detect_multi nhưng trả về list DetectionBatch.
+        '''
+        results = self.predict(mats, conf=conf, imgsz=imgsz)
+        return [postprocess_batch(result, mat.shape[:2][::-1], approxy_contour=approxy_contour,
+                                  epsilon=epsilon, min_rect=min_rect)
+                for mat, result in zip(mats, results)]
+
+    def detect_tiled(self, mat, conf=0.25, tile_size=640, overlap=0.2, rois=None,
+                     iou_thres=0.5, match_metric="ios", batch_size=16,
+                     approxy_contour=False, epsilon=0.001, min_rect=False):
+        '''
+        Detect ở độ phân giải gốc: cắt ảnh (hoặc các ROI) thành tile tile_size x tile_size,
+        predict các tile theo batch rồi gộp kết quả bằng NMS giữa các tile.
+        Trả về DetectionBatch theo toạ độ ảnh gốc.
+        '''
+        im_h, im_w = mat.shape[:2]
+        tiles = make_tiles(im_w, im_h, tile_size=tile_size, overlap=overlap, rois=rois)
+        if not tiles:
+            return DetectionBatch(imgsz=(im_w, im_h))
+
+        batches = []
+        for i in range(0, len(tiles), batch_size):
+            chunk = tiles[i:i + batch_size]
+            crops = [mat[y:y + h, x:x + w] for x, y, w, h in chunk]
+            results = self.predict(crops, conf=conf, imgsz=tile_size)
+            for (x, y, w, h), result in zip(chunk, results):
+                batch = postprocess_batch(result, (w, h), approxy_contour=approxy_contour,
+                                          epsilon=epsilon, min_rect=min_rect)
+                if len(batch):
+                    batches.append(batch.translate(x, y, imgsz=(im_w, im_h)))
+
+        merged = DetectionBatch.concat(batches, imgsz=(im_w, im_h))
+        return nms_batch(merged, iou_thres=iou_thres, match_metric=match_metric)
+
+    def detect_rois(self, mat, rois, conf=0.25, imgsz=640, iou_thres=0.5,
+                    approxy_contour=False, epsilon=0.001, min_rect=False):
+        '''
+        Chỉ detect trong các ROI (x, y, w, h): cắt các ROI, predict một batch,
+        rồi đưa kết quả về toạ độ ảnh gốc. Kết quả trùng ở chỗ các ROI chồng nhau được gộp bằng NMS.
+        Trả về DetectionBatch.
+        '''
+        im_h, im_w = mat.shape[:2]
+        rois = [roi for roi in (clip_roi(roi, im_w, im_h) for roi in rois) if roi is not None]
+        if not rois:
+            return DetectionBatch(imgsz=(im_w, im_h))
+
+        crops = [mat[y:y + h, x:x + w] for x, y, w, h in rois]
+        results = self.predict(crops, conf=conf, imgsz=imgsz)
+
+        batches = []
+        for (x, y, w, h), result in zip(rois, results):
+            batch = postprocess_batch(result, (w, h), approxy_contour=approxy_contour,
+                                      epsilon=epsilon, min_rect=min_rect)
+            if len(batch):
+                batches.append(batch.translate(x, y, imgsz=(im_w, im_h)))
+
+        merged = DetectionBatch.concat(batches, imgsz=(im_w, im_h))
+        if len(rois) > 1:
+            merged = nms_batch(merged, iou_thres=iou_thres)
+        return merged.sort_by_conf()
+
     def classify(self, mat, conf=0.2, imgsz=640):
-        result = self.model.predict(mat, conf=conf, imgsz=imgsz)[0]
+        result = self.predict(mat, conf=conf, imgsz=imgsz)[0]
         probs = result.probs
         return DNNRESULT(
             class_index=probs.top1,
             conf=float(probs.top1conf)
         )
+
+
+class InferenceQueue():
+    '''
+    Gom các frame từ nhiều luồng gọi (camera1, camera2, ...) thành một batch
+    và chạy một lần `detect_multi`. Batch được chạy khi đủ `max_batch` frame
+    hoặc khi frame đầu tiên đã chờ quá `max_delay` giây.
+    '''
+    def __init__(self, yolo:YoloInference, max_batch=4, max_delay=0.005, history=1000,
+                 method="detect_multi") -> None:
+        '''
+        @yolo: YoloInference đã load model
+        @max_batch: số frame tối đa trong một lần predict
+        @max_delay: thời gian chờ tối đa (giây) để gom batch
+        @history: số mẫu latency giữ lại để thống kê
+        @method: "detect_multi" (list DNNRESULT) hoặc "detect_multi_batch" (DetectionBatch) cho mỗi frame
+        '''
+        self.yolo = yolo
+        self.max_batch = max(1, int(max_batch))
+        self.max_delay = max_delay
+        self.method = method
+
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._running = True
+
+        self._lock_stats = threading.Lock()
+        self._latencies = deque(maxlen=history)
+        self._n_frames = 0
+        self._n_batches = 0
+        self._t_start = time.perf_counter()
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, mat, conf=0.25, imgsz=640, approxy_contour=False, epsilon=0.001, min_rect=False) -> Future:
+        '''
+        Đưa một frame vào hàng đợi, trả về Future chứa kết quả (theo method) của frame đó.
+        Chỉ những frame có cùng tham số (conf, imgsz, ...) mới được gom chung batch.
+        '''
+        future = Future()
+        params = (conf, imgsz, approxy_contour, epsilon, min_rect)
+        with self._cond:
+            if not self._running:
+                future.set_exception(RuntimeError("InferenceQueue is stopped"))
+                return future
+            self._pending.append((mat, params, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def detect(self, mat, conf=0.25, imgsz=640, approxy_contour=False, epsilon=0.001, min_rect=False, timeout=None):
+        '''
+        Giống `YoloInference.detect` nhưng đi qua hàng đợi batch (blocking).
+        '''
+        future = self.submit(mat, conf=conf, imgsz=imgsz, approxy_contour=approxy_contour,
+                             epsilon=epsilon, min_rect=min_rect)
+        return future.result(timeout=timeout)
+
+    def _take_batch(self):
+        with self._cond:
+            while self._running and not self._pending:
+                self._cond.wait()
+            if not self._running:
+                return []
+
+            # Chờ thêm frame cho tới khi đủ batch hoặc hết deadline của frame đầu
+            deadline = self._pending[0][3] + self.max_delay
+            while self._running and len(self._pending) < self.max_batch:
+                remain = deadline - time.perf_counter()
+                if remain <= 0:
+                    break
+                self._cond.wait(remain)
+            # stop() có thể đã bỏ hết frame trong lúc chờ
+            if not self._running or not self._pending:
+                return []
+
+            params = self._pending[0][1]
+            batch = []
+            rest = deque()
+            while self._pending:
+                item = self._pending.popleft()
+                if item[1] == params and len(batch) < self.max_batch:
+                    batch.append(item)
+                else:
+                    rest.append(item)
+            self._pending = rest
+            return batch
+
+    def _run(self):
+        while self._running:
+            batch = self._take_batch()
+            if not batch:
+                continue
+
+            mats = [item[0] for item in batch]
+            conf, imgsz, approxy_contour, epsilon, min_rect = batch[0][1]
+            try:
+                detect = getattr(self.yolo, self.method)
+                results = detect(mats, conf=conf, imgsz=imgsz, approxy_contour=approxy_contour,
+                                 epsilon=epsilon, min_rect=min_rect)
+            except Exception as ex:
+                for item in batch:
+                    item[2].set_exception(ex)
+                continue
+
+            t_done = time.perf_counter()
+            with self._lock_stats:
+                self._n_batches += 1
+                self._n_frames += len(batch)
+                for item in batch:
+                    self._latencies.append(t_done - item[3])
+
+            for item, preds in zip(batch, results):
+                item[2].set_result(preds)
+
+    def stats(self) -> dict:
+        '''
+        Thống kê throughput và latency (giây) của hàng đợi.
+        '''
+        with self._lock_stats:
+            latencies = np.array(self._latencies, dtype=np.float64)
+            elapsed = time.perf_counter() - self._t_start
+            n_frames = self._n_frames
+            n_batches = self._n_batches
+
+        return {
+            "frames": n_frames,
+            "batches": n_batches,
+            "avg_batch_size": n_frames / n_batches if n_batches else 0.0,
+            "throughput": n_frames / elapsed if elapsed > 0 else 0.0,
+            "latency_avg": float(latencies.mean()) if len(latencies) else 0.0,
+            "latency_p95": float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+            "latency_max": float(latencies.max()) if len(latencies) else 0.0,
+        }
+
+    def reset_stats(self):
+        with self._lock_stats:
+            self._latencies.clear()
+            self._n_frames = 0
+            self._n_batches = 0
+            self._t_start = time.perf_counter()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            pending = list(self._pending)
+            self._pending.clear()
+            self._cond.notify_all()
+        for item in pending:
+            item[2].set_exception(RuntimeError("InferenceQueue is stopped"))
+        self._thread.join(timeout=1)
     
 
 if __name__ == "__main__":
@@ -114,18 +114,22 @@ from libs.constants import *
 from libs.canvas import WindowCanvas, Canvas
 from libs.shape import Shape
 from libs.ui_utils import load_style_sheet, update_style, add_scroll, ndarray2pixmap
-from libs.utils import scan_dir
 from libs.logger import Logger
 from libs.image_converter import ImageConverter
 from libs.tcp_server import Server
-from libs.vision import YoloInference, plot_results
+from libs.vision import plot_results, BACKEND_TORCH
+from libs.model_registry import ModelRegistry
 from libs.database_lite import *
 from cameras import HIK, SODA, Webcam, get_camera_devices
 from libs.camera_thread import CameraThread
+from pixel_format import is_bayer, to_bgr, to_preview
 from libs.light_controller import LCPController, DCPController
 from libs.serial_controller import SerialController
 from libs.vision_controller import VisionController
 from libs.io_controller import IOController, OutPorts, InPorts, PortState, IOType
+from libs.processing import RESULT, ColorType, BlurType, ThresholdType, MorphType
+from libs.auto_engine import AutoEngine
+from libs.model_settings import load_settings
 
 from libs.auto_scanner_dlg import AutoScannerDlg
 from libs.pop_up_dlg import PopUpDlg
@@ -138,24 +142,6 @@ window = ImportProgressBar()
 window.show()
 app.exec_()
 
-RESULT = namedtuple(
-    "result",
-    [
-        "step",
-        "time_check",
-        "model_name",
-        "result",
-        "src",
-        "binary",
-        "dst",
-        "code_sn",
-        "weight",
-        "error_type",
-        "config",
-    ],
-    defaults=10 * [None],
-)
-
 DATA_IMAGE = namedtuple(
     "data_image",
     [
@@ -175,119 +161,6 @@ class TypeLog(enum.Enum):
     ERROR = 4
     CRITICAL = 5
 
-class ColorType(enum.Enum):
-    GRAY = (cv.COLOR_BGR2GRAY, "GRAY")
-    RGB = (cv.COLOR_BGR2RGB, "RGB")
-    BGR = (cv.COLOR_RGB2BGR, "BGR")
-    HSV = (cv.COLOR_BGR2HSV, "HSV")
-
-    def __init__(self, value, label):
-        self._value_ = value
-        self.label = label
-
-    @classmethod
-    def from_label(cls, label: str):
-        for item in cls:
-            if item.label == label:
-                return item
-        raise ValueError(f"Không tìm thấy kiểu color từ label: {label}")
-
-    @classmethod
-    def from_value(cls, value: int):
-        for item in cls:
-            if item.value == value:
-                return item
-        raise ValueError(f"Không tìm thấy kiểu color từ giá trị: {value}")
-    
-    @classmethod
-    def list_labels(cls):
-        return [item.label for item in cls]
-    
-class BlurType(enum.Enum):
-    GAUSSIAN = (cv.GaussianBlur, "Gaussian Blur")
-    MEDIAN = (cv.medianBlur, "Median Blur")
-    BILATERAL = (cv.blur, "Average Blur")
-
-    def __init__(self, value, label):
-        self._value_ = value
-        self.label = label
-
-    @classmethod
-    def from_label(cls, label: str):
-        for item in cls:
-            if item.label == label:
-                return item
-        raise ValueError(f"Không tìm thấy kiểu blur từ label: {label}")
-
-    @classmethod
-    def from_value(cls, value):
-        for item in cls:
-            if item.value == value:
-                return item
-        raise ValueError(f"Không tìm thấy kiểu blur từ giá trị: {value}")
-    
-    @classmethod
-    def list_labels(cls):
-        return [item.label for item in cls]
-
-class ThresholdType(enum.Enum):
-    BINARY = (cv.THRESH_BINARY, "Thresh Binary")
-    BINARY_INV = (cv.THRESH_BINARY_INV, "Thresh Binary Inverted")
-    TRUNC = (cv.THRESH_TRUNC, "Thresh Truncate")
-    TOZERO = (cv.THRESH_TOZERO, "Thresh To Zero")
-    TOZERO_INV = (cv.THRESH_TOZERO_INV, "Thresh To Zero Inverted")
-
-    def __init__(self, value, label):
-        self._value_ = value
-        self.label = label
-
-    @classmethod
-    def from_label(cls, label: str):
-        for item in cls:
-            if item.label == label:
-                return item
-        raise ValueError(f"Không tìm thấy kiểu threshold từ label: {label}")
-
-    @classmethod
-    def from_value(cls, value: int):
-        for item in cls:
-            if item.value == value:
-                return item
-        raise ValueError(f"Không tìm thấy kiểu threshold từ giá trị: {value}")
-    
-    @classmethod
-    def list_labels(cls):
-        return [item.label for item in cls]
-    
-class MorphType(enum.Enum):
-    ERODE = (cv.MORPH_ERODE, "Erode")
-    DILATE = (cv.MORPH_DILATE, "Dilate")
-    OPEN = (cv.MORPH_OPEN, "Open")
-    CLOSE = (cv.MORPH_CLOSE, "Close")
-
-    def __init__(self, value, label):
-        self._value_ = value
-        self.label = label
-    
-    @classmethod
-    def from_label(cls, label: str):
-        for item in cls:
-            if item.label == label:
-                return item
-        raise ValueError(f"Không tìm thấy kiểu morph từ label: {label}")
-    
-    @classmethod
-    def from_value(cls, value: int):
-        for item in cls:
-            if item.value == value:
-                return item
-        raise ValueError(f"Không tìm thấy kiểu morph từ giá trị: {value}")
-    
-    @classmethod
-    def list_labels(cls):
-        return [item.label for item in cls] 
-
-
 class MainWindow(QMainWindow):
     signalResultAuto = pyqtSignal(object, str)
     signalResultTeaching = pyqtSignal(object)
@@ -295,10 +168,16 @@ class MainWindow(QMainWindow):
     signalShowPopup = pyqtSignal(str, str, str)
 
     signalChangeLabelResult = pyqtSignal(str)
+    signalWeightAuto = pyqtSignal(float, bool)
+    signalOpticCountAuto = pyqtSignal(int, int)
+    signalModelCodeAuto = pyqtSignal(str, bool)
+    signalCodeSNAuto = pyqtSignal(object)
     signalChangeLight = pyqtSignal(object)
 
     signalLogUI = pyqtSignal(TypeLog, str)
 
+    signalModelAiLoaded = pyqtSignal(object, str)
+
     loadProgress = pyqtSignal(int, str)
     finishProgress = pyqtSignal()
 
@@ -334,19 +213,15 @@ class MainWindow(QMainWindow):
 
         # Camera
         self.camera_thread = None
-        self.camera1 = None
-        self.camera2 = None
 
         # Lighting
         self.light_controller = None
 
         # Weight Controller
         self.weight_controller = None
-        self.weight = None
 
         # Vision Master
         self.vision_master_controller = None
-        self.dataVM = None
 
         # Scanner Controller
         self.scanner_controller = None
@@ -363,18 +238,27 @@ class MainWindow(QMainWindow):
 
         # Model AI
         self.model_ai = None
+        self.model_ai_backend = BACKEND_TORCH
+        self.model_ai_tiling = {}
+        self.model_ai_replicas = 0
 
-        # Image
+        # Pipeline luồng auto (chụp / xử lý / output song song)
+        self.pipeline_enable = False
+        self.pipeline_queue_size = 2
+
+        # Hàng đợi trigger của luồng auto (giới hạn, lọc trùng theo nguồn, xử lý khi đầy)
+        self.trigger_config = {}
+        self.capture_config = {}
+
+        # Image: ảnh gốc độ phân giải đầy đủ, pixel_format None thì đoán theo shape (ảnh từ file)
         self.current_image = None
-        self.current_image_camera1 = None
-        self.current_image_camera2 = None
+        self.current_pixel_format = None
         self.file_paths = []
 
+        # Auto: camera, bộ điều khiển, model và các bước xử lý nằm trong AutoEngine
+        self.auto_engine = None
+
         # Threading
-        self._b_trigger_weight_auto = False
-        self._b_trigger_optic_auto = False
-        self._b_trigger_unitbox_auto = False
-        self._b_stop_auto = False
         self._b_trigger_teaching = False
         self._b_stop_teaching = False
 
@@ -580,6 +464,7 @@ class MainWindow(QMainWindow):
         self.ui.combo_type_camera.currentIndexChanged.connect(
             self.on_change_camera_type
         )
+        self.ui.combo_model_ai.activated.connect(self.on_change_model_ai)
 
         # DockWidget
         self.ui.dockWidgetImageBinary.setVisible(False)
@@ -600,6 +485,10 @@ class MainWindow(QMainWindow):
 
         # Kết nối tín hiệu thay đổi Label
         self.signalChangeLabelResult.connect(self.handle_change_label_result)
+        self.signalWeightAuto.connect(self.handle_weight_auto)
+        self.signalOpticCountAuto.connect(self.handle_optic_count_auto)
+        self.signalModelCodeAuto.connect(self.handle_model_code_auto)
+        self.signalCodeSNAuto.connect(self.handle_code_sn_auto)
 
         # Kết nối tín hiệu thay đổi ánh sáng
         self.signalChangeLight.connect(self.handle_change_light)
@@ -608,6 +497,9 @@ class MainWindow(QMainWindow):
         # Kết nối tín hiệu gửi thông báo
         self.signalLogUI.connect(self.handle_log_ui)
 
+        # Kết nối tín hiệu load model AI ở background
+        self.signalModelAiLoaded.connect(self.handle_model_ai_loaded)
+
     def load_theme(self):
         self.ui.actionLight.triggered.connect(partial(self.set_theme, "light"))
         self.ui.actionDark.triggered.connect(partial(self.set_theme, "dark"))
@@ -761,9 +653,30 @@ class MainWindow(QMainWindow):
                         "database_path": "database.db",
                         "auto_start": false
                     },
+                    "pipeline": {
+                        "enable": False,
+                        "queue_size": 2
+                    },
+                    "trigger": {
+                        "queue_size": 16,
+                        "dedup_ms": TRIGGER_DEDUP_MS,
+                        "overflow": "drop_oldest"
+                    },
+                    "capture": {
+                        "sync": False,
+                        "tolerance_ms": 5.0
+                    },
                     "model_ai": {
                         "model_path": "best_plus",
-                        "confidence": "0.75"
+                        "confidence": "0.75",
+                        "backend": "torch",
+                        "replicas": 0,
+                        "tiling": {
+                            "enable": False,
+                            "tile_size": 640,
+                            "overlap": 0.2,
+                            "rois": []
+                        }
                     },
                     "processing": {
                         "color": "GRAY",
@@ -788,6 +701,11 @@ class MainWindow(QMainWindow):
                                 "id": "DA5691956",
                                 "feature": "Camera_1"
                             },
+                            "sensor": {
+                                "roi": [],
+                                "binning": 1,
+                                "decimation": 1
+                            },
                             "lighting": {
                                 "delay": 200,
                                 "channels": [
@@ -804,6 +722,11 @@ class MainWindow(QMainWindow):
                                 "id": "DA5691962",
                                 "feature": "Camera_2"
                             },
+                            "sensor": {
+                                "roi": [],
+                                "binning": 1,
+                                "decimation": 1
+                            },
                             "lighting": {
                                 "delay": 200,
                                 "channels": [
@@ -864,6 +787,15 @@ class MainWindow(QMainWindow):
                         "feature": f"resources/cameras/SODA/{camera_feature}.ini",
                     },
                 )
+            elif camera_type in ("Replay", "Synthetic"):
+                # Camera giả lập (thư mục ảnh/video hoặc frame sinh ngẫu nhiên), feature là file yaml
+                self.camera_thread = CameraThread(
+                    camera_type,
+                    {
+                        "id": camera_id,
+                        "feature": f"resources/cameras/{camera_type}/{camera_feature}.yaml" if camera_feature else "",
+                    },
+                )
             else:
                 # Mặc định sử dụng Webcam
                 self.ui_logger.warning(
@@ -1043,18 +975,22 @@ class MainWindow(QMainWindow):
             self.ui_logger.error(f"Lỗi khi khởi tạo hệ thống: {str(e)}")
             return False
         
-    def init_model_ai(self, model_path):
+    def init_model_ai(self, model_path, backend=None):
         """
         Khởi tạo model AI với thông số từ giao diện.
         """
         try:
+            if backend is None:
+                backend = self.model_ai_backend
+
             # Ghi log thông số model AI
-            self.ui_logger.info(f"Khởi tạo model AI: Path={model_path}")
+            self.ui_logger.info(f"Khởi tạo model AI: Path={model_path}, Backend={backend}")
 
-            # Khởi tạo model AI với thông số từ giao diện
-            self.model_ai = YoloInference(
-                model=f"resources/models_ai/{model_path}.pt",
+            # Lấy model từ registry (đã load và warm-up thì dùng lại ngay)
+            self.model_ai = ModelRegistry.instance().get(
+                model_path=f"resources/models_ai/{model_path}.pt",
                 label=LABEL_CONFIG_PATH,
+                backend=backend,
             )
 
             return True
@@ -1063,100 +999,6 @@ class MainWindow(QMainWindow):
             self.ui_logger.error(f"Lỗi khi khởi tạo Model AI: {str(e)}")
             return False
         
-    def init_camera_config(self, camera_config: dict):
-        """
-        Khởi tạo camera với thông số từ giao diện.
-        """
-        try:
-            camera_config1 = camera_config["camera1"]
-            camera_type1 = camera_config1["device"]["type"]
-            camera_id1 = camera_config1["device"]["id"]
-            camera_feature1 = camera_config1["device"]["feature"]
-
-            camera_config2 = camera_config["camera2"]
-            camera_type2 = camera_config2["device"]["type"]
-            camera_id2 = camera_config2["device"]["id"]
-            camera_feature2 = camera_config2["device"]["feature"]
-
-            # Ghi log thông số camera
-            self.ui_logger.info(
-                f"Khởi tạo camera1: Type={camera_type1}, ID={camera_id1}, Feature={camera_feature1}"
-            )
-            self.ui_logger.info(
-                f"Khởi tạo camera2: Type={camera_type2}, ID={camera_id2}, Feature={camera_feature2}"
-            )
-
-            # Khởi tạo camera thread với thông số từ giao diện
-            self.init_camera_1(camera_type1, camera_id1, camera_feature1)
-            self.init_camera_2(camera_type2, camera_id2, camera_feature2)
-            
-            return True
-
-        except Exception as e:
-            self.ui_logger.error(f"Lỗi khi khởi tạo camera: {str(e)}")
-            return False
-        
-    def init_camera_1(self, camera_type, camera_id, camera_feature):
-        if camera_type == "Webcam":
-            self.camera1 = CameraThread(
-                camera_type, {"id": camera_id, "feature": camera_feature,}
-            )
-        elif camera_type == "HIK":
-            # Cấu hình đặc biệt cho camera HIK nếu cần
-            self.camera1 = CameraThread(
-                camera_type,
-                {
-                    "id": camera_id,
-                    "feature": f"resources/cameras/HIK/{camera_feature}.ini",
-                },
-            )
-        elif camera_type == "SODA":
-            # Cấu hình đặc biệt cho camera SODA nếu cần
-            self.camera1 = CameraThread(
-                camera_type,
-                {
-                    "id": camera_id,
-                    "feature": f"resources/cameras/SODA/{camera_feature}.ini",
-                },
-            )
-        else:
-            # Mặc định sử dụng Webcam
-            self.ui_logger.warning(
-                f"Loại camera {camera_type} không được hỗ trợ, sử dụng Webcam mặc định"
-            )
-            self.camera1 = CameraThread("Webcam", {"id": "0", "feature": ""})
-
-    def init_camera_2(self, camera_type, camera_id, camera_feature):
-        if camera_type == "Webcam":
-            self.camera2 = CameraThread(
-                camera_type, {"id": camera_id, "feature": camera_feature,}
-            )
-        elif camera_type == "HIK":
-            # Cấu hình đặc biệt cho camera HIK nếu cần
-            self.camera2 = CameraThread(
-                camera_type,
-                {
-                    "id": camera_id,
-                    "feature": f"resources/cameras/HIK/{camera_feature}.ini",
-                },
-            )
-        elif camera_type == "SODA":
-            # Cấu hình đặc biệt cho camera SODA nếu cần
-            self.camera2 = CameraThread(
-                camera_type,
-                {
-                    "id": camera_id,
-                    "feature": f"resources/cameras/SODA/{camera_feature}.ini",
-                },
-            )
-        else:
-            # Mặc định sử dụng Webcam
-            self.ui_logger.warning(
-                f"Loại camera {camera_type} không được hỗ trợ, sử dụng Webcam mặc định"
-            )
-            self.camera2 = CameraThread("Webcam", {"id": "0", "feature": ""})
-
-
     def write_log(self):
         """Ghi thử một số log"""
         self.signalLogUI.emit(TypeLog.DEFAULT, "Một thông báo khác")
@@ -1178,46 +1020,6 @@ class MainWindow(QMainWindow):
         # self.ui_logger.debug(f"Get elappsed_time: {time.time() - self.t_start}")
         return time.time() - self.t_start
 
-    @property
-    def b_trigger_weight_auto(self):
-        return self._b_trigger_weight_auto
-
-    @b_trigger_weight_auto.setter
-    def b_trigger_weight_auto(self, boolean):
-        if not isinstance(boolean, bool):
-            raise self.ui_logger.error("Biến phải là kiểu bool!")
-        self._b_trigger_weight_auto = boolean
-
-    @property
-    def b_trigger_optic_auto(self):
-        return self._b_trigger_optic_auto
-
-    @b_trigger_optic_auto.setter
-    def b_trigger_optic_auto(self, boolean):
-        if not isinstance(boolean, bool):
-            raise self.ui_logger.error("Biến phải là kiểu bool!")
-        self._b_trigger_optic_auto = boolean
-
-    @property
-    def b_trigger_unitbox_auto(self):
-        return self._b_trigger_unitbox_auto
-
-    @b_trigger_unitbox_auto.setter
-    def b_trigger_unitbox_auto(self, boolean):
-        if not isinstance(boolean, bool):
-            raise self.ui_logger.error("Biến phải là kiểu bool!")
-        self._b_trigger_unitbox_auto = boolean
-
-    @property
-    def b_stop_auto(self):
-        return self._b_stop_auto
-
-    @b_stop_auto.setter
-    def b_stop_auto(self, boolean):
-        if not isinstance(boolean, bool):
-            raise self.ui_logger.error("Biến phải là kiểu bool!")
-        self._b_stop_auto = boolean
-
     @property
     def b_trigger_teaching(self):
         return self._b_trigger_teaching
@@ -1307,6 +1109,8 @@ class MainWindow(QMainWindow):
 
     def clear_list(self, list_widget_code_sn=None):
         self.listCodeSN = []
+        if self.auto_engine is not None:
+            self.auto_engine.clear_code_sn()
         if list_widget_code_sn is None:
             list_widget_code_sn = self.ui.list_widget_code_sn
 
@@ -1369,12 +1173,6 @@ class MainWindow(QMainWindow):
         try:
             self.ui_logger.info("Đang reset hệ thống")
 
-            # Dừng luồng auto
-            self.b_stop_auto = True
-            self.b_trigger_weight_auto = False
-            self.b_trigger_optic_auto = False
-            self.b_trigger_unitbox_auto = False
-
             # Cập nhật UI
             self.ui.btn_start.setEnabled(True)
             self.ui.combo_model.setEnabled(True)
@@ -1407,38 +1205,15 @@ class MainWindow(QMainWindow):
             self.ui_logger.error(f"Error stop auto: {str(e)}")
 
     def release_loop_auto(self):
-        self.io_controller.write_out(OutPorts.Out_1, PortState.Off)  
-        time.sleep(0.05)
-        self.io_controller.write_out(OutPorts.Out_2, PortState.Off)  
-        time.sleep(0.05)
-        self.io_controller.write_out(OutPorts.Out_3, PortState.Off)  
-        time.sleep(0.05)
+        # Engine tắt output IO và đóng camera, bộ điều khiển của luồng auto
+        if self.auto_engine is not None:
+            self.auto_engine.release()
+            self.auto_engine = None
 
         self.clear_list()
 
-        if self.camera1 is not None:
-            self.camera1.close_camera()
-            self.camera1 = None
-        if self.camera2 is not None:
-            self.camera2.close_camera()
-            self.camera2 = None
-
         if self.camera_thread is not None:
             self.close_camera()
-        if self.light_controller is not None:
-            self.close_light()
-        if self.weight_controller is not None:
-            self.close_weight()
-        if self.vision_master_controller is not None:
-            self.close_vision_master()
-        if self.scanner_controller is not None:
-            self.close_scanner()
-        if self.out_com_controller is not None:
-            self.close_out_com()
-        if self.io_controller is not None:
-            self.close_io()
-        if self.tcp_server is not None:
-            self.disconnect_server()
         # self.ui.btn_start_teaching.setEnabled(True)
         self.ui.btn_open_camera.setEnabled(True)
         # self.ui.btn_open_light.setEnabled(True)
@@ -1446,194 +1221,58 @@ class MainWindow(QMainWindow):
         # self.ui.btn_connect_server.setEnabled(True)
 
     def start_loop_auto(self):
-        config = self.load_config(model_setting=False)
-
-        # # Init Camera
-        # camera_type = config["modules"]["camera"]["type"]
-        # camera_id = config["modules"]["camera"]["id"]
-        # camera_feature = config["modules"]["camera"]["feature"]
-        # self.init_camera(camera_type, camera_id, camera_feature)
-
-        # Init Camera Config
-        camera_config = config["modules"]["camera_config"]
-        self.init_camera_config(camera_config)
-
-        # Init Lighting
-        light_controller_type = config["modules"]["lighting"]["controller_light"]
-        com_port_light = config["modules"]["lighting"]["comport_light"]
-        baud_rate_light = int(config["modules"]["lighting"]["baudrate_light"])
-        self.init_lighting(light_controller_type, com_port_light, baud_rate_light)
-
-        # Init Weight
-        com_port_weight = config["modules"]["weight"]["comport_weight"]
-        baud_rate_weight = int(config["modules"]["weight"]["baudrate_weight"])
-        self.init_weight(com_port_weight, baud_rate_weight)
-        min_weight = config["modules"]["weight"]["min_weight"]
-        max_weight = config["modules"]["weight"]["max_weight"]
-        value_weight = config["modules"]["weight"]["value_weight"]
+        settings = self.load_config(model_setting=False)
+        if settings is None:
+            self.ui_logger.error("Failed to load configuration")
+            return
+
+        min_weight = settings.config["modules"]["weight"]["min_weight"]
+        max_weight = settings.config["modules"]["weight"]["max_weight"]
+        value_weight = settings.config["modules"]["weight"]["value_weight"]
         self.ui.label_value_min.setText(min_weight)
         self.ui.label_value_max.setText(max_weight)
         self.ui.label_value_weight_auto.setText(value_weight)
 
-        # Init Vision Master
-        com_port_vision_master = config["modules"]["vision_master"]["comport_vision_master"]
-        baud_rate_vision_master = int(config["modules"]["vision_master"]["baudrate_vision_master"])
-        strTrigger = config["modules"]["vision_master"]["string_trigger"]
-        self.init_vision_master(com_port_vision_master, baud_rate_vision_master, strTrigger)
-
-        # Init Scanner
-        com_port_scanner = config["modules"]["scanner"]["comport_scanner"]
-        baud_rate_scanner = int(config["modules"]["scanner"]["baudrate_scanner"])
-        self.init_scanner(com_port_scanner, baud_rate_scanner)
-
-        # Init Out COM
-        com_port_out_com = config["modules"]["out_com"]["comport_out_com"]
-        baud_rate_out_com = int(config["modules"]["out_com"]["baudrate_out_com"])
-        self.init_out_com(com_port_out_com, baud_rate_out_com)
-
-        # Init IO Controller
-        com_port_io = config["modules"]["io"]["comport_io"]
-        baud_rate_io = int(config["modules"]["io"]["baudrate_io"])
-        self.init_io(com_port_io, baud_rate_io)
-
-        # Init Server
-        host = config["modules"]["server"]["host"]
-        port = int(config["modules"]["server"]["port"])
-        self.init_server(host, port)
-
-        # Set initial states
-        self.current_step_auto = STEP_WAIT_TRIGGER_AUTO
-        self.b_trigger_weight_auto = False
-        self.b_trigger_optic_auto = False
-        self.b_trigger_unitbox_auto = False
-        self.b_stop_auto = False
-        self.final_result = None
-
-        threading.Thread(target=self.setup_loop_auto, daemon=True).start()
-
-    def setup_loop_auto(self):
-        if self.camera1 is not None and self.camera2 is not None:
-            t1 = threading.Thread(target=self.open_camera_auto, daemon=True)
-            t1.start()
-            t1.join()
-
-        time.sleep(0.2)
-        if self.light_controller is not None:
-            t2 = threading.Thread(target=self.open_light_auto, daemon=True)
-            t2.start()
-            t2.join()
-
-        time.sleep(0.2)
-        if self.weight_controller is not None:
-            t3 = threading.Thread(target=self.open_weight_controller_auto, daemon=True)
-            t3.start()
-            t3.join()
-
-        if self.vision_master_controller is not None:
-            t4 = threading.Thread(target=self.open_vision_master_controller_auto, daemon=True)
-            t4.start()
-            t4.join()
-
-        if self.scanner_controller is not None:
-            t5 = threading.Thread(target=self.open_scanner_controller_auto, daemon=True)
-            t5.start()
-            t5.join()
-
-        if self.out_com_controller is not None:
-            t6 = threading.Thread(target=self.open_out_com_controller_auto, daemon=True)
-            t6.start()
-            t6.join()
-
-        time.sleep(0.2)
-        if self.io_controller is not None:
-            t7 = threading.Thread(target=self.open_io_controller_auto, daemon=True)
-            t7.start()
-            t7.join()
-
-        time.sleep(0.2)
-        if self.tcp_server is not None:
-            t8 = threading.Thread(target=self.connect_server_auto, daemon=True)
-            t8.start()
-            t8.join()
-
-        time.sleep(0.2)
-        threading.Thread(target=self.loop_auto, daemon=True).start()
-
-    def open_camera_auto(self):
-        self.camera1.open_camera()
-        self.camera2.open_camera()
-
-    def open_light_auto(self):
-        self.light_controller.open()
-    
-    def open_weight_controller_auto(self):
-        self.weight_controller.open()
-        self.weight_controller.dataReceived.connect(self.wait_weight_received_from_weight_controller)
-
-    def wait_weight_received_from_weight_controller(self, data):
-        try:
-            # Nếu có tiền tố ST/US
-            if ',' in data:
-                status, raw_weight = data.split(',', 1)
-            else:
-                status = 'UNKNOWN'
-                raw_weight = data
-            
-            # Loại bỏ đơn vị (kg, g, ...)
-            for unit in ['kg', 'g', 'lb']:
-                if unit in raw_weight:
-                    raw_weight = raw_weight.replace(unit, '').strip()
-                    break
-            
-            # Loại bỏ dấu + nếu có
-            weight = float(raw_weight.replace('+', '').strip())
-
-            self.ui_logger.info(f"[{status}] Trọng lượng: {weight}")
+        # Luồng auto chạy trong AutoEngine, cửa sổ chỉ nhận kết quả qua callback (chuyển về thread UI bằng signal)
+        self.auto_engine = AutoEngine(logger=self.ui_logger)
+        self.auto_engine.confirm_handler = self.confirm_result_auto
+        self.auto_engine.subscribe(ENGINE_RESULT, self.signalResultAuto.emit)
+        self.auto_engine.subscribe(ENGINE_STATUS, self.signalChangeLabelResult.emit)
+        self.auto_engine.subscribe(ENGINE_WEIGHT, self.signalWeightAuto.emit)
+        self.auto_engine.subscribe(ENGINE_OPTIC_COUNT, self.signalOpticCountAuto.emit)
+        self.auto_engine.subscribe(ENGINE_MODEL_CODE, self.signalModelCodeAuto.emit)
+        self.auto_engine.subscribe(ENGINE_CODE_SN, self.signalCodeSNAuto.emit)
+        self.auto_engine.start(settings, self.ui.combo_model.currentText())
 
-            # Cập nhật giao diện
-            self.ui.label_value_weight_auto.setText(f"{weight:.3f}")
-            if weight > float(self.ui.label_value_min.text()) and weight < float(self.ui.label_value_max.text()):
-                self.ui.label_weight.setProperty("class", "pass")
-                update_style(self.ui.label_weight)
-            else:
-                self.ui.label_weight.setProperty("class", "fail")
-                update_style(self.ui.label_weight)
-        except Exception as e:
-            self.ui_logger.error(f"Lỗi xử lý chuỗi value weight: {e}")
+    def confirm_result_auto(self, message, comport, baudrate):
+        """
+        Gọi từ luồng auto: hiện popup trên thread UI và chờ nhân viên xác nhận.
+        """
+        self.flag_popup = True
+        self.signalShowPopup.emit(message, comport, baudrate)
+        while self.flag_popup:
+            time.sleep(0.01)
+        return self.popup_result
+
+    def handle_weight_auto(self, weight, ok):
+        self.ui.label_value_weight_auto.setText(f"{weight:.3f}")
+        self.ui.label_weight.setProperty("class", "pass" if ok else "fail")
+        update_style(self.ui.label_weight)
 
-    def open_vision_master_controller_auto(self):
-        self.vision_master_controller.open()
-        self.vision_master_controller.dataReceived.connect(self.wait_data_received_from_vision_master_controller)
+    def handle_optic_count_auto(self, count_empty, count_optic):
+        self.ui.label_value_empty.setText(str(count_empty))
+        self.ui.label_value_optic.setText(str(count_optic))
+        self.ui.label_value_total.setText(str(count_optic + count_empty))
 
-    def wait_data_received_from_vision_master_controller(self, data):
-        try:
-            dataVM = [item for item in data.split(";") if len(item) ==  14]
-            list_model_code = ';'.join(dataVM)
-            self.dataVM = list_model_code
-            # self.ui_logger.info(f"Data Vision Master: {self.dataVM}")
-        except Exception as e:
-            self.ui_logger.error(f"Lỗi xử lý chuỗi value vision master: {e}")
+    def handle_model_code_auto(self, model_code, ok):
+        self.ui.label_model_code.setText(model_code)
+        self.ui.label_model_code.setProperty("class", "pass" if ok else "fail")
+        update_style(self.ui.label_model_code)
 
-    def open_scanner_controller_auto(self):
-        self.scanner_controller.open()
-        self.scanner_controller.dataReceived.connect(self.wait_data_received_from_scanner_controller)
+    def handle_code_sn_auto(self, list_code_sn):
+        self.listCodeSN = list_code_sn
+        self.add_list_to_listwidget(self.listCodeSN, list_widget_code_sn=self.ui.list_widget_code_sn)
 
-    def wait_data_received_from_scanner_controller(self, data):
-        try:
-            if data == "Check Weight":
-                self.b_trigger_weight_auto = True
-            elif data == "Check Optic":
-                self.b_trigger_optic_auto = True
-            elif data == "Check UnitBox":
-                self.b_trigger_unitbox_auto = True
-            else:
-                if len(data) >=  10:
-                    self.listCodeSN.append(data)
-                    self.add_list_to_listwidget(self.listCodeSN, list_widget_code_sn=self.ui.list_widget_code_sn)
-                # self.ui_logger.info(f"Data Scanner: {self.dataScanner}")
-        except Exception as e:
-            self.ui_logger.error(f"Lỗi xử lý chuỗi value scanner: {e}")
-    
     def add_list_to_listwidget(self, listCodeSN: List, list_widget_code_sn=None):
         """
         Thêm một list Python có sẵn vào QListWidget.
@@ -1678,100 +1317,10 @@ class MainWindow(QMainWindow):
         except Exception as e:
             self.ui_logger.error(f"Lỗi khi thêm listCodeSN vào list_widget_code_sn: {str(e)}")
 
-    def open_out_com_controller_auto(self):
-        self.out_com_controller.open()
-
-    def open_io_controller_auto(self):
-        self.io_controller.open()
-        self.io_controller.write_out(OutPorts.Out_1, PortState.On)
-        self.io_controller.inputSignal.connect(
-            self.wait_data_received_from_io_controller
-        )
-
-    def wait_data_received_from_io_controller(self, commands, states):
-        for command, state in zip(commands, states):
-            if command == 'In_1' and state == PortState.On:
-                self.b_trigger_weight_auto = True
-            elif command == 'In_2' and state == PortState.On:
-                self.b_trigger_optic_auto = True
-            elif command == 'In_3' and state == PortState.On:
-                self.b_trigger_unitbox_auto = True
-
-    def connect_server_auto(self):
-        self.tcp_server.start()
-        self.tcp_server.dataReceived.connect(self.wait_data_received_from_client)
-
-    def wait_data_received_from_client(self, host, address, data):
-        if data == "Check Weight":
-            self.b_trigger_weight_auto = True
-        elif data == "Check Optic":
-            self.b_trigger_optic_auto = True
-        elif data == "Check UnitBox":
-            self.b_trigger_unitbox_auto = True
-
-    def loop_auto(self):
-        # Load configuration once at the beginning
-        config = self.load_config(model_setting=False)
-        if config is None:
-            self.ui_logger.error("Failed to load configuration")
-            return
-
-        # Initialize model AI only once
-        model_path = config["modules"]["model_ai"]["model_path"]
-        if not self.init_model_ai(model_path):
-            self.ui_logger.error(f"Failed to initialize model AI: {model_path}")
-            return
-
-        while True:
-            # Cho phép UI cập nhật
-            QApplication.processEvents()
-
-            # Kiểm tra nếu đã bị dừng
-            if self.b_stop_auto:
-                self.ui_logger.debug("Auto thread stopped")
-                break
-
-            # Xử lý theo từng bước 
-            if self.current_step_auto == STEP_WAIT_TRIGGER_AUTO:
-                self.handle_wait_trigger_auto()
-
-            elif self.current_step_auto == STEP_PREPROCESS_WEIGHT_AUTO:
-                self.handle_preprocess_weight_auto(config)
-            elif self.current_step_auto == STEP_PROCESSING_WEIGHT_AUTO:
-                self.handle_processing_weight_auto(config)
-            elif self.current_step_auto == STEP_OUTPUT_WEIGHT_AUTO:
-                self.handle_output_weight_auto(config)
-
-            elif self.current_step_auto == STEP_PREPROCESS_OPTIC_AUTO:
-                self.handle_preprocess_optic_auto(config)
-            elif self.current_step_auto == STEP_PROCESSING_OPTIC_AUTO:
-                self.handle_processing_optic_auto(config)
-            elif self.current_step_auto == STEP_OUTPUT_OPTIC_AUTO:
-                self.handle_output_optic_auto(config)
-
-            elif self.current_step_auto == STEP_PREPROCESS_UNITBOX_AUTO:
-                self.handle_preprocess_unitbox_auto(config)
-            elif self.current_step_auto == STEP_PROCESSING_UNITBOX_AUTO:
-                self.handle_processing_unitbox_auto(config)
-            elif self.current_step_auto == STEP_OUTPUT_UNITBOX_AUTO:
-                self.handle_output_unitbox_auto(config)
-
-            elif self.current_step_auto == STEP_RELEASE_AUTO:
-                self.handle_release_auto()
-
-            # Thời gian delay giữa các bước
-            time.sleep(0.05)
-
     def stop_loop_auto(self):
         # Đảm bảo loop auto dừng hoàn toàn
-        self.b_stop_auto = True
-        self.b_trigger_weight_auto = False
-        self.b_trigger_optic_auto = False
-        self.b_trigger_unitbox_auto = False
-        
-        # Hủy bỏ kết quả hiện tại nếu có
-        if hasattr(self, 'final_result') and self.final_result is not None:
-            self.final_result = None
+        if self.auto_engine is not None:
+            self.auto_engine.stop()
 
         self.ui.label_weight.setProperty("class", "waiting")
         update_style(self.ui.label_weight)
@@ -1780,531 +1329,17 @@ class MainWindow(QMainWindow):
         self.ui.label_model_code.setProperty("class", "waiting")
         update_style(self.ui.label_model_code)
 
-    def handle_wait_trigger_auto(self):
-        if self.b_trigger_weight_auto:
-            self.ui_logger.debug("Step Auto: Wait Trigger Weight")
-            self.b_trigger_weight_auto = False
-            self.signalChangeLabelResult.emit("Waiting...")
-
-            self.current_step_auto = STEP_PREPROCESS_WEIGHT_AUTO
-
-        if self.b_trigger_optic_auto:
-            self.ui_logger.debug("Step Auto: Wait Trigger Optic")
-            self.b_trigger_optic_auto = False
-            self.signalChangeLabelResult.emit("Waiting...")
-
-            self.current_step_auto = STEP_PREPROCESS_OPTIC_AUTO
-
-        if self.b_trigger_unitbox_auto:
-            self.ui_logger.debug("Step Auto: Wait Trigger UnitBox")
-            self.b_trigger_unitbox_auto = False
-            self.signalChangeLabelResult.emit("Waiting...")
-
-            self.current_step_auto = STEP_PREPROCESS_UNITBOX_AUTO
-
-    def handle_preprocess_weight_auto(self, config):
-        try:
-            self.start_elappsed_time()
-            self.ui_logger.debug("Step Auto: Preprocess Weight")
-
-            type_light = config["modules"]["lighting"]["controller_light"]
-            channel_0 = config["modules"]["camera_config"]["camera1"]["lighting"]["channels"][0]
-            channel_1 = config["modules"]["camera_config"]["camera1"]["lighting"]["channels"][1]
-            channel_2 = config["modules"]["camera_config"]["camera1"]["lighting"]["channels"][2]
-            channel_3 = config["modules"]["camera_config"]["camera1"]["lighting"]["channels"][3]
-            channels = [channel_0, channel_1, channel_2, channel_3]
-
-            # Mở đèn
-            if self.light_controller is not None:
-                for i, value in enumerate(channels):
-                    if value > 0:
-                        if type_light == "LCP":
-                            self.light_controller.on_channel(i)
-                            self.light_controller.set_light_value(i, value)
-                        else:  # DCP controller
-                            self.light_controller.on_channel(i, value)
-
-            delay_lighting = config["modules"]["camera_config"]["camera1"]["lighting"]["delay"] / 1000
-
-            time.sleep(delay_lighting)
-
-            # Lấy ảnh hiện tại từ camera
-            if self.camera1 is not None:
-                self.current_image_camera1 = self.camera1.grab_camera()
-                if self.current_image_camera1 is None:
-                    self.ui_logger.warning("Image not found")
-
-            # Tắt đèn
-            if self.light_controller is not None:
-                for i, value in enumerate(channels):
-                    if value > 0:
-                        self.light_controller.off_channel(i)
-
-            self.current_step_auto = STEP_PROCESSING_WEIGHT_AUTO
-            elapsed_time = self.get_elappsed_time()
-            self.ui_logger.info(f"Auto preprocess weight time: {elapsed_time:.3f} seconds")
-        except Exception as e:
-            self.ui_logger.error(f"Auto preprocess weight error: {str(e)}")
-            # Trong trường hợp lỗi, quay lại bước chờ trigger
-            self.current_step_auto = STEP_WAIT_TRIGGER_AUTO
-            self.b_trigger_weight_auto = False
-            self.b_trigger_optic_auto = False
-            self.b_trigger_unitbox_auto = False
-
-    def handle_processing_weight_auto(self, config):
-        try: 
-            self.start_elappsed_time()
-            self.ui_logger.debug("Step Auto: Processing Weight")
-            src = self.current_image_camera1
-            
-            binary = self.processing_binary(src, config)
-
-            # Ghi lỗi
-            self.weight = float(self.ui.label_value_weight_auto.text())
-            min_weight = float(config["modules"]["weight"]["min_weight"])
-            max_weight = float(config["modules"]["weight"]["max_weight"])
-            if self.weight > min_weight and self.weight < max_weight:
-                msg = "PASS"
-            else:
-                if self.weight < min_weight:
-                    message = f"Trọng lượng cân nhỏ hơn yêu cầu"
-                elif self.weight > max_weight:
-                    message = f"Trọng lượng cân lơn hơn yêu cầu"
-                comport = config["modules"]["scanner"]["comport_scanner"]
-                baudrate = str(config["modules"]["scanner"]["baudrate_scanner"])
-            
-                self.signalShowPopup.emit(message, comport, baudrate)
-                while self.flag_popup:
-                    time.sleep(0.01)
-                msg = self.popup_result
-                self.flag_popup = True
-
-            if len(self.listCodeSN) != 0:
-                code_sn = str(self.listCodeSN[-1])
-            else: 
-                code_sn = "List Code SN is Empty"
-
-            dst = src.copy()
-
-            time_check = time.strftime(DATETIME_FORMAT)
-            model_name = self.ui.combo_model.currentText()
-
-            dst = self.put_text_dst(dst, msg, time_check, model_name, code_sn)
-
-            # Tạo kết quả cuối cùng cho auto
-            self.final_result = RESULT(
-                step="WEIGHT",
-                time_check=time.strftime(DATETIME_FORMAT),
-                model_name=self.ui.combo_model.currentText(),
-                result=msg,
-                src=src,
-                binary=binary,
-                dst=dst,
-                code_sn=code_sn,
-                weight=str(self.weight),
-                error_type=None,
-                config=config,
-            )
-
-            self.signalResultAuto.emit(self.final_result, "Camera1")
-
-            self.current_step_auto = STEP_OUTPUT_WEIGHT_AUTO
-            elapsed_time = self.get_elappsed_time()
-            self.ui_logger.info(f"Auto processing weight time: {elapsed_time:.3f} seconds")
-        except Exception as e:
-            self.ui_logger.error(f"Auto processing weight error: {str(e)}")
-            # Trong trường hợp lỗi, quay lại bước chờ trigger
-            self.current_step_auto = STEP_WAIT_TRIGGER_AUTO
-            self.b_trigger_weight_auto = False
-            self.b_trigger_optic_auto = False
-            self.b_trigger_unitbox_auto = False
-
-    def handle_output_weight_auto(self, config):
-        try:
-            self.start_elappsed_time()
-            self.ui_logger.debug("Step Auto: Output Weight")
-
-            if self.final_result is not None:
-                if self.final_result.result == "PASS":
-                    data = self.final_result.code_sn
-                    self.out_com_controller.send_data(data)
-
-                self.write_label_result(self.final_result.result) 
-
-                # Ghi log database
-                self.write_log_database(self.final_result, config)
-
-            self.current_step_auto = STEP_RELEASE_AUTO
-            elapsed_time = self.get_elappsed_time()
-            self.ui_logger.info(f"Auto output weight time: {elapsed_time:.3f} seconds")
-        except Exception as e:
-            self.ui_logger.error(f"Auto output weight error: {str(e)}")
-            # Trong trường hợp lỗi, quay lại bước chờ trigger
-            self.current_step_auto = STEP_WAIT_TRIGGER_AUTO
-            self.b_trigger_weight_auto = False
-            self.b_trigger_optic_auto = False
-            self.b_trigger_unitbox_auto = False
-
-    def handle_preprocess_optic_auto(self, config):
-        try:
-            self.start_elappsed_time()
-            self.ui_logger.debug("Step Auto: Preprocess Optic")
-
-            type_light = config["modules"]["lighting"]["controller_light"]
-            channel_0 = config["modules"]["camera_config"]["camera2"]["lighting"]["channels"][0]
-            channel_1 = config["modules"]["camera_config"]["camera2"]["lighting"]["channels"][1]
-            channel_2 = config["modules"]["camera_config"]["camera2"]["lighting"]["channels"][2]
-            channel_3 = config["modules"]["camera_config"]["camera2"]["lighting"]["channels"][3]
-            channels = [channel_0, channel_1, channel_2, channel_3]
-
-            # Mở đèn
-            if self.light_controller is not None:
-                for i, value in enumerate(channels):
-                    if value > 0:
-                        if type_light == "LCP":
-                            self.light_controller.on_channel(i)
-                            self.light_controller.set_light_value(i, value)
-                        else:  # DCP controller
-                            self.light_controller.on_channel(i, value)
-
-            delay_lighting = config["modules"]["camera_config"]["camera2"]["lighting"]["delay"] / 1000
-
-            time.sleep(delay_lighting)
-
-            # Lấy ảnh hiện tại từ camera
-            if self.camera2 is not None:
-                self.current_image_camera2 = self.camera2.grab_camera()
-                if self.current_image_camera2 is None:
-                    self.ui_logger.warning("Image not found")
-
-            # Tắt đèn
-            if self.light_controller is not None:
-                for i, value in enumerate(channels):
-                    if value > 0:
-                        self.light_controller.off_channel(i)
-
-            self.current_step_auto = STEP_PROCESSING_OPTIC_AUTO
-            elapsed_time = self.get_elappsed_time()
-            self.ui_logger.info(f"Auto preprocess optic time: {elapsed_time:.3f} seconds")
-        except Exception as e:
-            self.ui_logger.error(f"Auto preprocess optic error: {str(e)}")
-            # Trong trường hợp lỗi, quay lại bước chờ trigger
-            self.current_step_auto = STEP_WAIT_TRIGGER_AUTO
-            self.b_trigger_weight_auto = False
-            self.b_trigger_optic_auto = False
-            self.b_trigger_unitbox_auto = False
-
-    def handle_processing_optic_auto(self, config):
-        try:
-            self.start_elappsed_time()
-            self.ui_logger.debug("Step Auto: Processing Optic")
-
-            src = self.current_image_camera2
-
-            binary = self.processing_binary(src, config)
-
-            dst = src.copy()
-
-            if len(self.listCodeSN) != 0:
-                code_sn = ', '.join(self.listCodeSN[-5:][::-1])
-            else: 
-                code_sn = "List Code SN is Empty"
-
-            # Thực hiện phát hiện
-            results = self.model_ai.detect(src, conf=float(config["modules"]["model_ai"]["confidence"]), imgsz=640)
-
-            
-            # Ghi lỗi
-            count_empty = 0
-            count_optic = 0
-            for dnn in results:
-                if dnn.class_index == 0:
-                    count_empty += 1
-                elif dnn.class_index == 1:
-                    count_optic += 1
-            self.ui.label_value_empty.setText(str(count_empty))
-            self.ui.label_value_optic.setText(str(count_optic))
-            self.ui.label_value_total.setText(str(count_optic + count_empty))
-            if count_optic + count_empty != 5 or count_empty > 0:
-
-                if count_optic < 5:
-                    message = f"Số lượng Optic bị thiếu"
-                elif count_optic > 5:
-                    message = f"Số lượng Optic bị thừa"
-                comport = config["modules"]["scanner"]["comport_scanner"]
-                baudrate = str(config["modules"]["scanner"]["baudrate_scanner"])
-            
-                self.signalShowPopup.emit(message, comport, baudrate)
-                while self.flag_popup:
-                    time.sleep(0.01)
-                msg = self.popup_result
-                self.flag_popup = True
-
-            elif count_optic == 5:
-                msg = "PASS"
-                        
-            dst = plot_results(results, dst, self.model_ai.label_map, self.model_ai.color_map)
-
-            time_check = time.strftime(DATETIME_FORMAT)
-            model_name = self.ui.combo_model.currentText()
-
-            dst = self.put_text_dst(dst, msg, time_check, model_name, code_sn)
-
-            # Tạo kết quả cuối cùng cho auto
-            self.final_result = RESULT(
-                step="OPTIC",
-                time_check=time.strftime(DATETIME_FORMAT),
-                model_name=self.ui.combo_model.currentText(),
-                result=msg,
-                src=src,
-                binary=binary,
-                dst=dst,
-                code_sn=code_sn,
-                weight="",
-                error_type=None,
-                config=config,
-            )
-
-            # Phát tín hiệu kết quả auto
-            self.signalResultAuto.emit(self.final_result, "Camera2")
-
-            self.current_step_auto = STEP_OUTPUT_OPTIC_AUTO
-            elapsed_time = self.get_elappsed_time()
-            self.ui_logger.info(f"Auto processing optic time: {elapsed_time:.3f} seconds")
-        except Exception as e:
-            self.ui_logger.error(f"Auto processing optic error: {str(e)}")
-            # Trong trường hợp lỗi, quay lại bước chờ trigger
-            self.current_step_auto = STEP_WAIT_TRIGGER_AUTO
-            self.b_trigger_weight_auto = False
-            self.b_trigger_optic_auto = False
-            self.b_trigger_unitbox_auto = False
-
-    def handle_output_optic_auto(self, config):
-        try:
-            self.start_elappsed_time()
-            self.ui_logger.debug("Step Auto: Output Optic")
-
-            if self.final_result is not None:
-                self.write_label_result(self.final_result.result) 
-
-                # Ghi log database
-                self.write_log_database(self.final_result, config)
-
-            self.current_step_auto = STEP_RELEASE_AUTO
-            elapsed_time = self.get_elappsed_time()
-            self.ui_logger.info(f"Auto output optic time: {elapsed_time:.3f} seconds")
-        except Exception as e:
-            self.ui_logger.error(f"Auto output optic error: {str(e)}")
-            # Trong trường hợp lỗi, quay lại bước chờ trigger
-            self.current_step_auto = STEP_WAIT_TRIGGER_AUTO
-            self.b_trigger_weight_auto = False
-            self.b_trigger_optic_auto = False
-            self.b_trigger_unitbox_auto = False
-
-    def handle_preprocess_unitbox_auto(self, config):
-        try:
-            self.start_elappsed_time()
-            self.ui_logger.debug("Step Auto: Preprocess UnitBox")
-
-            type_light = config["modules"]["lighting"]["controller_light"]
-            channel_0 = config["modules"]["camera_config"]["camera2"]["lighting"]["channels"][0]
-            channel_1 = config["modules"]["camera_config"]["camera2"]["lighting"]["channels"][1]
-            channel_2 = config["modules"]["camera_config"]["camera2"]["lighting"]["channels"][2]
-            channel_3 = config["modules"]["camera_config"]["camera2"]["lighting"]["channels"][3]
-            channels = [channel_0, channel_1, channel_2, channel_3]
-
-            # Mở đèn
-            if self.light_controller is not None:
-                for i, value in enumerate(channels):
-                    if value > 0:
-                        if type_light == "LCP":
-                            self.light_controller.on_channel(i)
-                            self.light_controller.set_light_value(i, value)
-                        else:  # DCP controller
-                            self.light_controller.on_channel(i, value)
-
-            delay_lighting = config["modules"]["camera_config"]["camera2"]["lighting"]["delay"] / 1000
-
-            time.sleep(delay_lighting)
-
-            # Lấy ảnh hiện tại từ camera
-            if self.camera2 is not None:
-                self.current_image_camera2 = self.camera2.grab_camera()
-                if self.current_image_camera2 is None:
-                        self.ui_logger.warning("Image not found")
-
-            # Tắt đèn
-            if self.light_controller is not None:
-                for i, value in enumerate(channels):
-                    if value > 0:
-                        self.light_controller.off_channel(i)
-
-            self.current_step_auto = STEP_PROCESSING_UNITBOX_AUTO
-            elapsed_time = self.get_elappsed_time()
-            self.ui_logger.info(f"Auto preprocess unitbox time: {elapsed_time:.3f} seconds")
-        except Exception as e:
-            self.ui_logger.error(f"Auto preprocess unitbox error: {str(e)}")
-            # Trong trường hợp lỗi, quay lại bước chờ trigger
-            self.current_step_auto = STEP_WAIT_TRIGGER_AUTO
-            self.b_trigger_weight_auto = False
-            self.b_trigger_optic_auto = False
-            self.b_trigger_unitbox_auto = False
-
-    def handle_processing_unitbox_auto(self, config):
-        try:
-            self.start_elappsed_time()
-            self.ui_logger.debug("Step Auto: Processing UnitBox")
-
-            src = self.current_image_camera2
-            
-            binary = self.processing_binary(src, config)
-
-            if len(self.listCodeSN) != 0:
-                code_sn = ', '.join(self.listCodeSN[-5:][::-1])
-            else: 
-                code_sn = "List Code SN is Empty"
-
-            # Xoá tất cả các file trong thư mục
-            for filename in os.listdir(InputBarCodePath):
-                file_path = os.path.join(InputBarCodePath, filename)
-                if os.path.isfile(file_path):
-                    os.remove(file_path)
-            if os.path.exists(OutputBarCodePath):
-                os.remove(OutputBarCodePath)
-
-            # Giả sử src là ảnh barcode mà bạn đã xử lý
-            filename = "BarCode.jpg"  # Thêm đuôi file để đảm bảo có thể mở được
-            image_path = os.path.join(InputBarCodePath, filename)
-
-            # Lưu ảnh
-            cv.imwrite(image_path, src)
-
-            time.sleep(0.05)
-            # Send Trigger Vission Master
-            self.vision_master_controller.send_trigger()
-
-            while not os.path.exists(OutputBarCodePath):
-                time.sleep(0.01)  # Chờ 100ms rồi kiểm tra lại
-
-            time.sleep(0.05)
-
-            # Ghi lỗi
-            parts = self.dataVM.strip().split(";")
-            if all(p == parts[0] for p in parts) == True and len(parts) == 5:
-                self.ui.label_model_code.setText(parts[0])
-                self.ui.label_model_code.setProperty("class", "pass")
-                update_style(self.ui.label_model_code)
-                msg = "PASS"
-            elif all(p == parts[0] for p in parts) == False or len(parts) != 5:
-                self.ui.label_model_code.setText("DECODE FAIL")
-                self.ui.label_model_code.setProperty("class", "fail")
-                update_style(self.ui.label_model_code)
-
-                if all(p == parts[0] for p in parts) == False:
-                    message = f"Sai code trong UnitBox"
-                elif len(parts) < 5:
-                    message = f"Thiếu code trong UnitBox"
-                elif len(parts) > 5:
-                    message = f"Thừa code trong UnitBox"
-                comport = config["modules"]["scanner"]["comport_scanner"]
-                baudrate = str(config["modules"]["scanner"]["baudrate_scanner"])
-            
-                self.signalShowPopup.emit(message, comport, baudrate)
-                while self.flag_popup:
-                    time.sleep(0.01)
-                msg = self.popup_result
-                self.flag_popup = True
-
-            dst = cv.imread(OutputBarCodePath)
-
-            time_check = time.strftime(DATETIME_FORMAT)
-            model_name = self.ui.combo_model.currentText()
-
-            dst = self.put_text_dst(dst, msg, time_check, model_name, code_sn)
-            
-            # Tạo kết quả cuối cùng cho auto
-            self.final_result = RESULT(
-                step="UNITBOX",
-                time_check=time.strftime(DATETIME_FORMAT),
-                model_name=model_name,
-                result=msg,
-                src=src,
-                binary=binary,
-                dst=dst,
-                code_sn=code_sn,
-                weight="",
-                error_type=None,
-                config=config,
-            )
-
-            # Phát tín hiệu kết quả auto
-            self.signalResultAuto.emit(self.final_result, "Camera2")
-
-            self.current_step_auto = STEP_OUTPUT_UNITBOX_AUTO
-            elapsed_time = self.get_elappsed_time()
-            self.ui_logger.info(f"Auto processing unitbox time: {elapsed_time:.3f} seconds")
-        except Exception as e:
-            self.ui_logger.error(f"Auto processing unitbox error: {str(e)}")
-            # Trong trường hợp lỗi, quay lại bước chờ trigger
-            self.current_step_auto = STEP_WAIT_TRIGGER_AUTO
-            self.b_trigger_weight_auto = False
-            self.b_trigger_optic_auto = False
-            self.b_trigger_unitbox_auto = False
-
-    
-    def handle_output_unitbox_auto(self, config):
-        try:
-            self.start_elappsed_time()
-            self.ui_logger.debug("Step Auto: Output UnitBox")
-
-            if self.final_result is not None:
-                self.write_label_result(self.final_result.result)   
-
-                # Ghi log database
-                self.write_log_database(self.final_result, config)
-
-            self.current_step_auto = STEP_RELEASE_AUTO
-            elapsed_time = self.get_elappsed_time()
-            self.ui_logger.info(f"Auto output unitbox time: {elapsed_time:.3f} seconds")
-        except Exception as e:
-            self.ui_logger.error(f"Auto output unitbox error: {str(e)}")
-            # Trong trường hợp lỗi, quay lại bước chờ trigger
-            self.current_step_auto = STEP_WAIT_TRIGGER_AUTO
-            self.b_trigger_weight_auto = False
-            self.b_trigger_optic_auto = False
-            self.b_trigger_unitbox_auto = False
-
-    def handle_release_auto(self):
-        try:
-            self.start_elappsed_time()
-            self.ui_logger.debug("Step Auto: Release")
-
-            self.weight = None 
-
-            self.final_result = None
-
-            # Đặt lại trạng thái trigger
-            self.b_trigger_weight_auto = False
-            self.b_trigger_optic_auto = False
-            self.b_trigger_unitbox_auto = False
-
-            self.current_step_auto = STEP_WAIT_TRIGGER_AUTO
-        except Exception as e:
-            self.ui_logger.error(f"Auto release error: {str(e)}")
-            # Trong trường hợp lỗi, quay lại bước chờ trigger
-            self.current_step_auto = STEP_WAIT_TRIGGER_AUTO
-            self.b_trigger_weight_auto = False
-            self.b_trigger_optic_auto = False
-            self.b_trigger_unitbox_auto = False
-
     def show_popup(self, message, comport, baudrate):
         try:
             # Create and display dialog
             dialog = PopUpDlg(message=message, comport=comport, baudrate=baudrate)
             
-            # Connect scanner data if available
-            if self.scanner_controller is not None:
-                self.scanner_controller.dataReceived.connect(dialog.wait_data_received_from_scanner_controller)
+            # Connect scanner data if available (luồng auto dùng scanner của engine)
+            scanner_controller = self.scanner_controller
+            if self.auto_engine is not None:
+                scanner_controller = self.auto_engine.scanner_controller
+            if scanner_controller is not None:
+                scanner_controller.dataReceived.connect(dialog.wait_data_received_from_scanner_controller)
             
             # Show dialog and wait for result
             result = dialog.popUp()
@@ -2327,122 +1362,6 @@ class MainWindow(QMainWindow):
         except Exception as e:
             self.ui_logger.error(f"Error handling confirmation result: {str(e)}")
 
-    def processing_binary(self, src, config):
-        color_type = config["modules"]["processing"]["color"]
-        gray = cv.cvtColor(src, ColorType.from_label(color_type).value)
-
-        blur_type = config["modules"]["processing"]["blur"]["type_blur"]
-        kernel_blur = config["modules"]["processing"]["blur"]["kernel_size_blur"]
-        blur = BlurType.from_label(blur_type).value(gray, (kernel_blur, kernel_blur), 0)
-
-        threshold_type = config["modules"]["processing"]["threshold"]["type_threshold"]
-        value_threshold = config["modules"]["processing"]["threshold"]["value_threshold"]
-        _, thresh = cv.threshold(blur, value_threshold, 255, ThresholdType.from_label(threshold_type).value)
-
-        morph_type = config["modules"]["processing"]["morphological"]["type_morph"]
-        iteration = config["modules"]["processing"]["morphological"]["iteration"]
-        kernel_size = config["modules"]["processing"]["morphological"]["kernel_size_morph"]
-        kernel = cv.getStructuringElement(cv.MORPH_RECT, (kernel_size, kernel_size))
-        binary = cv.morphologyEx(thresh, MorphType.from_label(morph_type).value, kernel, iterations=iteration)
-        
-        # # Find contours
-        # cnts, _ = cv.findContours(
-        #     binary, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE
-        # )
-
-        # # Draw contours
-        # cv.drawContours(dst, cnts, -1, (0, 255, 0), 2)
-        return binary
-    
-    def put_text_dst(self, image, result, time_check, model_name, code_sn):
-        if result == "PASS":
-            image = cv.putText(image, "OK", (100, 500), cv.FONT_HERSHEY_SIMPLEX, fontScale=10, color=(0, 255, 0), thickness=15, lineType=cv.LINE_AA)
-        elif result == "FAIL":
-            image = cv.putText(image, "NG", (100, 500), cv.FONT_HERSHEY_SIMPLEX, fontScale=10, color=(0, 0, 255), thickness=15, lineType=cv.LINE_AA)
-        image = cv.putText(image, time_check, (100, 2500), cv.FONT_HERSHEY_SIMPLEX, fontScale=3, color=(0, 255, 0), thickness=8, lineType=cv.LINE_4)
-        image = cv.putText(image, model_name, (100, 2750), cv.FONT_HERSHEY_SIMPLEX, fontScale=3, color=(0, 255, 0), thickness=8, lineType=cv.LINE_4)
-        dst = cv.putText(image, code_sn, (100, 3000), cv.FONT_HERSHEY_SIMPLEX, fontScale=2.5, color=(0, 255, 0), thickness=8, lineType=cv.LINE_4)
-        return dst
-
-    def write_label_result(self, result: str):
-        print(f"Resutl: {result}")
-        if result == "PASS":
-            self.signalChangeLabelResult.emit("Pass")
-            self.io_controller.write_out(OutPorts.Out_1, PortState.On) 
-            time.sleep(0.05)
-            self.io_controller.write_out(OutPorts.Out_2, PortState.Off)
-            time.sleep(0.05)
-            self.io_controller.write_out(OutPorts.Out_3, PortState.Off)
-        elif result  == "FAIL": 
-            self.signalChangeLabelResult.emit("Fail")
-            self.io_controller.write_out(OutPorts.Out_1, PortState.Off) 
-            time.sleep(0.05)
-            self.io_controller.write_out(OutPorts.Out_2, PortState.On)
-            time.sleep(0.05)
-            self.io_controller.write_out(OutPorts.Out_3, PortState.Off) 
-        else:
-            self.signalChangeLabelResult.emit("Wait")
-            self.io_controller.write_out(OutPorts.Out_1, PortState.Off) 
-            time.sleep(0.05)
-            self.io_controller.write_out(OutPorts.Out_2, PortState.Off)
-            time.sleep(0.05)
-            self.io_controller.write_out(OutPorts.Out_3, PortState.On)
-
-    def write_log_database(self, result: RESULT, config: dict):
-        try:
-            model_name = result.model_name
-            date_now = time.strftime(FOLDER_DATE_FORMAT)
-
-            modules = config["modules"]
-            log_dir = modules["system"]["log_dir"]
-
-            try:
-                log_size = int(modules["system"]["log_size"]) * 1024
-            except:
-                log_size = 10 * 1024
-
-            if result is not None:
-                os.makedirs(log_dir, exist_ok=True)
-
-                image_folder = os.path.join(log_dir, "images", date_now, model_name, result.step)
-                os.makedirs(image_folder, exist_ok=True)
-
-                filename = result.result + "_" + time.strftime(FILENAME_FORMAT)
-
-                image_folder_input = f"{image_folder}\\input"
-                os.makedirs(image_folder_input, exist_ok=True)
-                image_path_input = os.path.join(image_folder_input, filename.replace(".jpg", "_input.jpg"))
-                cv.imwrite(image_path_input, result.src)
-
-                if result.dst is not None:
-                    image_folder_output = f"{image_folder}\\output"
-                    os.makedirs(image_folder_output, exist_ok=True)
-                    image_path_output = os.path.join(image_folder_output, filename.replace(".jpg", "_output.jpg"))
-                    cv.imwrite(image_path_output, result.dst)
-
-                threading.Thread(target=self.scan_log_dir, args=(log_dir, log_size), daemon=True).start()
-
-                database_path = os.path.join(log_dir, modules["system"]["database_path"])
-                conn = create_db(database_path)
-
-                values = (result.step, result.time_check, result.model_name, result.result, image_path_input, result.code_sn, result.weight, result.error_type)
-                sql = "INSERT INTO history (step, time_check, model_name, result, img_path, code_sn, weight, error_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
-                insert(conn, sql, values)
-        except Exception as e:
-            self.ui_logger.error(f"Error write log database: {str(e)}")
-
-    def scan_log_dir(self, log_dir, max_size):
-        self.ui_logger.debug(f"Scanning log dir '{log_dir}' ...")
-        try:
-            log_images = os.path.join(log_dir, "images")
-            size = scan_dir(log_images)
-            if size > max_size:
-                if log_images is not None:
-                    shutil.rmtree(log_images)
-                    self.ui_logger.debug(f"Log dir size > {max_size} --> Remove log dir.")
-        except Exception as e:
-            self.ui_logger.error(f"Error scan log dir: {str(e)}")
-
     def on_click_start_teaching(self):
         """
         Xử lý sự kiện khi nhấn nút Start Teaching.
@@ -2572,7 +1491,7 @@ class MainWindow(QMainWindow):
 
             # Hiển thị kết quả trung gian lên canvas
             if self.current_image is not None:
-                src = self.current_image
+                src = to_bgr(self.current_image, self.current_pixel_format)
 
                 color_type = self.ui.combo_color.currentText()
                 gray = cv.cvtColor(src, ColorType.from_label(color_type).value)
@@ -2615,8 +1534,12 @@ class MainWindow(QMainWindow):
                 if conf < 0.0 or conf > 1.0:
                     conf = 0.25
 
-                # Thực hiện phát hiện
-                results = self.model_ai.detect(src, conf=conf, imgsz=640)
+                # Thực hiện phát hiện, chỉ trong các ROI nếu đã vẽ trên canvas
+                rois = [self.canvas_src.shape_to_cvRect(shape) for shape in self.canvas_src.shapes]
+                if rois:
+                    results = self.model_ai.detect_rois(src, rois, conf=conf, imgsz=640)
+                else:
+                    results = self.model_ai.detect(src, conf=conf, imgsz=640)
                 
                 # Vẽ kết quả
                 dst = plot_results(results, dst, self.model_ai.label_map, self.model_ai.color_map)
@@ -2878,10 +1801,27 @@ class MainWindow(QMainWindow):
             "auto_start": self.ui.check_auto_start.isChecked(),
         }
 
+        # Lưu thiết lập pipeline của luồng auto
+        config["modules"]["pipeline"] = {
+            "enable": self.pipeline_enable,
+            "queue_size": self.pipeline_queue_size,
+        }
+
+        # Lưu thiết lập hàng đợi trigger (chỉnh trong config.json)
+        if self.trigger_config:
+            config["modules"]["trigger"] = self.trigger_config
+
+        # Lưu thiết lập chụp đồng bộ nhiều camera (chỉnh trong config.json)
+        if self.capture_config:
+            config["modules"]["capture"] = self.capture_config
+
         # Lưu thiết lập liên quan đến model AI
         config["modules"]["model_ai"] = {
             "model_path": self.ui.combo_model_ai.currentText(),
             "confidence": self.ui.line_confidence.text(),
+            "backend": self.model_ai_backend,
+            "replicas": self.model_ai_replicas,
+            "tiling": self.model_ai_tiling,
         }
 
         # Lưu thiết lập liên quan đến processing
@@ -2972,7 +1912,7 @@ class MainWindow(QMainWindow):
                 if "camera" in modules:
                     camera_config = modules["camera"]
                     self.add_combox_item(
-                        self.ui.combo_type_camera, ["Webcam", "HIK", "SODA"]
+                        self.ui.combo_type_camera, ["Webcam", "HIK", "SODA", "Replay", "Synthetic"]
                     )
                     self.set_combobox_text(
                         self.ui.combo_type_camera, camera_config.get("type", "Webcam")
@@ -3117,6 +2057,17 @@ class MainWindow(QMainWindow):
                         system_config.get("auto_start", False)
                     )
 
+                # Áp dụng cấu hình pipeline, model cũ không có thì chạy tuần tự
+                pipeline_config = modules.get("pipeline", {})
+                self.pipeline_enable = bool(pipeline_config.get("enable", False))
+                self.pipeline_queue_size = int(pipeline_config.get("queue_size", 2))
+
+                # Áp dụng cấu hình hàng đợi trigger, không có thì engine dùng mặc định
+                self.trigger_config = modules.get("trigger", {})
+
+                # Áp dụng cấu hình chụp đồng bộ, không có thì mỗi bước chỉ chụp camera của nó
+                self.capture_config = modules.get("capture", {})
+
                 # Áp dụng cấu hình module AI
                 if "model_ai" in modules:
                     model_ai_config = modules["model_ai"]
@@ -3129,6 +2080,9 @@ class MainWindow(QMainWindow):
                     self.ui.line_confidence.setText(
                         str(model_ai_config.get("confidence", 0.25))
                     )
+                    self.model_ai_backend = model_ai_config.get("backend", BACKEND_TORCH)
+                    self.model_ai_replicas = int(model_ai_config.get("replicas", 0))
+                    self.model_ai_tiling = model_ai_config.get("tiling", {})
 
                 # Áp dụng cầu hình processing
                 if "processing" in modules:
@@ -3199,6 +2153,10 @@ class MainWindow(QMainWindow):
             self.ui_logger.error(f"Lỗi khi áp dụng cấu hình: {str(e)}")
 
     def load_config(self, model_setting=False):
+        """
+        Cấu hình đã biên dịch (ModelSettings) của model đang chọn, None nếu không đọc được.
+        File chỉ được đọc và kiểm tra lại khi đã thay đổi từ lần trước (mtime).
+        """
         try:
             if model_setting:
                 model_name = self.ui.combo_model_setting.currentText()
@@ -3212,13 +2170,12 @@ class MainWindow(QMainWindow):
                 self.ui_logger.info("Không tìm thấy file cấu hình.")
                 return
 
-            # Đọc cấu hình từ file
-            with open(config_path, "r") as f:
-                config = json.load(f)
+            # Đọc và biên dịch cấu hình từ file
+            settings = load_settings(model_name)
 
             self.ui_logger.info("Đọc cấu hình từ file.")
 
-            return config
+            return settings
 
         except Exception as e:
             self.ui_logger.error(f"Lỗi khi đọc cấu hình: {str(e)}")
@@ -3240,8 +2197,8 @@ class MainWindow(QMainWindow):
         for item in items:
             combobox.addItem(item)
 
-    def find_camera_devices(self, type: str):
-        devices = get_camera_devices(type)
+    def find_camera_devices(self, type: str, refresh=False):
+        devices = get_camera_devices(type, refresh)
 
         if devices is not None:
             id_camera = list(devices.keys())
@@ -3251,7 +2208,7 @@ class MainWindow(QMainWindow):
                 features = [
                     name.split('.')[0]
                     for name in os.listdir(feature_dir)
-                    if name.endswith(".ini") or name.endswith(".pfs")
+                    if name.endswith(".ini") or name.endswith(".pfs") or name.endswith(".yaml")
                 ]
                 features.append("")
         if not devices:
@@ -3260,8 +2217,8 @@ class MainWindow(QMainWindow):
 
         return id_camera, features
 
-    def load_camera_devices(self, type: str):
-        id_camera, features = self.find_camera_devices(type)
+    def load_camera_devices(self, type: str, refresh=False):
+        id_camera, features = self.find_camera_devices(type, refresh)
         self.add_combox_item(self.ui.combo_id_camera, id_camera)
         self.add_combox_item(self.ui.combo_feature, features)
         self.ui.combo_feature.setCurrentIndex(0)
@@ -3269,7 +2226,8 @@ class MainWindow(QMainWindow):
     def on_change_camera_type(self):
         """Xử lý sự kiện khi thay đổi lựa chọn trong combo_type_camera."""
         type = self.ui.combo_type_camera.currentText()
-        self.load_camera_devices(type)
+        # Người dùng chọn lại loại camera thì liệt kê lại thiết bị
+        self.load_camera_devices(type, refresh=True)
 
     def find_comports_and_baurates(self):
         comports = serial.tools.list_ports.comports()
@@ -3293,6 +2251,41 @@ class MainWindow(QMainWindow):
 
         return model_names
 
+    def on_change_model_ai(self):
+        """
+        Xử lý sự kiện khi thay đổi lựa chọn trong combo_model_ai.
+        Load model ở background để khi chạy không phải chờ load lại.
+        Đang chạy auto thì engine đổi sang model mới giữa hai part.
+        """
+        model_path = self.ui.combo_model_ai.currentText()
+        if not model_path:
+            return
+        try:
+            if self.auto_engine is not None and self.auto_engine.is_running:
+                self.auto_engine.swap_model_ai(model_path, self.model_ai_backend)
+                return
+            self.ui_logger.info(f"Load model AI ở background: {model_path}")
+            ModelRegistry.instance().get_async(
+                model_path=f"resources/models_ai/{model_path}.pt",
+                label=LABEL_CONFIG_PATH,
+                backend=self.model_ai_backend,
+                callback=lambda model_ai: self.signalModelAiLoaded.emit(model_ai, model_path),
+            )
+        except Exception as e:
+            self.ui_logger.error(f"Lỗi khi load model AI {model_path}: {str(e)}")
+
+    def handle_model_ai_loaded(self, model_ai, model_path):
+        """
+        Hot swap model AI khi đang teaching và model vừa load vẫn là model đang chọn.
+        """
+        self.ui_logger.info(f"Model AI sẵn sàng: {model_path}")
+        if (
+            self.ui.btn_start_teaching.text() == "Stop Teaching"
+            and self.ui.combo_model_ai.currentText() == model_path
+        ):
+            self.model_ai = model_ai
+            self.ui_logger.info(f"Đã chuyển model AI teaching sang: {model_path}")
+
     def on_change_model(self):
         """
         Xử lý sự kiện khi thay đổi lựa chọn trong combo_model.
@@ -3622,6 +2615,7 @@ class MainWindow(QMainWindow):
                 index = self.ui.list_widget_image.row(item)
                 file_path = self.file_paths[index]
                 self.current_image = cv.imread(file_path)
+                self.current_pixel_format = None
 
                 # Cập nhật log
                 self.ui_logger.debug(f"Loaded image: {os.path.basename(file_path)}")
@@ -3639,6 +2633,7 @@ class MainWindow(QMainWindow):
             )
             if file_path:
                 self.current_image = cv.imread(file_path)
+                self.current_pixel_format = None
 
                 # Cập nhật log
                 self.ui_logger.debug(f"Loaded image: {os.path.basename(file_path)}")
@@ -3698,6 +2693,7 @@ class MainWindow(QMainWindow):
     def start_camera(self):
         try:
             self.camera_thread.frameCaptured.connect(self.update_frame)
+            self.camera_thread.cameraStatus.connect(self.ui_logger.warning)
             self.camera_thread.start()
 
             self.ui.btn_start_camera.setText("Stop")
@@ -3717,6 +2713,7 @@ class MainWindow(QMainWindow):
         try:
             self.camera_thread.stop_camera()
             self.camera_thread.frameCaptured.disconnect()
+            self.camera_thread.cameraStatus.disconnect()
 
             self.ui.btn_start_camera.setText("Start")
             self.ui.btn_start_camera.setProperty("class", "success")
@@ -3730,10 +2727,20 @@ class MainWindow(QMainWindow):
         except Exception as e:
             self.ui_logger.error(f"Error Stop Camera: {e}")
 
-    def update_frame(self, frame):
+    def update_frame(self, seq):
+        # Lấy frame mới nhất trong ring của camera thread, các frame cũ hơn bị bỏ qua
+        if self.camera_thread is None:
+            return
+        # current_image giữ frame gốc độ phân giải đầy đủ (teaching, capture, ROI)
+        frame = self.camera_thread.take_latest()
+        if frame is None:
+            return
         self.current_image = frame
+        self.current_pixel_format = self.camera_thread.pixel_format
 
-        self.canvas_src.load_pixmap(ndarray2pixmap(self.current_image))
+        # Ảnh hiển thị: mono giữ 1 kênh, Bayer thô demosaic đủ độ phân giải để toạ độ ROI trên canvas khớp ảnh gốc
+        preview = to_preview(frame, self.current_pixel_format, half=False)
+        self.canvas_src.load_pixmap(ndarray2pixmap(preview))
 
     def on_click_test_camera(self):
         try:
@@ -3741,7 +2748,9 @@ class MainWindow(QMainWindow):
                 self.ui_logger.warning("Camera is not open")
                 return
 
+            # grab_camera đã demosaic frame Bayer, mono/BGR đoán theo shape
             self.current_image = self.camera_thread.grab_camera()
+            self.current_pixel_format = None
             if self.current_image is None:
                 self.ui_logger.error("Failed to capture image")
                 return
@@ -3770,7 +2779,10 @@ class MainWindow(QMainWindow):
             if file_dialog.exec() == QFileDialog.DialogCode.Accepted:
                 filename = file_dialog.selectedFiles()[0]
                 # Save the image
-                cv.imwrite(filename, self.current_image)
+                image = self.current_image
+                if is_bayer(self.current_pixel_format):
+                    image = to_bgr(image, self.current_pixel_format)
+                cv.imwrite(filename, image)
 
                 self.ui_logger.info(f"Image captured and saved to: {filename}")
 
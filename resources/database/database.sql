@@ -11,4 +11,16 @@ create table if not exists history(
     weight text not null,
     error_type text);
 
+create table if not exists frame_info(
+    img_path text,
+    camera text,
+    frame_id integer,
+    timestamp real,
+    device_timestamp integer,
+    exposure_us real,
+    gain real,
+    lost_packets integer,
+    skipped integer,
+    latency_ms real);
+
 COMMIT;
\ No newline at end of file
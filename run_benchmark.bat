@@ -0,0 +1,2 @@
+A:\virtual_environment\venv\Scripts\python benchmark.py --model resources/models_ai/best_plus.pt --methods detect,detect_multi --resolutions 2448x2048 --batch-sizes 1,2,4 --imgsz 640
+pause
\ No newline at end of file
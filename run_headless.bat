@@ -0,0 +1,2 @@
+A:\virtual_environment\venv\Scripts\python headless.py --model %1 --trigger optic --count 100
+pause
\ No newline at end of file
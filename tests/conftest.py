@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Chạy test từ thư mục bất kỳ: libs/ và cameras/ được import theo thư mục gốc của repo
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "cameras")]
@@ -0,0 +1,102 @@
+import numpy as np
+
+from libs.frame_ring import FrameRing
+
+
+def frame(value, shape=(4, 6)):
+    return np.full(shape, value, np.uint8)
+
+
+def test_put_copies_frame():
+    ring = FrameRing(capacity=3)
+    src = frame(1)
+    seq = ring.put(src, timestamp=10.0, meta={"frame_id": 1})
+    src[:] = 99
+
+    timestamp, stored = ring.get(seq)
+    assert timestamp == 10.0
+    assert (stored == 1).all()
+    assert ring.meta(seq) == {"frame_id": 1}
+
+
+def test_latest_and_by_index():
+    ring = FrameRing(capacity=4)
+    assert ring.latest() is None
+    seqs = [ring.put(frame(i), timestamp=float(i)) for i in range(3)]
+    assert seqs == [0, 1, 2]
+
+    seq, timestamp, latest = ring.latest()
+    assert (seq, timestamp) == (2, 2.0)
+    assert (latest == 2).all()
+    for i in seqs:
+        assert (ring.get(i)[1] == i).all()
+    assert ring.get(3) is None
+    assert ring.get(-1) is None
+
+
+def test_overwrite_on_full_and_wraparound():
+    ring = FrameRing(capacity=3)
+    for i in range(7):
+        ring.put(frame(i), timestamp=float(i), meta=i)
+
+    # Chỉ còn 3 frame mới nhất, slot cũ đã bị ghi đè
+    for seq in range(4):
+        assert ring.get(seq) is None
+        assert ring.meta(seq) is None
+    for seq in range(4, 7):
+        timestamp, stored = ring.get(seq)
+        assert timestamp == float(seq)
+        assert (stored == seq).all()
+        assert ring.meta(seq) == seq
+    assert ring.latest()[0] == 6
+    assert ring.stats()["written"] == 7
+
+
+def test_get_without_copy_is_slot_view():
+    ring = FrameRing(capacity=2)
+    seq = ring.put(frame(5))
+    _, view = ring.get(seq, copy=False)
+    ring.put(frame(6))
+    ring.put(frame(7))
+    # Slot đã được ghi lại: view thấy dữ liệu mới, get theo seq cũ trả None
+    assert (view == 7).all()
+    assert ring.get(seq) is None
+
+
+def test_capacity_one_keeps_a_spare_slot():
+    # 1 slot thì người đọc luôn tranh với thread ghi: ring giữ tối thiểu 2 slot
+    ring = FrameRing(capacity=1)
+    assert ring.capacity == 2
+    for i in range(5):
+        ring.put(frame(i))
+    assert ring.get(3) is not None
+    assert ring.get(2) is None
+    seq, _, latest = ring.latest()
+    assert seq == 4 and (latest == 4).all()
+
+
+def test_shape_change_reallocates():
+    ring = FrameRing(capacity=2)
+    first = ring.put(frame(1))
+    seq = ring.put(frame(2, shape=(3, 3, 3)))
+    assert ring.get(first) is None
+    assert ring.get(seq)[1].shape == (3, 3, 3)
+
+
+def test_reader_latest_and_next():
+    ring = FrameRing(capacity=3)
+    latest_reader = ring.reader()
+    next_reader = ring.reader()
+    assert latest_reader.read_latest() is None
+
+    for i in range(5):
+        ring.put(frame(i))
+
+    assert latest_reader.read_latest()[0] == 4
+    assert latest_reader.dropped == 4
+    assert latest_reader.read_latest() is None
+
+    # 0 và 1 đã bị ghi đè, read_next nhảy tới frame cũ nhất còn trong ring
+    assert [next_reader.read_next()[0] for _ in range(3)] == [2, 3, 4]
+    assert next_reader.overruns == 2
+    assert next_reader.read_next() is None
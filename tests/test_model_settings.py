@@ -0,0 +1,101 @@
+import os
+import glob
+import json
+import copy
+import shutil
+
+import pytest
+
+# libs.model_settings dùng BACKEND_TORCH của libs.vision (import ultralytics/torch)
+pytest.importorskip("torch")
+pytest.importorskip("ultralytics")
+
+from libs import model_settings
+from libs.model_settings import ModelSettings, compile_settings, load_settings
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATHS = sorted(glob.glob(os.path.join(ROOT, "models", "*", "config.json")))
+
+
+def read_config(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("path", CONFIG_PATHS, ids=lambda p: os.path.basename(os.path.dirname(p)))
+def test_model_configs_compile(path):
+    settings = compile_settings(read_config(path), model_name="test", path=path)
+    assert isinstance(settings, ModelSettings)
+    assert set(settings.cameras) == set(settings.config["modules"]["camera_config"])
+    assert settings.weight.min < settings.weight.max
+    assert 0 <= settings.model_ai.confidence <= 1
+    assert settings.trigger.queue_size >= 1
+
+
+def test_invalid_config_raises_value_error():
+    config = read_config(CONFIG_PATHS[0])
+    del config["modules"]["weight"]
+    with pytest.raises(ValueError):
+        compile_settings(config)
+
+
+@pytest.fixture
+def models_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_settings, "_cache", {})
+    shutil.copytree(os.path.dirname(CONFIG_PATHS[0]), tmp_path / "Test")
+    return str(tmp_path)
+
+
+def test_load_settings_is_cached_until_file_changes(models_dir):
+    first = load_settings("Test", models_dir)
+    assert load_settings("Test", models_dir) is first
+
+    path = os.path.join(models_dir, "Test", "config.json")
+    config = read_config(path)
+    config["modules"]["weight"]["value_weight"] = "123"
+    with open(path, "w") as f:
+        json.dump(config, f)
+    os.utime(path, ns=(first.mtime + 10**9, first.mtime + 10**9))
+
+    second = load_settings("Test", models_dir)
+    assert second is not first
+    assert second.weight.value == 123.0
+
+
+def test_run_config_does_not_leak_into_cache(models_dir):
+    source = read_config(os.path.join(models_dir, "Test", "config.json"))
+    cached = load_settings("Test", models_dir)
+    original = copy.deepcopy(cached.config)
+
+    # Mỗi lần chạy làm việc trên bản sao riêng (AutoEngine.start)
+    run_config = copy.deepcopy(cached.config)
+    run_config["modules"]["weight"]["value_weight"] = "999"
+    run_config["modules"]["camera_config"].clear()
+
+    assert load_settings("Test", models_dir).config == original
+
+    # compile_settings cũng không giữ tham chiếu tới dict đầu vào
+    settings = compile_settings(source)
+    source["modules"]["system"]["log_dir"] = "changed"
+    assert settings.config["modules"]["system"]["log_dir"] != "changed"
+
+
+def test_engine_start_copies_cached_config(models_dir, monkeypatch):
+    try:
+        from libs.auto_engine import AutoEngine
+    except Exception as ex:  # SDK camera, PyQt5, pyserial, ... không có trong môi trường test
+        pytest.skip(f"libs.auto_engine không import được: {ex}")
+
+    monkeypatch.setattr(AutoEngine, "create_devices", lambda self, config: None)
+    monkeypatch.setattr(AutoEngine, "setup_loop_auto", lambda self: None)
+
+    cached = load_settings("Test", models_dir)
+    original = copy.deepcopy(cached.config)
+    engine = AutoEngine(logger=__import__("logging").getLogger("test"))
+    engine.start(cached, "Test")
+    assert engine.config == original
+    assert engine.config is not cached.config
+
+    engine.config["modules"]["weight"]["value_weight"] = "999"
+    assert load_settings("Test", models_dir).config == original
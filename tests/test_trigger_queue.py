@@ -0,0 +1,74 @@
+from libs.constants import TRIGGER_OPTIC_AUTO, TRIGGER_WEIGHT_AUTO, EVENT_STOP_AUTO
+from libs.trigger_queue import TriggerQueue, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST
+
+
+def test_duplicate_inside_window_is_suppressed():
+    queue = TriggerQueue(dedup_ms=20)
+    assert queue.put(TRIGGER_OPTIC_AUTO, "io", timestamp=1.000) == (True, None)
+    assert queue.put(TRIGGER_OPTIC_AUTO, "io", timestamp=1.010) == (False, None)
+
+    stats = queue.stats()
+    assert stats["received"] == 2
+    assert stats["accepted"] == 1
+    assert stats["duplicated"] == 1
+    assert queue.qsize() == 1
+
+
+def test_trigger_after_window_is_accepted():
+    queue = TriggerQueue(dedup_ms=20)
+    queue.put(TRIGGER_OPTIC_AUTO, "io", timestamp=1.000)
+    assert queue.put(TRIGGER_OPTIC_AUTO, "io", timestamp=1.025) == (True, None)
+    assert queue.qsize() == 2
+    assert queue.stats()["duplicated"] == 0
+
+
+def test_dedup_is_per_source_and_trigger():
+    queue = TriggerQueue(dedup_ms={"io": 20})
+    queue.put(TRIGGER_OPTIC_AUTO, "io", timestamp=1.000)
+    # Nguồn khác, trigger khác, nguồn không có trong dict: không bị lọc
+    assert queue.put(TRIGGER_OPTIC_AUTO, "tcp", timestamp=1.001)[0]
+    assert queue.put(TRIGGER_WEIGHT_AUTO, "io", timestamp=1.002)[0]
+    assert queue.put(TRIGGER_OPTIC_AUTO, "software", timestamp=1.003)[0]
+    assert queue.put(TRIGGER_OPTIC_AUTO, "software", timestamp=1.004)[0]
+    assert queue.qsize() == 5
+
+
+def test_drop_oldest_overflow():
+    queue = TriggerQueue(maxsize=3, dedup_ms=0, overflow=OVERFLOW_DROP_OLDEST)
+    for i in range(5):
+        accepted, dropped = queue.put(TRIGGER_OPTIC_AUTO, "io", timestamp=float(i))
+        assert accepted
+        if i < 3:
+            assert dropped is None
+        else:
+            assert dropped.timestamp == float(i - 3)
+
+    stats = queue.stats()
+    assert stats["accepted"] == 5
+    assert stats["dropped"] == 2
+    assert stats["pending"] == 3
+    assert stats["max_depth"] == 3
+    # Còn lại 3 trigger mới nhất theo thứ tự đến
+    assert [queue.get(timeout=0).timestamp for _ in range(3)] == [2.0, 3.0, 4.0]
+
+
+def test_drop_newest_overflow():
+    queue = TriggerQueue(maxsize=2, dedup_ms=0, overflow=OVERFLOW_DROP_NEWEST)
+    queue.put(TRIGGER_OPTIC_AUTO, "io", timestamp=0.0)
+    queue.put(TRIGGER_OPTIC_AUTO, "io", timestamp=1.0)
+    accepted, dropped = queue.put(TRIGGER_OPTIC_AUTO, "io", timestamp=2.0)
+    assert not accepted
+    assert dropped.timestamp == 2.0
+    assert queue.stats()["dropped"] == 1
+    assert [queue.get(timeout=0).timestamp for _ in range(2)] == [0.0, 1.0]
+
+
+def test_internal_events_bypass_limit_and_survive_clear():
+    queue = TriggerQueue(maxsize=1, dedup_ms=0)
+    queue.put(TRIGGER_OPTIC_AUTO, "io", timestamp=0.0)
+    queue.put_event(EVENT_STOP_AUTO)
+    assert queue.qsize() == 1
+
+    assert queue.clear_triggers() == 1
+    assert queue.get(timeout=0).event == EVENT_STOP_AUTO
+    assert queue.get(timeout=0) is None
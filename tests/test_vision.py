@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+# libs.vision import ultralytics/torch ở mức module
+pytest.importorskip("torch")
+pytest.importorskip("ultralytics")
+
+from libs.vision import DetectionBatch, make_tiles, nms_batch
+
+
+def make_batch(boxes, classes, confs):
+    return DetectionBatch(np.array(boxes, np.float32), np.array(classes), np.array(confs, np.float32),
+                          imgsz=(1000, 1000))
+
+
+def test_count_classes():
+    batch = make_batch([[0, 0, 10, 10]] * 4, [1, 1, 0, 1], [0.9, 0.8, 0.7, 0.6])
+    assert batch.count_classes(n_classes=2).tolist() == [1, 3]
+    # Độ dài tối thiểu n_classes kể cả khi class không có object
+    assert batch.count_classes(n_classes=4).tolist() == [1, 3, 0, 0]
+    assert DetectionBatch().count_classes(n_classes=2).tolist() == [0, 0]
+
+
+def test_filter_roi_center_and_full_box():
+    batch = make_batch(
+        [[10, 10, 30, 30],     # nằm trọn trong roi
+         [90, 90, 130, 130],   # tâm trong roi, box tràn ra ngoài
+         [150, 150, 170, 170]],  # ngoài roi
+        [0, 1, 0], [0.9, 0.8, 0.7])
+    roi = (0, 0, 120, 120)
+
+    by_center = batch.filter_roi(roi, use_center=True)
+    assert by_center.boxes.tolist() == [[10, 10, 30, 30], [90, 90, 130, 130]]
+    assert by_center.classes.tolist() == [0, 1]
+
+    full = batch.filter_roi(roi, use_center=False)
+    assert full.boxes.tolist() == [[10, 10, 30, 30]]
+
+
+def test_nms_batch_is_class_aware():
+    batch = make_batch(
+        [[0, 0, 100, 100],
+         [5, 5, 100, 100],     # trùng box đầu, cùng class -> bị gộp
+         [0, 0, 100, 100]],    # trùng box đầu, khác class -> giữ
+        [0, 0, 1], [0.9, 0.8, 0.7])
+
+    merged = nms_batch(batch, iou_thres=0.5)
+    assert sorted(merged.confs.tolist()) == pytest.approx([0.7, 0.9])
+    assert sorted(merged.classes.tolist()) == [0, 1]
+
+    agnostic = nms_batch(batch, iou_thres=0.5, class_agnostic=True)
+    assert agnostic.confs.tolist() == pytest.approx([0.9])
+
+
+def test_nms_batch_ios_merges_box_cut_at_tile_edge():
+    # Box bị cắt ở mép tile nằm trong box đầy đủ: IoU thấp nhưng IoS = 1
+    batch = make_batch([[0, 0, 100, 100], [0, 0, 30, 100]], [0, 0], [0.9, 0.8])
+    assert len(nms_batch(batch, iou_thres=0.5, match_metric="iou")) == 2
+    assert len(nms_batch(batch, iou_thres=0.5, match_metric="ios")) == 1
+
+
+def covered(tiles, width, height):
+    mask = np.zeros((height, width), bool)
+    for x, y, w, h in tiles:
+        mask[y:y + h, x:x + w] = True
+    return mask
+
+
+@pytest.mark.parametrize("width, height", [(2448, 2048), (1000, 700), (640, 640), (641, 1300)])
+def test_make_tiles_covers_image_and_stays_inside(width, height):
+    tiles = make_tiles(width, height, tile_size=640, overlap=0.2)
+    assert covered(tiles, width, height).all()
+    for x, y, w, h in tiles:
+        assert x >= 0 and y >= 0
+        assert x + w <= width and y + h <= height
+    # Tile cuối sát mép phải/dưới
+    assert max(x + w for x, _, w, _ in tiles) == width
+    assert max(y + h for _, y, _, h in tiles) == height
+
+
+def test_make_tiles_overlap_between_neighbours():
+    tiles = make_tiles(2448, 640, tile_size=640, overlap=0.2)
+    xs = sorted(x for x, _, _, _ in tiles)
+    assert xs[0] == 0 and xs[-1] == 2448 - 640
+    for a, b in zip(xs, xs[1:]):
+        # Chồng lấn ít nhất overlap * tile_size (stride không vượt quá tile_size * (1 - overlap))
+        assert 640 - (b - a) >= int(640 * 0.2)
+
+
+def test_make_tiles_small_image_and_rois():
+    assert make_tiles(300, 200, tile_size=640) == [(0, 0, 300, 200)]
+
+    # ROI bị cắt theo ảnh, ROI ngoài ảnh bị bỏ
+    tiles = make_tiles(1000, 1000, tile_size=640, rois=[(900, 900, 300, 300), (2000, 0, 100, 100)])
+    assert tiles == [(900, 900, 100, 100)]
+
+    tiles = make_tiles(2000, 2000, tile_size=640, rois=[(100, 200, 1000, 500)])
+    assert covered(tiles, 2000, 2000)[200:700, 100:1100].all()
+    assert all(x >= 100 and y >= 200 and x + w <= 1100 and y + h <= 700 for x, y, w, h in tiles)